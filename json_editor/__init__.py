@@ -10,16 +10,40 @@ def reload_modules():
     else:
         from imp import reload
     
+    from . import content_hash
+    from . import data_compare
+    from . import data_compare_ui
+    from . import data_diff
     from . import data_tree
     from . import batch_name
+    from . import batch_rename
+    from . import batch_files
+    from . import file_search
+    from . import file_search_ui
     from . import json_editor_dcc_core
     from . import json_editor_system
     from . import json_editor_ui
+    from . import json_query
+    from . import numeric_list
+    from . import tree_walk
+    from . import undo_stack
+    reload(tree_walk)
+    reload(numeric_list)
+    reload(data_diff)
+    reload(content_hash)
+    reload(data_compare)
+    reload(json_query)
+    reload(undo_stack)
+    reload(batch_rename)
+    reload(batch_files)
+    reload(file_search)
+    reload(file_search_ui)
     reload(data_tree)
     reload(batch_name)
     reload(json_editor_dcc_core)
     reload(json_editor_system)
     reload(json_editor_ui)
+    reload(data_compare_ui)
     
 
 def startup():
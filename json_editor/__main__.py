@@ -0,0 +1,19 @@
+"""
+python -m json_editor [json file]
+python -m json_editor batch --help
+"""
+import sys
+
+
+def run(args):
+    if args and args[0] == "batch":
+        from . import batch_files
+        return batch_files.main(args[1:])
+
+    from . import main
+    main(file_path=args[0] if args else None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run(sys.argv[1:]))
@@ -0,0 +1,325 @@
+"""
+Apply batch rename rules to many json files without the ui, files are processed in a pool of worker processes
+
+    python -m json_editor batch ./characters --prefix new_ --replace _L _R --target keys
+    python -m json_editor batch ./characters --scope "$.rig..joints" --regex --replace "^j(\\d+)" "joint_\\1" --dry-run
+
+Nothing in here imports Qt, so it also runs on machines without it.
+"""
+import argparse
+import fnmatch
+import multiprocessing
+import os
+import sys
+from collections import OrderedDict
+
+from . import batch_rename
+from . import json_editor_system as system
+from . import json_query
+
+if sys.version_info.major >= 3:
+    string_types = str
+else:
+    string_types = basestring
+
+
+class LocalConstants:
+    # same choices as the batch modify options of the ui
+    keys = "keys"
+    values = "values"
+    keys_and_values = "both"
+    targets = (keys_and_values, keys, values)
+
+    file_pattern = "*.json"
+
+    # renames listed per file in a dry run
+    dry_run_example_count = 5
+
+
+lk = LocalConstants
+
+
+class BatchSettings(object):
+    def __init__(self, rules, keys=True, values=True, scope="$", hierarchy=True, dry_run=False):
+        """
+        :param rules: batch_rename.RenameRules
+        :param keys: rename dict keys
+        :param values: rename string values
+        :param scope: json query of the parts of each file to rename
+        :param hierarchy: rename the descendants of what the scope matches as well
+        :param dry_run: only report what would change
+        """
+        self.rules = rules
+        self.keys = keys
+        self.values = values
+        self.scope = scope
+        self.hierarchy = hierarchy
+        self.dry_run = dry_run
+
+
+class FileResult(object):
+    def __init__(self, json_path):
+        self.json_path = json_path
+        self.renamed_key_count = 0
+        self.renamed_value_count = 0
+        self.examples = []  # (old text, new text) of the first renames
+        self.error = None
+
+    def is_changed(self):
+        return bool(self.renamed_key_count or self.renamed_value_count)
+
+
+class CountingRename(object):
+    """Wraps a rename function and counts the texts it changed, keeping the first few as examples"""
+
+    def __init__(self, rename, example_count=lk.dry_run_example_count):
+        self.rename = rename
+        self.count = 0
+        self.examples = []
+        self.example_count = example_count
+
+    def __call__(self, text):
+        renamed_text = self.rename(text)
+        if renamed_text != text:
+            self.count += 1
+            if len(self.examples) < self.example_count:
+                self.examples.append((text, renamed_text))
+        return renamed_text
+
+
+def rename_json_data(json_data, rename, settings):
+    """
+    :param json_data:
+    :param rename: function that renames a string
+    :param settings: BatchSettings
+    :return: (renamed data, CountingRename of the keys, CountingRename of the values)
+    :raises batch_rename.KeyCollisionError: if two keys of a dict would get the same name
+    """
+    rename_key = CountingRename(rename)
+    rename_value = CountingRename(rename)
+
+    def rename_string_value(data_value):
+        if not isinstance(data_value, string_types):
+            return data_value
+        renamed_value = rename_value(data_value)
+        return data_value if renamed_value == data_value else renamed_value
+
+    paths = json_query.compile_query(settings.scope).find_paths(json_data)
+    if settings.hierarchy:
+        # descendants of a match are renamed along with it
+        path_set = set(paths)
+        paths = [path for path in paths if not any(path[:i] in path_set for i in range(len(path)))]
+
+    # values first, renamed keys would change the paths
+    key_paths = OrderedDict()  # parent path: keys to rename
+    for path in paths:
+        data_value = get_value_at_path(json_data, path)
+        if isinstance(data_value, (dict, list, tuple)):
+            if settings.hierarchy:
+                renamed_value = batch_rename.rename_data(
+                    data_value,
+                    rename_key,
+                    keys=settings.keys,
+                    values=settings.values,
+                    rename_value=rename_string_value,
+                )
+                json_data = set_value_at_path(json_data, path, renamed_value)
+        elif settings.values:
+            json_data = set_value_at_path(json_data, path, rename_string_value(data_value))
+
+        if settings.keys and path and isinstance(path[-1], string_types):
+            key_paths.setdefault(path[:-1], set()).add(path[-1])
+
+    # deepest parents first, so the paths of the others stay valid
+    for parent_path in sorted(key_paths, key=len, reverse=True):
+        parent_data = get_value_at_path(json_data, parent_path)
+        parent_keys = key_paths[parent_path]
+        renamed_parent = batch_rename.make_renamed_dict(
+            type(parent_data),
+            ((rename_key(key) if key in parent_keys else key, value) for key, value in parent_data.items()),
+        )
+        json_data = set_value_at_path(json_data, parent_path, renamed_parent)
+
+    return json_data, rename_key, rename_value
+
+
+def get_value_at_path(json_data, path):
+    for key in path:
+        json_data = json_data[key]
+    return json_data
+
+
+def set_value_at_path(json_data, path, value):
+    """
+    :return: the json data, which is the value itself if the path is empty
+    """
+    if not path:
+        return value
+    get_value_at_path(json_data, path[:-1])[path[-1]] = value
+    return json_data
+
+
+def process_file(json_path, settings, rename):
+    """
+    :param json_path:
+    :param settings: BatchSettings
+    :param rename: function that renames a string
+    :return: FileResult
+    """
+    result = FileResult(json_path)
+    try:
+        indent = system.get_json_indent_level(json_path)
+        json_data = system.load_json(json_path)
+        renamed_data, rename_key, rename_value = rename_json_data(json_data, rename, settings)
+        result.renamed_key_count = rename_key.count
+        result.renamed_value_count = rename_value.count
+        result.examples = (rename_key.examples + rename_value.examples)[:lk.dry_run_example_count]
+        if result.is_changed() and not settings.dry_run:
+            system.save_json(renamed_data, json_path, indent=indent)
+    except (IOError, OSError, ValueError) as e:
+        result.error = str(e)
+    return result
+
+
+# set in each worker process by init_worker
+_worker_settings = None
+_worker_rename = None
+
+
+def init_worker(settings):
+    global _worker_settings, _worker_rename
+    _worker_settings = settings
+    _worker_rename = settings.rules.compile()
+
+
+def process_file_in_worker(json_path):
+    return process_file(json_path, _worker_settings, _worker_rename)
+
+
+def iter_json_paths(paths, file_pattern=lk.file_pattern):
+    """
+    :param paths: files and directories, directories are searched recursively
+    :param file_pattern: pattern of the file names to pick from directories
+    :return: generator of file paths
+    """
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+
+        for dir_path, dir_names, file_names in os.walk(path):
+            dir_names.sort()
+            for file_name in sorted(fnmatch.filter(file_names, file_pattern)):
+                yield os.path.join(dir_path, file_name)
+
+
+def process_files(json_paths, settings, jobs=None):
+    """
+    :param json_paths:
+    :param settings: BatchSettings
+    :param jobs: worker process count, all cpus by default
+    :return: generator of FileResult, in the order of the paths
+    """
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+
+    if jobs <= 1 or len(json_paths) <= 1:
+        rename = settings.rules.compile()
+        for json_path in json_paths:
+            yield process_file(json_path, settings, rename)
+        return
+
+    pool = multiprocessing.Pool(min(jobs, len(json_paths)), initializer=init_worker, initargs=(settings,))
+    try:
+        chunk_size = max(1, min(100, len(json_paths) // (jobs * 4)))
+        for result in pool.imap(process_file_in_worker, json_paths, chunk_size):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def format_result(result, dry_run=False):
+    if result.error is not None:
+        return "Could not process {}: {}".format(result.json_path, result.error)
+
+    lines = ["{}: {} keys, {} values".format(result.json_path, result.renamed_key_count, result.renamed_value_count)]
+    if dry_run:
+        for old_text, new_text in result.examples:
+            lines.append("    {!r} -> {!r}".format(old_text, new_text))
+        if result.renamed_key_count + result.renamed_value_count > len(result.examples):
+            lines.append("    ...")
+    return "\n".join(lines)
+
+
+def build_argument_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m json_editor batch",
+        description="Rename keys and string values in json files, with the rules of the batch modify widget",
+    )
+    parser.add_argument("paths", nargs="+", help="json files, or directories to search for them")
+    parser.add_argument("--pattern", default=lk.file_pattern, help="file names to pick from directories")
+    parser.add_argument("--prefix", default="")
+    parser.add_argument("--suffix", default="")
+    parser.add_argument(
+        "--replace", nargs=2, action="append", default=[], metavar=("SEARCH", "REPLACE"),
+        help="can be given more than once, they're applied in order",
+    )
+    parser.add_argument("--regex", action="store_true", help="searches are regular expressions")
+    parser.add_argument("--ignore-case", action="store_true")
+    parser.add_argument("--target", choices=lk.targets, default=lk.keys_and_values)
+    parser.add_argument("--scope", default="$", help="json query of what to rename, like $.characters[*].rig")
+    parser.add_argument(
+        "--no-hierarchy", action="store_true", help="only rename what the scope matches, not its descendants")
+    parser.add_argument("--dry-run", action="store_true", help="print what would change without saving")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes, all cpus by default")
+    return parser
+
+
+def main(args=None):
+    parser = build_argument_parser()
+    parsed_args = parser.parse_args(args)
+
+    rules = batch_rename.RenameRules(
+        prefix=parsed_args.prefix,
+        suffix=parsed_args.suffix,
+        search_replace_pairs=parsed_args.replace,
+        use_regex=parsed_args.regex,
+        ignore_case=parsed_args.ignore_case,
+    )
+    try:
+        rules.compile()
+        json_query.compile_query(parsed_args.scope)
+    except (batch_rename.RenameRulesError, json_query.JsonQueryError) as e:
+        parser.error(str(e))
+
+    settings = BatchSettings(
+        rules,
+        keys=parsed_args.target in (lk.keys, lk.keys_and_values),
+        values=parsed_args.target in (lk.values, lk.keys_and_values),
+        scope=parsed_args.scope,
+        hierarchy=not parsed_args.no_hierarchy,
+        dry_run=parsed_args.dry_run,
+    )
+
+    json_paths = list(iter_json_paths(parsed_args.paths, parsed_args.pattern))
+    changed_count = 0
+    error_count = 0
+    for result in process_files(json_paths, settings, jobs=parsed_args.jobs):
+        if result.error is not None:
+            error_count += 1
+        elif result.is_changed():
+            changed_count += 1
+        else:
+            continue
+        print(format_result(result, dry_run=settings.dry_run))
+        sys.stdout.flush()
+
+    print("{} {} of {} files{}".format(
+        "Would change" if settings.dry_run else "Changed",
+        changed_count,
+        len(json_paths),
+        ", {} could not be processed".format(error_count) if error_count else "",
+    ))
+    return 1 if error_count else 0
@@ -1,5 +1,6 @@
 from functools import partial
 
+from . import batch_rename
 from .ui_utils import QtWidgets
 
 
@@ -19,6 +20,10 @@ class BatchNameWidget(QtWidgets.QWidget):
         self.suffix_line_edit.setPlaceholderText("Suffix")
         self.suffix_line_edit.setClearButtonEnabled(True)
 
+        self.regex_checkbox = QtWidgets.QCheckBox("Regex")
+        self.regex_checkbox.setToolTip("Searches are regular expressions, replacements can use \\1 for groups")
+        self.ignore_case_checkbox = QtWidgets.QCheckBox("Ignore Case")
+
         self.add_search_replace_button = QtWidgets.QPushButton("+")
         self.add_search_replace_button.clicked.connect(self.add_search_replace_line)
 
@@ -29,6 +34,8 @@ class BatchNameWidget(QtWidgets.QWidget):
         default_items_layout.setContentsMargins(0, 0, 0, 0)
         default_items_layout.addWidget(self.prefix_line_edit)
         default_items_layout.addWidget(self.suffix_line_edit)
+        default_items_layout.addWidget(self.regex_checkbox)
+        default_items_layout.addWidget(self.ignore_case_checkbox)
         default_items_layout.addWidget(self.add_search_replace_button)
 
         self.main_layout.addLayout(self.search_replace_layout)
@@ -47,14 +54,27 @@ class BatchNameWidget(QtWidgets.QWidget):
         self._search_replace_widgets.remove(widget)
         widget.deleteLater()
 
+    def get_rename_rules(self):
+        return batch_rename.RenameRules(
+            prefix=self.prefix_line_edit.text(),
+            suffix=self.suffix_line_edit.text(),
+            search_replace_pairs=[
+                (sr_widget.search_line.text(), sr_widget.replace_line.text())
+                for sr_widget in self._search_replace_widgets
+            ],
+            use_regex=self.regex_checkbox.isChecked(),
+            ignore_case=self.ignore_case_checkbox.isChecked(),
+        )
+
+    def get_rename_function(self):
+        """
+        :return: function that renames a string with the current rules, compile once and use it for every item
+        :raises batch_rename.RenameRulesError: if a search isn't a valid regular expression
+        """
+        return self.get_rename_rules().compile()
+
     def modify_string(self, input_string):
-        output_string = input_string
-        for sr_widget in self._search_replace_widgets:  # type: SearchReplaceWidget
-            output_string = output_string.replace(
-                sr_widget.search_line.text(),
-                sr_widget.replace_line.text()
-            )
-        return "{}{}{}".format(self.prefix_line_edit.text(), output_string, self.suffix_line_edit.text())
+        return self.get_rename_function()(input_string)
 
 
 class SearchReplaceWidget(QtWidgets.QWidget):
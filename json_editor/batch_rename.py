@@ -0,0 +1,213 @@
+"""
+Batch rename rules without any Qt, used by the batch modify widget and the command line
+
+Rules are a prefix, a suffix and search/replace pairs that are applied one after the other,
+so a pair can replace text that an earlier pair put in. compile() turns them into a single function
+that remembers its results, documents tend to use the same keys over and over.
+"""
+import re
+import sys
+from functools import partial
+
+from . import tree_walk
+
+if sys.version_info.major >= 3:
+    string_types = str
+else:
+    string_types = basestring
+
+
+class RenameRulesError(ValueError):
+    pass
+
+
+class KeyCollisionError(ValueError):
+    """Renaming would give two keys of a dict the same name, so one of their values would be lost"""
+
+    def __init__(self, key):
+        super(KeyCollisionError, self).__init__("More than one key would be renamed to '{}'".format(key))
+        self.key = key
+
+
+class RenameRules(object):
+    def __init__(self, prefix="", suffix="", search_replace_pairs=(), use_regex=False, ignore_case=False):
+        """
+        :param prefix:
+        :param suffix:
+        :param search_replace_pairs: (search, replace) pairs
+        :param use_regex: searches are regular expressions and replacements can use their groups
+        :param ignore_case:
+        """
+        self.prefix = prefix
+        self.suffix = suffix
+        self.search_replace_pairs = list(search_replace_pairs)
+        self.use_regex = use_regex
+        self.ignore_case = ignore_case
+
+    def compile_steps(self):
+        """
+        :return: functions that each apply one search/replace pair to a string
+        :raises RenameRulesError: if a search isn't a valid regular expression
+        """
+        steps = []
+        for search, replace in self.search_replace_pairs:
+            if not self.use_regex and not self.ignore_case:
+                if search != replace:
+                    steps.append(partial(replace_text, search=search, replace=replace))
+                continue
+
+            if not self.use_regex:
+                search = re.escape(search)
+                replace = replace.replace("\\", "\\\\")  # only backslashes mean something in a replacement
+
+            try:
+                search_regex = re.compile(search, re.IGNORECASE if self.ignore_case else 0)
+            except re.error as e:
+                raise RenameRulesError("Invalid search '{}': {}".format(search, e))
+            steps.append(partial(search_regex.sub, replace))
+        return steps
+
+    def compile(self):
+        """
+        :return: function that renames a string
+        :raises RenameRulesError: if a search isn't a valid regular expression
+        """
+        steps = self.compile_steps()
+        prefix = self.prefix
+        suffix = self.suffix
+        renamed_texts = {}
+
+        def rename(text):
+            renamed_text = renamed_texts.get(text)
+            if renamed_text is None:
+                renamed_text = text
+                for step in steps:
+                    renamed_text = step(renamed_text)
+                if prefix or suffix:
+                    renamed_text = prefix + renamed_text + suffix
+                renamed_texts[text] = renamed_text
+            return renamed_text
+        return rename
+
+
+def replace_text(text, search, replace):
+    return text.replace(search, replace)
+
+
+def rename_data(data, rename, keys=True, values=False, rename_value=None):
+    """
+    Rename the dict keys and/or the values in the data, list indices aren't keys so they're left alone
+
+    :param data:
+    :param rename: function that renames a string, see RenameRules.compile()
+    :param keys:
+    :param values:
+    :param rename_value: function that gets a value and returns the renamed value,
+                         or the same object if it didn't change. By default only strings are renamed
+    :return: renamed copy of the data, parts that didn't change are the same objects as in the data
+    :raises KeyCollisionError: if two keys of a dict would get the same name
+    """
+    try:
+        return rename_data_recursive(data, rename, keys, values, rename_value)
+    except RuntimeError:  # RecursionError in python 3, the data is nested deeper than the recursion limit
+        return rename_data_iterative(data, rename, keys, values, rename_value)
+
+
+def rename_data_recursive(data, rename, keys, values, rename_value):
+    if isinstance(data, dict):
+        renamed_data = type(data)()
+        is_renamed = False
+        for key, value in data.items():
+            renamed_key = rename(key) if keys and isinstance(key, string_types) else key
+            renamed_value = rename_data_recursive(value, rename, keys, values, rename_value)
+            is_renamed = is_renamed or renamed_key != key or renamed_value is not value
+            if renamed_key in renamed_data:
+                raise KeyCollisionError(renamed_key)
+            renamed_data[renamed_key] = renamed_value
+        return renamed_data if is_renamed else data
+
+    if isinstance(data, (list, tuple)):
+        renamed_values = [rename_data_recursive(value, rename, keys, values, rename_value) for value in data]
+        if any(renamed_value is not value for renamed_value, value in zip(renamed_values, data)):
+            return type(data)(renamed_values)
+        return data
+
+    if not values:
+        return data
+    if rename_value is not None:
+        return rename_value(data)
+    return rename_string(data, rename)
+
+
+def rename_data_iterative(data, rename, keys, values, rename_value):
+    """Same as rename_data_recursive(), for data nested deeper than the recursion limit"""
+    if rename_value is None:
+        rename_value = partial(rename_string, rename=rename)
+
+    # containers that are being renamed, from the root down: [container, key, renamed key, renamed children, changed]
+    root_entry = [None, None, None, [], False]
+    open_entries = [root_entry]
+    for (key, value), depth in tree_walk.walk_data(data):
+        while len(open_entries) > depth + 1:
+            close_renamed_container(open_entries)
+
+        parent_entry = open_entries[-1]
+        renamed_key = key
+        if keys and isinstance(parent_entry[0], dict) and isinstance(key, string_types):
+            renamed_key = rename(key)
+
+        if isinstance(value, (dict, list, tuple)):
+            open_entries.append([value, key, renamed_key, [], False])
+            continue
+
+        renamed_value = rename_value(value) if values else value
+        parent_entry[3].append((renamed_key, renamed_value))
+        if renamed_key != key or renamed_value is not value:
+            parent_entry[4] = True
+
+    while len(open_entries) > 1:
+        close_renamed_container(open_entries)
+    return root_entry[3][0][1]
+
+
+def close_renamed_container(open_entries):
+    """
+    Add the renamed copy of the last open container to its parent, see rename_data_iterative()
+
+    :param open_entries:
+    :return:
+    """
+    container, key, renamed_key, renamed_children, changed = open_entries.pop()
+    renamed_container = container
+    if changed:
+        if isinstance(container, dict):
+            renamed_container = make_renamed_dict(type(container), renamed_children)
+        else:
+            renamed_container = type(container)(child_value for _, child_value in renamed_children)
+
+    parent_entry = open_entries[-1]
+    parent_entry[3].append((renamed_key, renamed_container))
+    if renamed_key != key or renamed_container is not container:
+        parent_entry[4] = True
+
+
+def make_renamed_dict(dict_type, items):
+    """
+    :param dict_type:
+    :param items: (renamed key, value) of the dict
+    :return: new dict
+    :raises KeyCollisionError: if two keys got the same name
+    """
+    renamed_dict = dict_type()
+    for key, value in items:
+        if key in renamed_dict:
+            raise KeyCollisionError(key)
+        renamed_dict[key] = value
+    return renamed_dict
+
+
+def rename_string(data, rename):
+    if isinstance(data, string_types):
+        renamed_data = rename(data)
+        return data if renamed_data == data else renamed_data
+    return data
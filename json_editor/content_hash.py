@@ -0,0 +1,190 @@
+"""
+Hashes of the content of json data, equal data always gets the same hash
+
+A container is hashed from its compact json text, with the containers in it written as "#" and their own hash.
+So every container in a document gets a hash along the way. A tree can keep them and only hash again what
+changed below them. Two documents are equal if their hashes are, and repeated parts of a document share a hash.
+Containers are hashed without recursion.
+"""
+import hashlib
+import json
+from collections import defaultdict
+
+from .data_diff import get_linked_path
+from .json_editor_system import encode_json_key, encode_json_scalar, iter_encode_json
+
+
+class LocalConstants:
+    hash_prefix = "#"
+    closing_brackets = {"{": "}", "[": "]"}
+
+    # json text of containers that only hold scalars is written by the json module in one go
+    compact_encoder = json.JSONEncoder(separators=(",", ":"), check_circular=False)
+    scalar_types = frozenset((type(u""), type(""), int, type(2 ** 64), float, bool, type(None)))
+
+    # subtrees with less json text than this aren't reported as duplicates
+    min_duplicate_size = 64
+    size_encoder = json.JSONEncoder(check_circular=False)
+
+
+lk = LocalConstants
+
+
+def hash_text(text):
+    """
+    :param text: json text, which is ascii
+    :return: hex digest
+    """
+    return hashlib.sha1(text.encode("ascii")).hexdigest()
+
+
+def get_content_hash(root, get_content, store_hash=None):
+    """
+    :param root:
+    :param get_content: function that gets a node and returns
+        (None, text) for the json text of a scalar, or "#" and the hash of a container that's known already.
+        ("{", iterable of (json text of the key, child node)) for a dict,
+        ("[", iterable of (None, child node)) for a list
+    :param store_hash: function that gets every container node that was hashed along with its hash
+    :return: hash of the root
+    """
+    bracket, content = get_content(root)
+    if bracket is None:
+        return content[len(lk.hash_prefix):] if content.startswith(lk.hash_prefix) else hash_text(content)
+
+    stack = [(root, None, bracket, iter(content), [])]  # (node, key text in its parent, bracket, children, parts)
+    while True:
+        node, key_text, bracket, children, parts = stack[-1]
+        for child_key_text, child in children:
+            child_bracket, child_content = get_content(child)
+            if child_bracket is not None:
+                stack.append((child, child_key_text, child_bracket, iter(child_content), []))
+                break
+            parts.append(child_content if child_key_text is None else child_key_text + ":" + child_content)
+        else:
+            stack.pop()
+            node_hash = hash_text(bracket + ",".join(parts) + lk.closing_brackets[bracket])
+            if store_hash is not None:
+                store_hash(node, node_hash)
+            if not stack:
+                return node_hash
+
+            token = lk.hash_prefix + node_hash
+            stack[-1][4].append(token if key_text is None else key_text + ":" + token)
+
+
+def get_data_content(data_value):
+    """
+    get_content of get_content_hash() for json data
+
+    :param data_value:
+    :return:
+    """
+    if isinstance(data_value, dict):
+        child_values = data_value.values()
+    elif isinstance(data_value, (list, tuple)):
+        child_values = data_value
+    else:
+        return None, encode_json_scalar(data_value)
+
+    if lk.scalar_types.issuperset(map(type, child_values)):
+        return None, lk.hash_prefix + hash_text(lk.compact_encoder.encode(data_value))
+    if isinstance(data_value, dict):
+        return "{", ((encode_json_key(key), value) for key, value in data_value.items())
+    return "[", ((None, value) for value in data_value)
+
+
+def hash_data(data):
+    """
+    :param data: json data
+    :return: hash of the data
+    """
+    return get_content_hash(data, get_data_content)
+
+
+def get_data_token(data_value):
+    """
+    :param data_value:
+    :return: text of the value within the text of its parent, json of a scalar or the hash of a container
+    """
+    if isinstance(data_value, (dict, list, tuple)):
+        return lk.hash_prefix + hash_data(data_value)
+    return encode_json_scalar(data_value)
+
+
+class DuplicateSubtrees(object):
+    """Containers that appear more than once in a document"""
+    __slots__ = ("content_hash", "size", "paths")
+
+    def __init__(self, content_hash, size, paths):
+        """
+        :param content_hash:
+        :param size: length of the json text of one of them, written on one line
+        :param paths: data path of each of them
+        """
+        self.content_hash = content_hash
+        self.size = size
+        self.paths = paths
+
+    def get_saved_size(self):
+        """
+        :return: json text that would be saved by only keeping one of them
+        """
+        return self.size * (len(self.paths) - 1)
+
+
+def find_duplicate_subtrees(data, min_size=lk.min_duplicate_size):
+    """
+    Find repeated containers, the biggest savings first.
+    Containers within a repeated container are only reported if they also appear somewhere else.
+
+    :param data: json data
+    :param min_size: containers with less json text on one line than this are left out
+    :return: list of DuplicateSubtrees
+    """
+    def get_content(node):
+        data_value = node[1]
+        if isinstance(data_value, dict):
+            return "{", ((encode_json_key(key), ((node[0], key), value)) for key, value in data_value.items())
+        if isinstance(data_value, (list, tuple)):
+            return "[", ((None, ((node[0], index), value)) for index, value in enumerate(data_value))
+        return None, encode_json_scalar(data_value)
+
+    def store_hash(node, node_hash):
+        linked_paths_by_hash[node_hash].append(node[0])
+        values_by_hash.setdefault(node_hash, node[1])
+
+    linked_paths_by_hash = defaultdict(list)  # paths are kept as (parent path, key) until they're reported
+    values_by_hash = {}
+    get_content_hash((None, data), get_content, store_hash)
+
+    duplicates = []
+    for node_hash, linked_paths in linked_paths_by_hash.items():
+        if len(linked_paths) < 2:
+            continue
+        size = get_json_size(values_by_hash[node_hash])
+        if size >= min_size:
+            duplicates.append(DuplicateSubtrees(node_hash, size, linked_paths))
+    duplicates.sort(key=lambda duplicate: -duplicate.size)  # containers come before the ones within them
+
+    reported_paths = set()
+    reported_duplicates = []
+    for duplicate in duplicates:
+        duplicate.paths = [get_linked_path(linked_path) for linked_path in duplicate.paths]
+        if all(any(path[:i] in reported_paths for i in range(len(path))) for path in duplicate.paths):
+            continue
+        reported_paths.update(duplicate.paths)
+        reported_duplicates.append(duplicate)
+    reported_duplicates.sort(key=lambda duplicate: -duplicate.get_saved_size())
+    return reported_duplicates
+
+
+def get_json_size(data_value):
+    """
+    :param data_value:
+    :return: length of the json text of the data, written on one line
+    """
+    try:
+        return len(lk.size_encoder.encode(data_value))
+    except RuntimeError:  # RecursionError in python 3
+        return sum(len(chunk) for chunk in iter_encode_json(data_value))
@@ -0,0 +1,370 @@
+"""
+Side by side comparison of two json documents, and merging their differences from one side into the other.
+Without any Qt
+
+Values are lined up the way the documents are read: dicts by key whatever order the keys are in,
+lists by the longest sequence of values they have in common. Lists of dicts that all have an id key are lined up
+by their ids instead, so a record that was edited is still compared with itself.
+Equal values are skipped in one go, the values in lists are lined up by the hash of their json text.
+"""
+import difflib
+import itertools
+
+from . import content_hash
+from .data_diff import DataChange, get_linked_path, get_path_value, is_same_scalar, missing
+from .data_diff import lk as data_diff_lk
+from .json_editor_system import encode_json_scalar
+
+
+class LocalConstants:
+    # lists of dicts are lined up by the first of these keys that every dict in them has, with unique scalar values
+    id_keys = ("id", "uuid", "guid", "key", "name")
+
+
+lk = LocalConstants
+
+
+class DiffHunk(object):
+    """
+    A value that differs between the left and the right document.
+    A value on one side only has a missing value on the other side, with the path where it would go there.
+    """
+    __slots__ = ("left_path", "right_path", "left_value", "right_value")
+
+    def __init__(self, left_path, right_path, left_value, right_value):
+        """
+        :param left_path: tuple of the keys and list indices leading to the value in the left document
+        :param right_path: same for the right document
+        :param left_value:
+        :param right_value:
+        """
+        self.left_path = left_path
+        self.right_path = right_path
+        self.left_value = left_value
+        self.right_value = right_value
+
+    def __eq__(self, other):
+        return isinstance(other, DiffHunk) and (
+            self.left_path, self.right_path, self.left_value, self.right_value) == (
+            other.left_path, other.right_path, other.left_value, other.right_value)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "DiffHunk({!r}, {!r}, {!r}, {!r})".format(
+            self.left_path, self.right_path, self.left_value, self.right_value)
+
+    def is_added(self):
+        """
+        :return: True if the value is only in the right document
+        """
+        return self.left_value is missing
+
+    def is_removed(self):
+        """
+        :return: True if the value is only in the left document
+        """
+        return self.right_value is missing
+
+    def get_merge_change(self, take_left):
+        """
+        :param take_left: the right document takes the left value, otherwise the left document takes the right value
+        :return: DataChange of the document that takes the value
+        """
+        if take_left:
+            return DataChange(self.right_path, self.right_value, self.left_value)
+        return DataChange(self.left_path, self.left_value, self.right_value)
+
+
+def iter_diff_hunks(left_data, right_data, id_keys=lk.id_keys):
+    """
+    :param left_data:
+    :param right_data:
+    :param id_keys: keys that identify the dicts in a list, see lk.id_keys
+    :return: generator of DiffHunk in document order
+    """
+    # paths are kept as (parent path, key) until a hunk is found, see data_diff.iter_data_changes
+    stack = [(None, None, left_data, right_data, 0)]
+    while stack:
+        left_path, right_path, left_value, right_value, unchecked_levels = stack.pop()
+        if left_value is missing or right_value is missing:
+            yield DiffHunk(get_linked_path(left_path), get_linked_path(right_path), left_value, right_value)
+            continue
+        if left_value is right_value:
+            continue
+
+        if unchecked_levels:
+            if is_same_scalar(left_value, right_value):
+                continue
+        else:
+            try:
+                if is_same_data(left_value, right_value):
+                    continue
+            except RuntimeError:  # RecursionError in python 3
+                unchecked_levels = data_diff_lk.unchecked_levels
+
+        child_entries = get_child_entries(left_path, right_path, left_value, right_value, id_keys)
+        if child_entries is None:
+            yield DiffHunk(get_linked_path(left_path), get_linked_path(right_path), left_value, right_value)
+            continue
+
+        child_unchecked_levels = max(unchecked_levels - 1, 0)
+        stack.extend(entry + (child_unchecked_levels,) for entry in reversed(child_entries))
+
+
+def get_child_entries(left_path, right_path, left_value, right_value, id_keys):
+    """
+    :return: list of (left path, right path, left child, right child) with missing for children on one side only,
+        None if the values can't be compared by their children
+    """
+    if isinstance(left_value, dict) and isinstance(right_value, dict):
+        child_entries = [
+            ((left_path, key), (right_path, key), value, missing)
+            for key, value in left_value.items() if key not in right_value
+        ]
+        child_entries.extend(
+            ((left_path, key), (right_path, key), left_value.get(key, missing), value)
+            for key, value in right_value.items()
+        )
+        return child_entries
+
+    if isinstance(left_value, (list, tuple)) and isinstance(right_value, (list, tuple)):
+        return [
+            ((left_path, left_index), (right_path, right_index), left_child, right_child)
+            for left_index, right_index, left_child, right_child in iter_list_pairs(left_value, right_value, id_keys)
+        ]
+
+    return None
+
+
+def iter_list_pairs(left_list, right_list, id_keys=lk.id_keys):
+    """
+    Line up the values of two lists, values on one side only get the index where they would be inserted on the other
+
+    :param left_list:
+    :param right_list:
+    :param id_keys: see lk.id_keys
+    :return: generator of (left index, right index, left value, right value) for the values that might differ
+    """
+    # the values at the start and end that didn't change aren't lined up
+    start = 0
+    left_end = len(left_list)
+    right_end = len(right_list)
+    while start < left_end and start < right_end and is_same_list_value(left_list[start], right_list[start]):
+        start += 1
+    while left_end > start and right_end > start and \
+            is_same_list_value(left_list[left_end - 1], right_list[right_end - 1]):
+        left_end -= 1
+        right_end -= 1
+
+    left_values = left_list[start:left_end]
+    right_values = right_list[start:right_end]
+    if not left_values or not right_values or len(left_values) == len(right_values) == 1:
+        # nothing to line up
+        opcodes = [("replace", 0, len(left_values), 0, len(right_values))]
+        is_matched_by_id = False
+    else:
+        value_ids = get_value_ids(left_values, right_values, id_keys)
+        is_matched_by_id = value_ids is not None
+        if not is_matched_by_id:
+            value_types = set(map(type, itertools.chain(left_values, right_values)))
+            if len(value_types) == 1 and value_types <= content_hash.lk.scalar_types:
+                value_ids = left_values, right_values  # 1 and 1.0 aren't both in there, the values can be compared
+            else:
+                value_ids = [get_value_key(value) for value in left_values], \
+                            [get_value_key(value) for value in right_values]
+        opcodes = difflib.SequenceMatcher(None, value_ids[0], value_ids[1]).get_opcodes()
+
+    for tag, left_start, left_stop, right_start, right_stop in opcodes:
+        if tag == "equal":
+            if is_matched_by_id:
+                # same ids, the dicts can still differ
+                for offset in range(left_stop - left_start):
+                    yield (start + left_start + offset, start + right_start + offset,
+                           left_values[left_start + offset], right_values[right_start + offset])
+            continue
+
+        pair_count = 0 if is_matched_by_id else min(left_stop - left_start, right_stop - right_start)
+        for offset in range(pair_count):
+            yield (start + left_start + offset, start + right_start + offset,
+                   left_values[left_start + offset], right_values[right_start + offset])
+        for left_index in range(left_start + pair_count, left_stop):
+            yield start + left_index, start + right_start + pair_count, left_values[left_index], missing
+        for right_index in range(right_start + pair_count, right_stop):
+            yield start + left_start + pair_count, start + right_index, missing, right_values[right_index]
+
+
+def is_same_data(left_value, right_value):
+    """
+    Like data_diff.is_same_value, the json text of equal containers is compared to tell 1, 1.0 and True apart.
+    Raises RecursionError (RuntimeError in python 2) for containers that are nested too deep to compare them in one go
+
+    :param left_value:
+    :param right_value:
+    :return: True if the values are the same json, dicts with their keys in another order aren't
+    """
+    if left_value is right_value:
+        return True
+    if not isinstance(left_value, (dict, list, tuple)):
+        return is_same_scalar(left_value, right_value)
+    if type(left_value) is not type(right_value) or left_value != right_value:
+        return False
+    return content_hash.lk.compact_encoder.encode(left_value) == content_hash.lk.compact_encoder.encode(right_value)
+
+
+def is_same_list_value(left_value, right_value):
+    try:
+        return is_same_data(left_value, right_value)
+    except RuntimeError:  # RecursionError in python 3
+        return False
+
+
+def get_value_key(data_value):
+    """
+    :param data_value:
+    :return: text that's the same for equal values, the json of a scalar or the hash of a container
+    """
+    if isinstance(data_value, (dict, list, tuple)):
+        try:
+            return content_hash.lk.hash_prefix + content_hash.hash_text(
+                content_hash.lk.compact_encoder.encode(data_value))
+        except RuntimeError:  # RecursionError in python 3
+            return content_hash.get_data_token(data_value)
+    return encode_json_scalar(data_value)
+
+
+def get_value_ids(left_values, right_values, id_keys):
+    """
+    :param left_values:
+    :param right_values:
+    :param id_keys: see lk.id_keys
+    :return: ([id of each left value], [id of each right value]) for the first id key that all dicts on both sides
+        have with unique scalar values, None if there isn't one
+    """
+    if not all(isinstance(value, dict) for value in itertools.chain(left_values, right_values)):
+        return None
+
+    for id_key in id_keys:
+        left_ids = get_unique_ids(left_values, id_key)
+        if left_ids is None:
+            continue
+        right_ids = get_unique_ids(right_values, id_key)
+        if right_ids is not None:
+            return left_ids, right_ids
+    return None
+
+
+def get_unique_ids(dict_values, id_key):
+    ids = []
+    for dict_value in dict_values:
+        id_value = dict_value.get(id_key, missing)
+        if id_value is missing or isinstance(id_value, (dict, list, tuple)):
+            return None
+        ids.append(encode_json_scalar(id_value))
+    return ids if len(set(ids)) == len(ids) else None
+
+
+def merge_hunk(left_data, right_data, hunk, take_left):
+    """
+    :param left_data:
+    :param right_data:
+    :param hunk: DiffHunk between the two
+    :param take_left: the right document takes the left value, otherwise the left document takes the right value
+    :return: (DataChange, new data) of the document that takes the value, see apply_data_change
+    """
+    data, source_data, source_path = (right_data, left_data, hunk.left_path) if take_left else \
+        (left_data, right_data, hunk.right_path)
+    data_change = hunk.get_merge_change(take_left)
+    return data_change, apply_data_change(data, data_change, get_previous_keys(source_data, source_path))
+
+
+def merge_hunks(left_data, right_data, hunks, take_left):
+    """
+    :param left_data:
+    :param right_data:
+    :param hunks: DiffHunk between the two, in document order
+    :param take_left: see merge_hunk
+    :return: new data of the document that takes the values
+    """
+    data, source_data = (right_data, left_data) if take_left else (left_data, right_data)
+
+    # the indices of earlier values in a list aren't moved by changes after them
+    for hunk in reversed(hunks):
+        source_path = hunk.left_path if take_left else hunk.right_path
+        data = apply_data_change(data, hunk.get_merge_change(take_left), get_previous_keys(source_data, source_path))
+    return data
+
+
+def get_previous_keys(data, data_path):
+    """
+    :param data:
+    :param data_path:
+    :return: keys before the last key of the path in its dict, nothing if it isn't in a dict
+    """
+    if not data_path:
+        return []
+    parent_value = get_path_value(data, data_path[:-1])
+    if not isinstance(parent_value, dict):
+        return []
+    return list(itertools.takewhile(lambda key: key != data_path[-1], parent_value))
+
+
+def apply_data_change(data, data_change, previous_keys=()):
+    """
+    The data isn't modified, the containers along the path are copied
+
+    :param data:
+    :param data_change: DataChange, an added list index is inserted and a removed one taken out
+    :param previous_keys: an added dict key goes after the last of these keys that the dict has
+    :return: new data
+    """
+    data_path = data_change.path
+    if not data_path:
+        return data_change.new_value
+
+    parent_values = [data]
+    for key in data_path[:-1]:
+        parent_values.append(parent_values[-1][key])
+
+    parent_value = parent_values.pop()
+    key = data_path[-1]
+    if isinstance(parent_value, dict):
+        if data_change.is_removed():
+            value = type(parent_value)((k, v) for k, v in parent_value.items() if k != key)
+        elif key in parent_value:
+            value = type(parent_value)(parent_value)
+            value[key] = data_change.new_value
+        else:
+            items = list(parent_value.items())
+            dict_keys = [item[0] for item in items]
+            row = 0
+            for previous_key in reversed(previous_keys):
+                if previous_key in parent_value:
+                    row = dict_keys.index(previous_key) + 1
+                    break
+            items.insert(row, (key, data_change.new_value))
+            value = type(parent_value)(items)
+    else:
+        value = list(parent_value)
+        if data_change.is_removed():
+            del value[key]
+        elif data_change.is_added():
+            value.insert(key, data_change.new_value)
+        else:
+            value[key] = data_change.new_value
+        if not isinstance(parent_value, list):
+            value = type(parent_value)(value)
+
+    # copy the containers above it
+    for parent_value, key in zip(reversed(parent_values), reversed(data_path[:-1])):
+        child_value = value
+        if isinstance(parent_value, dict):
+            value = type(parent_value)(parent_value)
+            value[key] = child_value
+        else:
+            value = list(parent_value)
+            value[key] = child_value
+            if not isinstance(parent_value, list):
+                value = type(parent_value)(value)
+    return value
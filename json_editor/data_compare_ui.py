@@ -0,0 +1,564 @@
+import os
+import sys
+
+import shiboken2
+
+from . import data_compare
+from . import data_diff
+from . import data_tree
+from . import json_editor_system as system
+from . import json_editor_ui
+from . import json_query
+from . import ui_utils
+from .ui_utils import QtCore, QtWidgets, QtGui
+
+
+class LocalConstants:
+    # only the first hunks are listed, taking every hunk from one side still takes all of them
+    hunk_limit = 10000
+
+    col_path = 0
+    col_left = 1
+    col_right = 2
+    header_names = ("Path", "Left", "Right")
+
+    role_hunk = QtCore.Qt.UserRole
+
+    added_color = QtGui.QColor(90, 170, 90)
+    removed_color = QtGui.QColor(210, 90, 90)
+    changed_color = QtGui.QColor(210, 170, 70)
+
+    # backgrounds of the items in the trees, collapsed parents show that something below them differs
+    added_background = QtGui.QColor(90, 170, 90, 70)
+    removed_background = QtGui.QColor(210, 90, 90, 70)
+    changed_background = QtGui.QColor(210, 170, 70, 70)
+    contains_changes_background = QtGui.QColor(210, 170, 70, 30)
+
+    max_value_text_length = 80
+
+
+lk = LocalConstants
+
+
+def get_value_text(data_value):
+    """
+    :param data_value:
+    :return: short text of a value for the hunk list
+    """
+    if data_value is data_diff.missing:
+        return ""
+    if isinstance(data_value, dict):
+        return "{{{} keys}}".format(len(data_value))
+    if isinstance(data_value, (list, tuple)):
+        return "[{} items]".format(len(data_value))
+
+    text = system.encode_json_scalar(data_value)
+    if len(text) > lk.max_value_text_length:
+        text = text[:lk.max_value_text_length] + "..."
+    return text
+
+
+def set_item_background(item, color):
+    for column in (data_tree.lk.col_key, data_tree.lk.col_value, data_tree.lk.col_type):
+        item.setData(column, QtCore.Qt.BackgroundRole, color)
+
+
+class DataComparePane(QtWidgets.QWidget):
+    """One side of the comparison, a file that's loaded in the background and can be edited and saved"""
+    loaded = QtCore.Signal()
+
+    def __init__(self, *args, **kwargs):
+        super(DataComparePane, self).__init__(*args, **kwargs)
+        self.indent = None
+        self._load_thread = None
+        self._save_job = None
+        self._data = None  # data the tree shows, kept so it doesn't have to be read from the tree again
+        self._data_revision = None  # undo_stack.revision of the tree when the data was kept
+        self._highlights = []  # (data path, background color)
+        self._highlighted_items = []
+
+        self.path_widget = ui_utils.QtPathWidget(
+            settings_name="JsonEditorCompare",
+            file_filter="JSON (*.json)",
+            recent_paths_amount=100,
+            only_show_existing_recent_paths=True,
+        )
+        self.path_widget.path_changed.connect(self.load_json)
+
+        self.save_button = QtWidgets.QPushButton("Save")
+        self.save_button.clicked.connect(self.save_json)
+
+        self.load_progress_bar = QtWidgets.QProgressBar()
+        self.load_progress_bar.setRange(0, 1000)
+        self.load_progress_bar.setVisible(False)
+
+        self.data_tree_widget = data_tree.DataTreeWidget()
+
+        # items are only created when they get expanded, so they're marked again after that
+        self.highlight_timer = QtCore.QTimer(self)
+        self.highlight_timer.setSingleShot(True)
+        self.highlight_timer.setInterval(0)
+        self.highlight_timer.timeout.connect(self.update_highlights)
+        self.data_tree_widget.tree_widget.itemExpanded.connect(self.highlight_timer.start)
+        self.data_tree_widget.tree_widget.itemCollapsed.connect(self.highlight_timer.start)
+
+        path_layout = QtWidgets.QHBoxLayout()
+        path_layout.setContentsMargins(0, 0, 0, 0)
+        path_layout.addWidget(self.path_widget)
+        path_layout.addWidget(self.save_button)
+
+        main_layout = QtWidgets.QVBoxLayout()
+        main_layout.setContentsMargins(0, 0, 0, 0)
+        main_layout.addLayout(path_layout)
+        main_layout.addWidget(self.load_progress_bar)
+        main_layout.addWidget(self.data_tree_widget)
+        self.setLayout(main_layout)
+
+    def get_data(self):
+        if self._data_revision != self.data_tree_widget.undo_stack.revision:
+            self.set_kept_data(self.data_tree_widget.get_data())
+        return self._data
+
+    def set_kept_data(self, data):
+        self._data = data
+        self._data_revision = self.data_tree_widget.undo_stack.revision
+
+    def set_highlights(self, highlights):
+        """
+        :param highlights: list of (data path, background color) of the items to mark.
+            A collapsed item is marked as containing changes if there's an item to mark below it
+        :return:
+        """
+        self._highlights = highlights
+        self.update_highlights()
+
+    def update_highlights(self):
+        """Mark the items that have been created, without creating any"""
+        self.highlight_timer.stop()
+        item_colors = {}
+        for data_path, color in self._highlights:
+            if not data_path:
+                continue
+            item, depth = self.data_tree_widget.find_data_item(data_path)
+            if item is None:
+                continue
+
+            # an item that's further down than what has been created is within this one
+            if depth < len(data_path) or color is lk.contains_changes_background:
+                item_colors.setdefault(item, lk.contains_changes_background)
+            else:
+                item_colors[item] = color
+
+            parent_item = item.parent()
+            while parent_item is not None:
+                if not parent_item.isExpanded():
+                    item_colors.setdefault(parent_item, lk.contains_changes_background)
+                parent_item = parent_item.parent()
+
+        with self.data_tree_widget.block_model_signals():
+            for item in self._highlighted_items:
+                if item not in item_colors and shiboken2.isValid(item):
+                    set_item_background(item, None)
+            for item, color in item_colors.items():
+                set_item_background(item, color)
+        self._highlighted_items = list(item_colors)
+
+    def is_loading(self):
+        return self._load_thread is not None
+
+    def set_path(self, path):
+        self.path_widget.set_path(path, emit_change_signal=False)
+        self.load_json(path)
+
+    def load_json(self, path):
+        self.cancel_load()
+        if not os.path.exists(path):
+            return
+
+        load_thread = json_editor_ui.JsonLoadThread(path, parent=self)
+        load_thread.progress.connect(self.load_progress_changed)
+        load_thread.loaded.connect(self.json_loaded)
+        load_thread.finished.connect(self.load_thread_finished)
+        self._load_thread = load_thread
+
+        self.load_progress_bar.setValue(0)
+        self.load_progress_bar.setFormat("Loading {} - %p%".format(os.path.basename(path)))
+        self.load_progress_bar.setVisible(True)
+        load_thread.start()
+
+    def cancel_load(self):
+        if self._load_thread is None:
+            return
+
+        self._load_thread.cancel()
+        self._load_thread = None
+        self.load_progress_bar.setVisible(False)
+
+    def load_progress_changed(self, bytes_read, total_bytes):
+        if total_bytes:
+            self.load_progress_bar.setValue(int(1000 * bytes_read / total_bytes))
+
+    def json_loaded(self, path, json_data):
+        if self.sender() is not self._load_thread:
+            return  # cancelled or replaced by a newer load
+
+        self._load_thread = None
+        self.load_progress_bar.setVisible(False)
+        self.indent = system.get_json_indent_level(path)
+
+        self.cancel_save()
+        self.data_tree_widget.set_data(json_data)
+        self.set_kept_data(json_data)
+        self.loaded.emit()
+
+    def load_thread_finished(self):
+        load_thread = self.sender()
+        if load_thread is self._load_thread:
+            # finished without sending data, so something went wrong
+            self._load_thread = None
+            self.load_progress_bar.setVisible(False)
+        load_thread.deleteLater()
+
+    def save_json(self):
+        path = self.path_widget.path()
+        if not path or not self.data_tree_widget.has_data():
+            return
+
+        self.cancel_save()
+        save_job = json_editor_ui.JsonSaveJob(self.data_tree_widget, path, indent=self.indent, parent=self)
+        save_job.saved.connect(self.json_saved)
+        save_job.failed.connect(self.json_save_failed)
+        self._save_job = save_job
+
+        # items can't change while they're being written
+        self.data_tree_widget.setEnabled(False)
+        save_job.start()
+
+    def cancel_save(self):
+        if self._save_job is None:
+            return
+
+        self._save_job.cancel()
+        self.save_job_done()
+
+    def save_job_done(self):
+        self._save_job.deleteLater()
+        self._save_job = None
+        self.data_tree_widget.setEnabled(True)
+
+    def json_saved(self, path):
+        self.data_tree_widget.set_json_snapshot(system.JsonFileSnapshot(path, self._save_job.indent))
+        self.save_job_done()
+        print("Saved Json to: {}".format(path))
+
+    def json_save_failed(self, path, error_message):
+        self.save_job_done()
+        print("Could not save Json to: {}\n{}".format(path, error_message))
+
+
+class DataCompareWidget(QtWidgets.QWidget):
+    """
+    Two files side by side with the values that differ between them listed below.
+    Selecting a difference shows it in both trees, a difference can be taken over from either side.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(DataCompareWidget, self).__init__(*args, **kwargs)
+        self._compare_thread = None
+        self._hunks = []
+        self._compared_revisions = None  # undo_stack.revision of both trees when they were compared
+
+        self.left_pane = DataComparePane()
+        self.right_pane = DataComparePane()
+        self.left_pane.loaded.connect(self.compare)
+        self.right_pane.loaded.connect(self.compare)
+
+        self.compare_button = QtWidgets.QPushButton("Compare")
+        self.compare_button.clicked.connect(self.compare)
+        self.take_left_button = QtWidgets.QPushButton("Take Left")
+        self.take_left_button.setToolTip("Change the right file to the left values of the selected differences")
+        self.take_left_button.clicked.connect(self.take_left)
+        self.take_right_button = QtWidgets.QPushButton("Take Right")
+        self.take_right_button.setToolTip("Change the left file to the right values of the selected differences")
+        self.take_right_button.clicked.connect(self.take_right)
+
+        self.hunks_tree_widget = QtWidgets.QTreeWidget()
+        self.hunks_tree_widget.setRootIsDecorated(False)
+        self.hunks_tree_widget.setUniformRowHeights(True)
+        self.hunks_tree_widget.setHeaderLabels(lk.header_names)
+        self.hunks_tree_widget.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        self.hunks_tree_widget.itemSelectionChanged.connect(self.hunk_selection_changed)
+
+        self.status_label = QtWidgets.QLabel()
+
+        panes_splitter = QtWidgets.QSplitter()
+        panes_splitter.addWidget(self.left_pane)
+        panes_splitter.addWidget(self.right_pane)
+
+        button_layout = QtWidgets.QHBoxLayout()
+        button_layout.setContentsMargins(0, 0, 0, 0)
+        button_layout.addWidget(self.compare_button)
+        button_layout.addWidget(self.take_left_button)
+        button_layout.addWidget(self.take_right_button)
+        button_layout.addWidget(self.status_label, 1)
+
+        hunks_widget = QtWidgets.QWidget()
+        hunks_layout = QtWidgets.QVBoxLayout()
+        hunks_layout.setContentsMargins(0, 0, 0, 0)
+        hunks_layout.addLayout(button_layout)
+        hunks_layout.addWidget(self.hunks_tree_widget)
+        hunks_widget.setLayout(hunks_layout)
+
+        main_splitter = QtWidgets.QSplitter(QtCore.Qt.Vertical)
+        main_splitter.addWidget(panes_splitter)
+        main_splitter.addWidget(hunks_widget)
+        main_splitter.setStretchFactor(0, 3)
+        main_splitter.setStretchFactor(1, 1)
+
+        main_layout = QtWidgets.QVBoxLayout()
+        main_layout.setContentsMargins(0, 0, 0, 0)
+        main_layout.addWidget(main_splitter)
+        self.setLayout(main_layout)
+
+    def get_revisions(self):
+        return self.left_pane.data_tree_widget.undo_stack.revision, self.right_pane.data_tree_widget.undo_stack.revision
+
+    def is_compared(self):
+        """
+        :return: True if the listed hunks are still the differences between the trees
+        """
+        return self._compare_thread is None and self._compared_revisions == self.get_revisions()
+
+    def compare(self):
+        self.cancel_compare()
+        left_tree_widget = self.left_pane.data_tree_widget
+        right_tree_widget = self.right_pane.data_tree_widget
+        if self.left_pane.is_loading() or self.right_pane.is_loading() or \
+                not left_tree_widget.has_data() or not right_tree_widget.has_data():
+            self.clear_hunks()
+            self.status_label.setText("Pick a file on both sides to compare them")
+            return
+
+        compare_thread = DataCompareThread(self.left_pane.get_data(), self.right_pane.get_data(), parent=self)
+        compare_thread.compared.connect(self.data_compared)
+        compare_thread.failed.connect(self.compare_failed)
+        compare_thread.finished.connect(self.compare_thread_finished)
+        self._compare_thread = compare_thread
+        self._compared_revisions = self.get_revisions()
+
+        self.status_label.setText("Comparing")
+        compare_thread.start()
+
+    def cancel_compare(self):
+        if self._compare_thread is None:
+            return
+
+        self._compare_thread.cancel()
+        self._compare_thread = None
+        self.status_label.setText("")
+
+    def data_compared(self, hunks):
+        if self.sender() is not self._compare_thread:
+            return  # cancelled or replaced by a newer comparison
+
+        self._compare_thread = None
+        self._hunks = hunks
+        self.show_hunks(hunks[:lk.hunk_limit])
+        self.highlight_hunks(hunks[:lk.hunk_limit])
+
+        if not hunks:
+            self.status_label.setText("The files are the same")
+        elif len(hunks) > lk.hunk_limit:
+            self.status_label.setText("First {} of {} differences".format(lk.hunk_limit, len(hunks)))
+        else:
+            self.status_label.setText("{} differences".format(len(hunks)))
+
+    def compare_failed(self, error_message):
+        if self.sender() is not self._compare_thread:
+            return
+
+        self._compare_thread = None
+        self.clear_hunks()
+        self.status_label.setText("Could not compare the files: {}".format(error_message))
+
+    def compare_thread_finished(self):
+        compare_thread = self.sender()
+        if compare_thread is self._compare_thread:
+            # finished without hunks, so something went wrong
+            self._compare_thread = None
+        compare_thread.deleteLater()
+
+    def clear_hunks(self):
+        self._hunks = []
+        self.show_hunks([])
+        self.highlight_hunks([])
+
+    def highlight_hunks(self, hunks):
+        """
+        Mark the items of the hunks in both trees, a value that's only on one side marks its parent on the other side
+
+        :param hunks:
+        :return:
+        """
+        left_highlights = []
+        right_highlights = []
+        for hunk in hunks:
+            if hunk.is_added():
+                left_highlights.append((hunk.left_path[:-1], lk.contains_changes_background))
+                right_highlights.append((hunk.right_path, lk.added_background))
+            elif hunk.is_removed():
+                left_highlights.append((hunk.left_path, lk.removed_background))
+                right_highlights.append((hunk.right_path[:-1], lk.contains_changes_background))
+            else:
+                left_highlights.append((hunk.left_path, lk.changed_background))
+                right_highlights.append((hunk.right_path, lk.changed_background))
+        self.left_pane.set_highlights(left_highlights)
+        self.right_pane.set_highlights(right_highlights)
+
+    def show_hunks(self, hunks):
+        self.hunks_tree_widget.clear()
+
+        hunk_items = []
+        for hunk in hunks:
+            if hunk.is_added():
+                path, color = hunk.right_path, lk.added_color
+            elif hunk.is_removed():
+                path, color = hunk.left_path, lk.removed_color
+            else:
+                path, color = hunk.left_path, lk.changed_color
+
+            hunk_item = QtWidgets.QTreeWidgetItem([
+                json_query.format_path(path),
+                get_value_text(hunk.left_value),
+                get_value_text(hunk.right_value),
+            ])
+            hunk_item.setForeground(lk.col_path, color)
+            hunk_item.setData(lk.col_path, lk.role_hunk, hunk)
+            hunk_items.append(hunk_item)
+        self.hunks_tree_widget.addTopLevelItems(hunk_items)
+
+    def get_selected_hunks(self):
+        """
+        :return: selected hunks in document order, every hunk if none are selected
+        """
+        hunk_items = self.hunks_tree_widget.selectedItems()
+        if not hunk_items:
+            return list(self._hunks)
+
+        root_item = self.hunks_tree_widget.invisibleRootItem()
+        hunk_items.sort(key=root_item.indexOfChild)
+        return [hunk_item.data(lk.col_path, lk.role_hunk) for hunk_item in hunk_items]
+
+    def hunk_selection_changed(self):
+        hunk_items = self.hunks_tree_widget.selectedItems()
+        if len(hunk_items) != 1 or not self.is_compared():
+            return
+
+        hunk = hunk_items[0].data(lk.col_path, lk.role_hunk)
+        for pane, path, value in (
+                (self.left_pane, hunk.left_path, hunk.left_value),
+                (self.right_pane, hunk.right_path, hunk.right_value),
+        ):
+            # a value that isn't on this side shows where it would go
+            if value is data_diff.missing:
+                path = path[:-1]
+            item = pane.data_tree_widget.get_item_at_path(path) if path else None
+            if item is None:
+                pane.data_tree_widget.tree_widget.clearSelection()
+            else:
+                pane.data_tree_widget.select_items([item])
+
+    def take_left(self):
+        self.merge_selected_hunks(take_left=True)
+
+    def take_right(self):
+        self.merge_selected_hunks(take_left=False)
+
+    def merge_selected_hunks(self, take_left):
+        """
+        Change one side to the values of the other side for the selected hunks, as one undo step
+
+        :param take_left: the right file takes the left values, otherwise the left file takes the right values
+        :return:
+        """
+        if not self.is_compared():
+            self.status_label.setText("The files changed, compare them again first")
+            return
+        hunks = self.get_selected_hunks()
+        if not hunks:
+            return
+
+        pane = self.right_pane if take_left else self.left_pane
+        if not pane.data_tree_widget.isEnabled():
+            self.status_label.setText("The file is being saved, merge once it's done")
+            return
+        text = "Take Left" if take_left else "Take Right"
+        left_data = self.left_pane.get_data()
+        right_data = self.right_pane.get_data()
+        old_data = right_data if take_left else left_data
+
+        if len(hunks) == 1:
+            data_change, data = data_compare.merge_hunk(left_data, right_data, hunks[0], take_left)
+            pane.data_tree_widget.apply_data_changes(data, old_data, [data_change], text)
+        else:
+            data = data_compare.merge_hunks(left_data, right_data, hunks, take_left)
+            pane.data_tree_widget.update_data(data, old_data, text)
+        pane.set_kept_data(data)
+        self.compare()
+
+
+class DataCompareThread(QtCore.QThread):
+    compared = QtCore.Signal(object)
+    failed = QtCore.Signal(str)
+
+    def __init__(self, left_data, right_data, parent=None):
+        super(DataCompareThread, self).__init__(parent)
+        self.left_data = left_data
+        self.right_data = right_data
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        hunks = []
+        try:
+            for hunk in data_compare.iter_diff_hunks(self.left_data, self.right_data):
+                if self._cancelled:
+                    return
+                hunks.append(hunk)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+
+        if not self._cancelled:
+            self.compared.emit(hunks)
+
+
+class DataCompareWindow(ui_utils.ToolWindow):
+    def __init__(self):
+        super(DataCompareWindow, self).__init__()
+        self.ui = DataCompareWidget()
+        self.setCentralWidget(self.ui)
+        self.setWindowTitle("JSON Compare")
+
+
+def main(left_path=None, right_path=None, refresh=False):
+    win = DataCompareWindow()
+    win.main(refresh=refresh)
+    win.resize(1200, 900)
+
+    if left_path is not None:
+        win.ui.left_pane.set_path(left_path)
+    if right_path is not None:
+        win.ui.right_pane.set_path(right_path)
+
+    if json_editor_ui.standalone_app:
+        ui_utils.standalone_app_window = win
+        sys.exit(json_editor_ui.standalone_app.exec_())
+
+    return win
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
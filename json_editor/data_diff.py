@@ -0,0 +1,220 @@
+"""
+Structural differences between two json documents, without any Qt
+
+Only the values that differ are reported, by their data path, so a view of the old document can be updated
+in place instead of being built again. Containers of the same type are compared by their children:
+dicts by key and lists by index. Everything else that differs is reported as a whole.
+The documents are compared without recursion, they can be nested deeper than the recursion limit.
+"""
+import itertools
+from collections import OrderedDict
+
+
+class LocalConstants:
+    # python can't compare containers nested deeper than its recursion limit, those are compared by their children
+    # for this many levels before comparing them in one go is tried again
+    unchecked_levels = 500
+
+
+lk = LocalConstants
+
+
+class Missing(object):
+    """Value on the side of a change where a key or list index doesn't exist"""
+    __slots__ = ()
+
+    def __repr__(self):
+        return "missing"
+
+
+missing = Missing()
+
+container_types = frozenset((dict, OrderedDict, list, tuple))
+
+
+class DataChange(object):
+    """
+    The value at a data path is different in the new document.
+    Keys and list indices that were added have a missing old value, removed ones a missing new value.
+    """
+    __slots__ = ("path", "old_value", "new_value")
+
+    def __init__(self, path, old_value, new_value):
+        """
+        :param path: tuple of the keys and list indices leading to the value
+        :param old_value:
+        :param new_value:
+        """
+        self.path = path
+        self.old_value = old_value
+        self.new_value = new_value
+
+    def __eq__(self, other):
+        return isinstance(other, DataChange) and (self.path, self.old_value, self.new_value) == (
+            other.path, other.old_value, other.new_value)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "DataChange({!r}, {!r}, {!r})".format(self.path, self.old_value, self.new_value)
+
+    def is_added(self):
+        return self.old_value is missing
+
+    def is_removed(self):
+        return self.new_value is missing
+
+
+def iter_data_changes(old_data, new_data):
+    """
+    Values that are the same object on both sides aren't looked into, data that was loaded again is though.
+
+    Lists are compared index by index, so a value inserted into the middle of a list changes every value after
+    it and adds one at the end. A dict whose remaining keys are in another order changes as a whole.
+
+    :param old_data:
+    :param new_data:
+    :return: generator of DataChange in document order, removed keys of a dict come before its other keys
+    """
+    if old_data is new_data:
+        return
+    try:
+        if is_same_value(old_data, new_data):
+            return
+        unchecked_levels = 0
+    except RuntimeError:  # RecursionError in python 3
+        unchecked_levels = lk.unchecked_levels
+
+    # paths are kept as (parent path, key) until a change is found, copying them would take as long as they are deep.
+    # containers are compared in one go first, unless they were nested too deep for that a few levels up
+    stack = [(None, old_data, new_data, unchecked_levels)]
+    while stack:
+        linked_path, old_value, new_value, unchecked_levels = stack.pop()
+        child_pairs = get_child_pairs(old_value, new_value)
+        if child_pairs is None:
+            yield DataChange(get_linked_path(linked_path), old_value, new_value)
+            continue
+
+        if not unchecked_levels:
+            try:
+                # only the children that differ are kept, most of them don't
+                stack.extend([
+                    ((linked_path, key), old_child, new_child, 0) for key, old_child, new_child in reversed(child_pairs)
+                    if old_child is not new_child and not is_same_value(old_child, new_child)
+                ])
+                continue
+            except RuntimeError:  # RecursionError in python 3
+                pass
+
+        for key, old_child, new_child in reversed(child_pairs):
+            if old_child is new_child:
+                continue
+
+            child_unchecked_levels = max(unchecked_levels - 1, 0)
+            if child_unchecked_levels:
+                if is_same_scalar(old_child, new_child):
+                    continue
+            else:
+                try:
+                    if is_same_value(old_child, new_child):
+                        continue
+                except RuntimeError:  # RecursionError in python 3
+                    child_unchecked_levels = lk.unchecked_levels
+
+            stack.append(((linked_path, key), old_child, new_child, child_unchecked_levels))
+
+
+def get_linked_path(linked_path):
+    """
+    :param linked_path: (parent path, key), None for the root
+    :return: tuple of the keys
+    """
+    keys = []
+    while linked_path is not None:
+        linked_path, key = linked_path
+        keys.append(key)
+    return tuple(reversed(keys))
+
+
+def get_child_pairs(old_value, new_value):
+    """
+    :param old_value:
+    :param new_value:
+    :return: list of (key, old child, new child) with missing for the keys on one side only,
+        None if the values can't be compared by their children
+    """
+    value_type = type(old_value)
+    if value_type is not type(new_value):
+        return None
+
+    if issubclass(value_type, dict):
+        old_keys = [key for key in old_value if key in new_value]
+        new_keys = [key for key in new_value if key in old_value]
+        if old_keys != new_keys:
+            return None
+        child_pairs = [(key, value, missing) for key, value in old_value.items() if key not in new_value]
+        child_pairs.extend((key, old_value.get(key, missing), value) for key, value in new_value.items())
+        return child_pairs
+
+    if issubclass(value_type, (list, tuple)):
+        child_pairs = list(zip(itertools.count(), old_value, new_value))
+        common_length = len(child_pairs)
+        child_pairs.extend((index, old_value[index], missing) for index in range(common_length, len(old_value)))
+        child_pairs.extend((index, missing, new_value[index]) for index in range(common_length, len(new_value)))
+        return child_pairs
+
+    return None
+
+
+def is_same_scalar(old_value, new_value):
+    """
+    :param old_value:
+    :param new_value:
+    :return: True if neither is a container and they're equal and of the same type, 1 and True aren't the same json
+    """
+    return type(old_value) is type(new_value) and type(old_value) not in container_types and old_value == new_value
+
+
+def is_same_value(old_value, new_value):
+    """
+    Raises RecursionError (RuntimeError in python 2) for containers that are nested too deep to compare them in one go
+
+    :param old_value:
+    :param new_value:
+    :return: True if the values are equal and everything in them is of the same type
+    """
+    if type(old_value) is not type(new_value) or old_value != new_value:
+        return False
+
+    # == doesn't tell 1, 1.0 and True apart, so the types of the values in containers are compared as well
+    stack = [(old_value, new_value)]
+    while stack:
+        old_value, new_value = stack.pop()
+        if isinstance(old_value, dict):
+            old_value, new_value = old_value.values(), new_value.values()
+        elif not isinstance(old_value, (list, tuple)):
+            continue
+
+        old_types = list(map(type, old_value))
+        if old_types != list(map(type, new_value)):
+            return False
+        if not container_types.isdisjoint(old_types):
+            stack.extend(pair for pair in zip(old_value, new_value) if type(pair[0]) in container_types)
+    return True
+
+
+def get_path_value(data, data_path, default=missing):
+    """
+    :param data:
+    :param data_path: keys and list indices
+    :param default: returned if there's nothing at the path
+    :return: value at the data path
+    """
+    for key in data_path:
+        try:
+            data = data[key]
+        except (KeyError, IndexError, TypeError):
+            return default
+    return data
+
@@ -1,13 +1,34 @@
+import array
+import bisect
+import contextlib
+import itertools
 import json
 import os
-import re
 import sys
-from collections import OrderedDict
+import time
+from collections import OrderedDict, defaultdict
 from functools import partial
+from json.encoder import encode_basestring_ascii
 
+import shiboken2
+
+from json_editor import batch_rename
+from json_editor import content_hash
+from json_editor import data_diff
+from json_editor import json_query
+from json_editor import numeric_list
+from json_editor import tree_walk
 from json_editor import ui_utils
+from json_editor import undo_stack
+from json_editor.json_editor_system import DeferredContainer, written_newline_size
+from json_editor.json_editor_system import encode_json_key, encode_json_scalar, iter_encode_json
 from json_editor.ui_utils import QtCore, QtWidgets
 
+if sys.version_info.major >= 3:
+    string_types = str
+else:
+    string_types = basestring
+
 
 class LocalConstants:
     col_key = 0
@@ -38,6 +59,73 @@ class LocalConstants:
     supports_children_type_names = list_type_names + dict_type_names
     none_type_name = str(type(None).__name__)
 
+    # type name (as shown in the type column) -> type
+    types_by_name = {data_type.__name__: data_type for data_type in (str, int, float, bool, type(None))
+                     + supports_children_types}
+
+    # native python value of a scalar item
+    role_value = QtCore.Qt.UserRole
+
+    # container data that hasn't been turned into tree items yet
+    role_unfetched_data = QtCore.Qt.UserRole + 1
+    role_json_span = QtCore.Qt.UserRole + 2
+
+    # ListBucket of an item that stands for a range of rows of a big list
+    role_list_bucket = QtCore.Qt.UserRole + 3
+    # set on the list items whose children include ranges
+    role_has_list_buckets = QtCore.Qt.UserRole + 4
+    # set on the invisible root item once items have been created this deep, Qt deletes items recursively
+    # and crashes on very deep trees, so those get deleted a few levels at a time
+    role_has_deep_items = QtCore.Qt.UserRole + 5
+    deep_item_depth = 1000
+    deleted_item_chain_depth = 50
+
+    # lists longer than this are shown as range items of this many rows, ranges of ranges for even longer lists.
+    # the rows of a range are only created once it's expanded
+    list_bucket_size = 10000
+    list_bucket_key_format = u"[{}\u2026{}]"
+
+    # indexOfChild() is a quick scan, for more children of one parent than this a row lookup is quicker
+    index_of_child_limit = 2000
+
+    # past this many runs of rows, or one run per this many children, all children are put back at once.
+    # the view goes over every expanded item for each run of rows that is taken out or inserted otherwise
+    rebuild_children_run_count = 100
+    rebuild_children_rows_per_run = 100
+
+    # edit batches collapse parents with more children than this, see DataTreeWidget.edit_batch()
+    batch_collapse_child_count = 1000
+
+    # set_data() creates the top level items and expands them in steps of about this long,
+    # the tree handles input in between. Items are added to the tree in batches of this many
+    population_step_seconds = 0.05
+    population_batch_size = 1000
+    # the view lays out all its rows again after a step that added some, a step lasts as long as that took,
+    # up to this long. Otherwise laying out a big tree over and over takes much longer than creating it
+    max_population_step_seconds = 0.25
+
+    # expanding items breadth first stops before more rows than this would be shown, after loading or filtering
+    expand_row_budget = 2000
+
+    # the key column is made as wide as the keys of this many of the first rows, plus the padding
+    key_width_sample_count = 1000
+    key_column_padding = 12
+
+    # what an edit in the tree can change, in the order of the columns
+    edit_data_roles = (
+        (col_key, QtCore.Qt.DisplayRole),
+        (col_value, QtCore.Qt.DisplayRole),
+        (col_type, QtCore.Qt.DisplayRole),
+        (col_value, role_value),
+    )
+
+    # rough memory use of a tree item with its text, to keep the undo history within its budget
+    undo_item_memory_size = 1000
+    undo_entry_memory_size = 100  # a row or a changed value kept by an undo step
+
+    # QVariant can't hold ints bigger than this
+    max_variant_int = 2 ** 63 - 1
+
     header_names = ("Key", "Value", "Type")
 
 
@@ -51,11 +139,40 @@ class DataTreeWidget(QtWidgets.QWidget):
         super(DataTreeWidget, self).__init__(*args, **kwargs)
         self.default_expand_depth = 2
         self._root_type = None
+        self._json_snapshot = None  # file the tree was last saved to
+        self._filter_index = None  # built on the first filter
+        self._filter_hidden_items = set()
+        self._expanded_key_paths = set()  # get_item_key_path() of the expanded items
+        self._unfiltered_key_paths = None  # the expanded items from before the filter, restored when it's cleared
+        self._child_key_indexes = {}  # dict item: ChildKeyIndex, built on first use
+        self._edit_batch_depth = 0
+        self._reindex_rows = OrderedDict()  # parent item: first row with an outdated list index, within a batch
+        self._batch_collapsed_items = OrderedDict()  # parent item: was expanded before the batch
+        self._undo_command = None  # TreeEditCommand that edits are recorded into, see undo_step()
+        self.undo_stack = undo_stack.UndoStack()
+
+        # creates the items of the data that was set a batch at a time, see set_data()
+        self._population = None
+        self._population_rows_done = False
+        self._population_step_end = None  # time the last step was done at
+        self.population_timer = QtCore.QTimer(self)
+        self.population_timer.setInterval(0)
+        self.population_timer.timeout.connect(self.continue_population)
 
         self.tree_widget = QtWidgets.QTreeWidget()
         self.tree_widget.setAlternatingRowColors(True)
         self.tree_widget.setSelectionMode(QtWidgets.QTreeWidget.ExtendedSelection)
 
+        # remembers the text from before an edit, so it can be undone
+        self.item_delegate = ItemEditDelegate(self.tree_widget)
+        self.tree_widget.setItemDelegate(self.item_delegate)
+
+        # child items are only created once the parent gets expanded
+        self.tree_widget.itemExpanded.connect(fetch_children)
+        self.tree_widget.itemExpanded.connect(self.item_expanded)
+        self.tree_widget.itemCollapsed.connect(self.item_collapsed)
+        self.tree_widget.itemChanged.connect(self.item_text_changed)
+
         # right click menu
         self.tree_widget.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
         self.tree_widget.customContextMenuRequested.connect(self.build_tree_context_menu)
@@ -74,20 +191,347 @@ class DataTreeWidget(QtWidgets.QWidget):
     # the two most important functions
 
     def set_data(self, data):
-        self.tree_widget.clear()
+        """
+        Display data in the tree
+
+        Containers are only turned into tree items when they get expanded,
+        until then the tree references the passed in data. So don't modify it after calling this.
+        The undo history starts over.
+
+        This returns after the first batch of top level items, the rest of them are created and expanded
+        to the default depth in steps from a timer, see continue_population().
+
+        :param data:
+        :return:
+        """
+        self.stop_population()
+        self.undo_stack.clear()
+        clear_tree_items(self.tree_widget)
+        self.clear_json_snapshot()
+        self.clear_filter_index()
         self.data_is_shown.emit(True)
 
         self._root_type = type(data)
         self.tree_widget.invisibleRootItem().setData(lk.col_type, QtCore.Qt.DisplayRole, self._root_type.__name__)
 
-        self.add_data_to_widget(data_value=data, parent_item=self.tree_widget.invisibleRootItem(), merge=True)
+        self._population = self.iter_population(data)
+        self._population_rows_done = False
+        self.continue_population()
 
-        self.tree_widget.expandToDepth(self.default_expand_depth)
+    def iter_population(self, data):
+        """
+        :param data: data of the root
+        :return: generator that adds the top level items a batch at a time, then expands them one at a time
+        """
+        root_item = self.tree_widget.invisibleRootItem()
+        child_items = iter_child_items(data)
+        while True:
+            batch_items = list(itertools.islice(child_items, lk.population_batch_size))
+            if not batch_items:
+                break
+
+            if not root_item.childCount():
+                root_item.setData(lk.col_value, lk.role_has_list_buckets, is_list_bucket(batch_items[0]))
+            root_item.addChildren(batch_items)
+            self.add_child_keys(root_item, batch_items)
+            self.add_items_to_filter_index(batch_items)
+            if root_item.childCount() == len(batch_items):
+                self.update_header_display()
+            yield
+
+        self._population_rows_done = True
+        for _ in self.iter_expand_to_depth(self.default_expand_depth):
+            yield
         self.update_header_display()
 
+    def continue_population(self, step_seconds=lk.population_step_seconds):
+        """
+        Create and expand items of the data that was set for about the given time, the timer calls this again
+        until it's done
+
+        :param step_seconds:
+        :return:
+        """
+        population = self._population
+        if population is None:
+            return
+        if self._edit_batch_depth:
+            self.population_timer.start()
+            return
+
+        start_time = time.time()
+        if self._population_step_end is not None:
+            view_seconds = min(start_time - self._population_step_end, lk.max_population_step_seconds)
+            step_seconds = max(step_seconds, view_seconds)
+
+        end_time = start_time + step_seconds
+        for _ in population:
+            if time.time() >= end_time:
+                self._population_step_end = time.time()
+                self.population_timer.start()
+                return
+        self.stop_population()
+
+    def finish_population(self, rows_only=False):
+        """
+        Create the items of the data that was set right away
+
+        :param rows_only: only the top level items, anything that reads or edits the tree needs those to be there
+        :return:
+        """
+        while self._population is not None and not (rows_only and self._population_rows_done):
+            if next(self._population, StopIteration) is StopIteration:
+                self.stop_population()
+
+    def stop_population(self):
+        self._population = None
+        self._population_rows_done = False
+        self._population_step_end = None
+        self.population_timer.stop()
+
+    def update_data(self, data, old_data=None, text="Update"):
+        """
+        Show new data by only changing the items of the values that differ from the data the tree shows,
+        see apply_data_changes()
+
+        :param data:
+        :param old_data: data the tree shows, read from the tree if it isn't given
+        :param text: name of the undo step
+        :return: number of values that changed
+        """
+        self.finish_population(rows_only=True)
+        if old_data is None:
+            old_data = self.get_data()
+
+        data_changes = list(data_diff.iter_data_changes(old_data, data))
+        self.apply_data_changes(data, old_data, data_changes, text)
+        return len(data_changes)
+
+    def apply_data_changes(self, data, old_data, data_changes, text="Update"):
+        """
+        Change the items of the values that differ, every other item is kept,
+        so what's expanded, selected and scrolled to stays as it was. The update is one undo step.
+
+        Containers that haven't been expanded just get the new data. Values that changed type get a new item.
+        Dicts whose keys changed order and big lists that changed length are filled again,
+        which collapses everything below them.
+
+        :param data: new data
+        :param old_data: data the tree shows
+        :param data_changes: data_diff.DataChange from the old to the new data
+        :param text: name of the undo step
+        :return:
+        """
+        if not data_changes:
+            return
+
+        self.finish_population(rows_only=True)
+        item_changes = self.find_item_changes(data, data_changes)
+        if item_changes is None or self.tree_widget.invisibleRootItem() in item_changes[0]:
+            # the root itself changed, or the tree doesn't show the old data
+            self.set_data(data)
+        else:
+            self.apply_item_changes(data, old_data, item_changes, text)
+
+    def find_item_changes(self, data, data_changes):
+        """
+        :param data: new data
+        :param data_changes: data_diff.DataChange from the data the tree shows to the new data
+        :return: (refilled items, item entries, child rows), see apply_item_changes().
+            None if the changes don't match the tree
+        """
+        refilled_items = OrderedDict()
+        item_entries = []
+        child_rows = OrderedDict()
+        dict_rows = {}  # dict item: {key: row in the new data}
+
+        for data_change in data_changes:
+            data_path = data_change.path
+            if not data_path:
+                return None
+
+            if data_change.is_added() or data_change.is_removed():
+                parent_item, depth = self.find_data_item(data_path[:-1])
+                if parent_item is None:
+                    return None
+                if depth < len(data_path) - 1 or not is_fetched(parent_item):
+                    refilled_items[parent_item] = data_path[:depth]
+                    continue
+                if get_data_type(parent_item) in lk.list_type_names and (
+                        has_list_buckets(parent_item) or
+                        len(data_diff.get_path_value(data, data_path[:-1])) > lk.list_bucket_size):
+                    refilled_items[parent_item] = data_path[:-1]
+                    continue
+
+                removed_items, inserted_rows, inserted_items = child_rows.setdefault(parent_item, ([], [], []))
+                if data_change.is_removed():
+                    if get_data_type(parent_item) in lk.dict_type_names:
+                        child_item = self.get_child_key_index(parent_item).get(data_path[-1])
+                    else:
+                        child_item = parent_item.child(data_path[-1])
+                    if child_item is None:
+                        return None
+                    removed_items.append(child_item)
+                elif get_data_type(parent_item) in lk.dict_type_names:
+                    inserted_rows.append(get_new_dict_row(parent_item, data, data_path, dict_rows))
+                    inserted_items.append(create_widget_item(data_path[-1], data_change.new_value))
+                else:
+                    inserted_rows.append(data_path[-1])
+                    inserted_items.append(create_widget_item("[{}]".format(data_path[-1]), data_change.new_value))
+                continue
+
+            item, depth = self.find_data_item(data_path)
+            if item is None:
+                return None
+            if depth < len(data_path):
+                refilled_items[item] = data_path[:depth]
+                continue
+
+            old_value, new_value = data_change.old_value, data_change.new_value
+            if not isinstance(old_value, lk.supports_children_types) \
+                    and not isinstance(new_value, lk.supports_children_types):
+                new_edit_data = [item.text(lk.col_key), str(new_value), type(new_value).__name__,
+                                 get_stored_value(new_value)]
+                item_entries.extend(
+                    (item, edit_column, edit_role, old, new)
+                    for (edit_column, edit_role), old, new in zip(
+                        lk.edit_data_roles, get_item_edit_data(item), new_edit_data)
+                    if old != new or type(old) is not type(new)  # True == 1
+                )
+            elif type(old_value) is type(new_value):
+                refilled_items[item] = data_path
+            else:
+                # changed type, so it gets a new item in the same place
+                parent_item = self.get_parent(item)
+                if get_data_type(parent_item) in lk.dict_type_names:
+                    row = get_new_dict_row(parent_item, data, data_path, dict_rows)
+                else:
+                    row = parent_item.indexOfChild(item)
+                removed_items, inserted_rows, inserted_items = child_rows.setdefault(parent_item, ([], [], []))
+                removed_items.append(item)
+                inserted_rows.append(row)
+                inserted_items.append(create_widget_item(item.text(lk.col_key), new_value))
+
+        return refilled_items, item_entries, child_rows
+
+    def apply_item_changes(self, data, old_data, item_changes, text):
+        """
+        Make the changes apply_data_changes() found as one undo step, the scroll position is kept
+
+        :param data: new data
+        :param old_data: data the tree showed
+        :param item_changes: (refilled items, item entries, child rows) from find_item_changes().
+            {container item: data path of it} get the new data as a whole, item entries are set with set_items_data()
+            and {parent item: ([removed items], [inserted rows], [inserted items])} are taken out and put in
+        :param text: name of the undo step
+        :return:
+        """
+        refilled_items, item_entries, child_rows = item_changes
+
+        def is_refilled(tree_widget_item):
+            while tree_widget_item is not None:
+                if tree_widget_item in refilled_items:
+                    return True
+                tree_widget_item = tree_widget_item.parent()
+            return False
+
+        # changes within a big list that is filled again anyway
+        item_entries = [entry for entry in item_entries if not is_refilled(entry[0])]
+        child_rows = [(parent_item, rows) for parent_item, rows in child_rows.items() if not is_refilled(parent_item)]
+        refilled_items = OrderedDict(
+            (item, data_path) for item, data_path in refilled_items.items() if not is_refilled(item.parent()))
+
+        old_unfetched_data = []
+        new_unfetched_data = []
+        for item, data_path in refilled_items.items():
+            old_value = data_diff.get_path_value(old_data, data_path)
+            new_value = data_diff.get_path_value(data, data_path)
+            list_bucket = get_list_bucket(item)
+            if list_bucket is not None:
+                old_value = old_value[list_bucket.start:list_bucket.start + list_bucket.count]
+                new_value = new_value[list_bucket.start:list_bucket.start + list_bucket.count]
+            old_unfetched_data.append(UnfetchedData(numeric_list.pack_values(old_value) or old_value))
+            new_unfetched_data.append(UnfetchedData(numeric_list.pack_values(new_value) or new_value))
+
+        expanded_items = [item for item in refilled_items if item.isExpanded()]
+        scroll_position = self.tree_widget.verticalScrollBar().value()
+        with self.undo_step(text), self.edit_batch():
+            if item_entries:
+                self.apply_change(ItemDataChange(item_entries))
+
+            for parent_item, (removed_items, inserted_rows, inserted_items) in child_rows:
+                self.apply_change(ChildRowsChange(
+                    parent_item, get_child_rows(parent_item, removed_items), removed_items,
+                    inserted_rows, inserted_items))
+
+            if refilled_items:
+                self.apply_change(UnfetchedDataChange(list(refilled_items), old_unfetched_data, new_unfetched_data))
+
+        for item in expanded_items:
+            item.setExpanded(True)
+        self.tree_widget.verticalScrollBar().setValue(scroll_position)
+
     def get_data(self):
+        self.finish_population(rows_only=True)
         return self.get_widget_item_values(self.tree_widget.invisibleRootItem())
 
+    def get_content_hash(self):
+        """
+        Equal data always has the same hash, so comparing the hashes of two trees compares their data.
+        The hash is kept until the tree is edited and then only the edited containers are hashed again.
+
+        :return: hash of the data in the tree, see content_hash
+        """
+        self.finish_population(rows_only=True)
+        return get_item_hash(self.tree_widget.invisibleRootItem())
+
+    def find_duplicate_subtrees(self, min_size=content_hash.lk.min_duplicate_size):
+        """
+        :param min_size: containers with less json text than this are left out
+        :return: list of content_hash.DuplicateSubtrees, the biggest savings first
+        """
+        return content_hash.find_duplicate_subtrees(self.get_data(), min_size=min_size)
+
+    def iter_json_chunks(self, indent=None):
+        """
+        Encode the tree to json text piece by piece, without building the data first.
+
+        Parts that haven't been edited since the last save are read back from the saved file,
+        once the output has been written call set_json_snapshot() so the next save can do the same.
+
+        :param indent: same as json.dump
+        :return: generator of text chunks, joined they're identical to json.dumps(self.get_data(), indent=indent)
+        """
+        self.finish_population(rows_only=True)
+        snapshot = self._json_snapshot
+        if snapshot is not None and not snapshot.is_current(indent):
+            snapshot = None
+
+        # the written positions are updated as we go, so they won't match the old file anymore
+        self._json_snapshot = None
+        return iter_item_json_chunks(self.tree_widget.invisibleRootItem(), indent=indent, snapshot=snapshot)
+
+    def set_json_snapshot(self, snapshot):
+        """
+        :param snapshot: JsonFileSnapshot of the file that iter_json_chunks() was written to
+        :return:
+        """
+        self._json_snapshot = snapshot
+
+    def clear_filter_index(self):
+        self._filter_index = None
+        self._filter_hidden_items = set()
+        self._expanded_key_paths = set()
+        self._unfiltered_key_paths = None
+        self._child_key_indexes = {}
+
+    def clear_json_snapshot(self):
+        self._json_snapshot = None
+        self.tree_widget.invisibleRootItem().setData(lk.col_value, lk.role_json_span, JsonSpan())
+
+    def has_data(self):
+        return self._root_type is not None
+
     #################################################################################################################
 
     def build_tree_context_menu(self):
@@ -110,6 +554,14 @@ class DataTreeWidget(QtWidgets.QWidget):
                 {"Move Down": self.action_move_selected_items_down},
                 {"Sort Alphabetical": self.sort_selected_items},
                 "-",
+                {"Numbers": [
+                    {"Scale...": self.action_scale_selected_numbers},
+                    {"Offset...": self.action_offset_selected_numbers},
+                    {"Clamp...": self.action_clamp_selected_numbers},
+                    {"Round...": self.action_round_selected_numbers},
+                    {"Replace Value...": self.action_replace_selected_numbers},
+                ]},
+                "-",
             ])
 
             for add_type in lk.add_types:
@@ -120,41 +572,212 @@ class DataTreeWidget(QtWidgets.QWidget):
         ui_utils.build_menu_from_action_list(action_list)
 
     def set_filter(self, filter_text, search_columns=(lk.col_key,)):
-        all_items = self.get_all_items()
+        """
+        Only show items with the filter text in one of the search columns, along with their parents.
+        The parents of the matches are expanded, clearing the filter expands and collapses the items
+        back to how they were before it.
+
+        :param filter_text:
+        :param search_columns:
+        :return:
+        """
         if not filter_text:
-            for item in all_items:
+            for item in self._filter_hidden_items:
                 item.setHidden(False)
+            self._filter_hidden_items = set()
+            self.restore_unfiltered_expansion()
             return
 
-        # search keys or values
-        for item in all_items:
+        matched_items = []
+        for entry in self.get_filter_index(search_columns).find_items(filter_text):
+            if isinstance(entry, UnfetchedRow):
+                # only the matches and their parents get created
+                entry = self.get_item_at_path(entry.get_data_path(), parent_item=entry.item)
+            matched_items.append(entry)
+        matched_items = list(OrderedDict.fromkeys(matched_items))  # values that were indexed before being expanded
+        if self._unfiltered_key_paths is None:
+            self._unfiltered_key_paths = set(self._expanded_key_paths)
+
+        # walk up from each match until we reach a parent that's already been visited
+        root_item = self.tree_widget.invisibleRootItem()
+        visible_items = set(matched_items)
+        visible_children = defaultdict(list)  # parent item: children that are shown
+        for item in matched_items:
+            while True:
+                parent_item = item.parent()
+                if parent_item is None:
+                    parent_item = root_item
+                visible_children[parent_item].append(item)
+                if parent_item is root_item or parent_item in visible_items:
+                    break
+                visible_items.add(parent_item)
+                item = parent_item
+
+        # a hidden item hides everything below it, so only the children of visible items need to be hidden
+        hidden_items = set()
+        for parent_item in [root_item] + list(visible_items):
+            child_count = parent_item.childCount()
+            if len(visible_children.get(parent_item, ())) == child_count:
+                continue
+            for i in range(child_count):
+                child_item = parent_item.child(i)
+                if child_item not in visible_items:
+                    hidden_items.add(child_item)
+
+        # only touch items that changed since the last filter
+        for item in self._filter_hidden_items - hidden_items:
+            item.setHidden(False)
+        for item in hidden_items - self._filter_hidden_items:
             item.setHidden(True)
-        for item in all_items:
-            if any(filter_text.lower() in item.text(col).lower() for col in search_columns):
-                self.recursive_set_visible(item)
+        self._filter_hidden_items = hidden_items
+
+        # the parents closest to the top are expanded first, deep matches of a big filter are left collapsed
+        row_count = len(visible_children[root_item])
+        parent_items = visible_children[root_item]
+        while parent_items:
+            next_parent_items = []
+            for parent_item in parent_items:
+                child_items = visible_children.get(parent_item)
+                if not child_items:
+                    continue
+                row_count += len(child_items)
+                if row_count > lk.expand_row_budget:
+                    return
+                if not parent_item.isExpanded():
+                    self.tree_widget.scheduleDelayedItemsLayout()
+                    parent_item.setExpanded(True)
+                next_parent_items.extend(child_items)
+            parent_items = next_parent_items
+
+    def restore_unfiltered_expansion(self):
+        """
+        Expand and collapse the items the way they were before the filter was set,
+        only the items whose state changed are looked up by their key path
 
-    def recursive_set_visible(self, item):
-        item.setHidden(False)
-        if item.parent():
-            self.recursive_set_visible(item.parent())
+        :return:
+        """
+        key_paths = self._unfiltered_key_paths
+        if key_paths is None:
+            return
+        self._unfiltered_key_paths = None
 
-    def get_all_items(self, widget=None, widget_list=None):
-        if widget is None:
-            widget = self.tree_widget.invisibleRootItem()
-        if widget_list is None:
-            widget_list = list()
+        expanded_key_paths = self._expanded_key_paths
+        for key_path in [key_path for key_path in expanded_key_paths if key_path not in key_paths]:
+            item = self.get_item_at_key_path(key_path, fetch=False)
+            if item is None:
+                expanded_key_paths.discard(key_path)  # gone since it was expanded
+            else:
+                item.setExpanded(False)
+
+        # parents first, so their children exist by the time they're looked up
+        for key_path in sorted(key_paths - expanded_key_paths, key=len):
+            item = self.get_item_at_key_path(key_path)
+            if item is not None:
+                self.tree_widget.scheduleDelayedItemsLayout()
+                item.setExpanded(True)
+
+    def item_expanded(self, item):
+        self._expanded_key_paths.add(get_item_key_path(item))
+
+    def item_collapsed(self, item):
+        self._expanded_key_paths.discard(get_item_key_path(item))
+
+    def get_filter_index(self, search_columns):
+        filter_index = self._filter_index
+        if filter_index is not None:
+            filter_index.update_unfetched_items()
+        if filter_index is None or filter_index.search_columns != search_columns or filter_index.needs_rebuild():
+            self.finish_population(rows_only=True)
+            root_item = self.tree_widget.invisibleRootItem()
+            filter_index = ItemFilterIndex(list(iter_item_descendants(root_item, fetch=False)), search_columns)
+            self._filter_index = filter_index
+        return filter_index
+
+    def add_items_to_filter_index(self, items):
+        if self._filter_index is None:
+            return
+
+        for item in items:
+            self._filter_index.add_items([descendant for descendant, _ in walk_items(item, fetch=False)])
+
+    def remove_items_from_filter_index(self, items):
+        if self._filter_index is None:
+            return
+
+        for item in items:
+            removed_items = [descendant for descendant, _ in walk_items(item, fetch=False)]
+            self._filter_index.remove_items(removed_items)
+            self._filter_hidden_items.difference_update(removed_items)
 
-        widgets = get_sub_widgets(widget)
-        widget_list.extend(widgets)
+    def expand_to_depth(self, depth, row_budget=lk.expand_row_budget):
+        """
+        Expand items down to the given depth, creating the child items as we go.
+        QTreeWidget.expandToDepth only expands items that already exist.
+
+        The items are expanded a level at a time, until expanding the next one would show more rows than
+        the budget. So a big file doesn't have to lay out hundreds of thousands of rows.
+
+        Containers that are still in a file are left alone, they're only read when the user expands them.
+        So are the ranges of big lists and the lists of numbers that are packed, see numeric_list.
+
+        :param depth:
+        :param row_budget: most rows to show, None for no limit
+        :return:
+        """
+        self.finish_population(rows_only=True)
+        for _ in self.iter_expand_to_depth(depth, row_budget):
+            pass
+
+    def iter_expand_to_depth(self, depth, row_budget=lk.expand_row_budget):
+        """
+        :param depth:
+        :param row_budget: see expand_to_depth()
+        :return: generator that expands the items, it yields after every item it looks at
+        """
+        root_item = self.tree_widget.invisibleRootItem()
+        row_count = root_item.childCount()
+        parent_items = [root_item]
+        for _ in range(depth + 1):
+            next_parent_items = []
+            for parent_item in parent_items:
+                fetch_children(parent_item)
+                for row in range(parent_item.childCount()):
+                    yield
+                    item = parent_item.child(row)
+                    if item is None:
+                        break  # rows were taken out since the last step
+                    if not item_supports_children(item) or is_deferred(item) or is_list_bucket(item) \
+                            or is_packed(item):
+                        continue
+                    fetch_children(item)
+                    row_count += item.childCount()
+                    if row_budget is not None and row_count > row_budget:
+                        return
+                    # the view lays out its rows once after the step, instead of for every item that's expanded
+                    self.tree_widget.scheduleDelayedItemsLayout()
+                    item.setExpanded(True)
+                    next_parent_items.append(item)
+            parent_items = next_parent_items
 
-        for sub_widget in widgets:
-            self.get_all_items(sub_widget, widget_list)
+    def recursive_set_visible(self, item):
+        while item is not None:
+            item.setHidden(False)
+            item = item.parent()
 
-        return widget_list
+    def get_all_items(self, widget=None):
+        """
+        :param widget: item to get the descendants of, the root by default
+        :return: list of all the items below it, their children are created if they don't have them yet
+        """
+        if widget is None:
+            self.finish_population(rows_only=True)
+            widget = self.tree_widget.invisibleRootItem()
+        return list(iter_item_descendants(widget))
 
     def action_cut_data_to_clipboard(self):
-        self.action_copy_data_to_clipboard()
-        self.delete_selected_items()
+        with self.undo_step("Cut"):
+            self.action_copy_data_to_clipboard()
+            self.delete_selected_items()
 
     def action_copy_data_to_clipboard(self):
         selected_data = self.get_selected_data()
@@ -178,72 +801,295 @@ class DataTreeWidget(QtWidgets.QWidget):
         if self._root_type == None:
             self.set_data(clipboard_data)
         else:
-            self.add_data_to_selected(clipboard_data, merge=True)
+            with self.undo_step("Paste"):
+                self.add_data_to_selected(clipboard_data, merge=True)
         self.data_is_shown.emit(True)
         
     def action_duplicate_selected_items(self):
-        for item in self.get_selected_items():  # type: QtWidgets.QTreeWidgetItem
-            item_data = self.get_widget_item_values(item)
-            item_key = item.text(lk.col_key)
-            parent = self.get_parent(item)
-
-            new_item = self.add_data_to_widget(
-                data_key=item_key,
-                data_value=item_data,
-                parent_item=parent,
-                merge=not item_supports_children(item),
-                key_safety=True
-            )
-
-            # insert next to the original
-            item_index = parent.indexOfChild(item)
-            parent.takeChild(parent.indexOfChild(new_item))
-            parent.insertChild(item_index + 1, new_item)
-
-            fix_list_indices(parent)
+        self.duplicate_items(self.get_selected_items())
 
-    def delete_selected_items(self):
-        to_delete = self.get_selected_items()
-        for item in to_delete:
-            if item is self.tree_widget.invisibleRootItem():
+    def duplicate_items(self, items, modify_key=None):
+        """
+        Insert a copy of each item right after it
+
+        :param items:
+        :param modify_key: function that gets the key of an item and returns the key of the copy
+        :return: the new items
+        """
+        new_items = []
+        with self.undo_step("Duplicate"), self.edit_batch():
+            for parent_item, child_items in self.group_items_by_parent(items).items():
+                child_rows = get_child_rows(parent_item, child_items)
+                rows_and_items = sorted(zip(child_rows, child_items), key=lambda row_and_item: row_and_item[0])
+
+                key_index = None
+                if get_data_type(parent_item) in lk.dict_type_names:
+                    key_index = self.get_child_key_index(parent_item)
+
+                # every copy moves the items after it down a row
+                new_rows = []
+                parent_new_items = []
+                for copy_count, (row, item) in enumerate(rows_and_items):
+                    new_row = row + copy_count + 1
+                    item_key = item.text(lk.col_key)
+                    if key_index is not None:
+                        if modify_key is not None:
+                            item_key = modify_key(item_key)
+                        item_key = key_index.get_unique_key(item_key)
+                    else:
+                        item_key = "[{}]".format(new_row)
+
+                    if is_list_bucket(item):
+                        new_item = create_bucket_item(self.get_widget_item_values(item), 0)
+                    else:
+                        new_item = create_widget_item(item_key, self.get_widget_item_values(item))
+                    if key_index is not None:
+                        key_index.add_items([new_item])  # so the next copies get another key
+                    new_rows.append(new_row)
+                    parent_new_items.append(new_item)
+
+                # the copies are put in all at once, their keys are added back along with them
+                self.remove_child_keys(parent_item, parent_new_items)
+                self.apply_change(ChildRowsChange(parent_item, [], [], new_rows, parent_new_items))
+                new_items.extend(parent_new_items)
+        return new_items
+
+    def rename_items(self, items, rename, keys=True, values=False, hierarchy=False):
+        """
+        Rename the keys and/or scalar values of the items in one edit batch, only text that changes is set.
+        List indices aren't keys, so they're left alone.
+        Children that haven't been created yet are renamed in their data, instead of creating items for them.
+
+        :param items:
+        :param rename: function that renames a string, see batch_rename.RenameRules.compile()
+        :param keys:
+        :param values:
+        :param hierarchy: rename the descendants of the items as well
+        :return:
+        """
+        root_item = self.tree_widget.invisibleRootItem()
+        rename_value = partial(rename_scalar_value, rename=rename)
+        data_entries = []  # see set_items_data
+        renamed_data_items = []
+        old_data = []  # UnfetchedData before and after the rename
+        renamed_data = []
+        hierarchy_items = []
+
+        def find_renames(item, in_dict):
+            if keys and in_dict:
+                key_text = item.text(lk.col_key)
+                renamed_key = rename(key_text)
+                if renamed_key != key_text:
+                    data_entries.append((item, lk.col_key, QtCore.Qt.DisplayRole, key_text, renamed_key))
+
+            if get_data_type(item) in lk.supports_children_type_names:
+                if hierarchy:
+                    hierarchy_items.append(item)
+            elif values:
+                value_text = item.text(lk.col_value)
+                renamed_value_text = rename(value_text)
+                if renamed_value_text != value_text:
+                    data_value = get_item_value(item)
+                    new_value = convert_renamed_value(data_value, renamed_value_text)
+                    data_entries.append((item, lk.col_value, QtCore.Qt.DisplayRole, value_text, str(new_value)))
+                    data_entries.append(
+                        (item, lk.col_value, lk.role_value, get_stored_value(data_value), get_stored_value(new_value)))
+
+        with self.undo_step("Rename"), self.edit_batch():
+            # children are created while finding what to rename, the text is set once nothing moves anymore
+            selected_items = set()
+            for item in items:
+                if item in selected_items:
+                    continue
+                selected_items.add(item)
+                if item is root_item:
+                    if hierarchy:
+                        hierarchy_items.append(item)
+                    continue
+                find_renames(item, get_data_type(self.get_parent(item)) in lk.dict_type_names)
+
+            while hierarchy_items:
+                parent_item = hierarchy_items.pop()
+                unfetched_data = parent_item.data(lk.col_value, lk.role_unfetched_data)
+                if unfetched_data is not None:
+                    data_value = unfetched_data.value
+                    if isinstance(data_value, DeferredContainer):
+                        data_value = data_value.load()
+                    data_value = numeric_list.unpack_values(data_value)
+                    try:
+                        renamed_value = batch_rename.rename_data(data_value, rename, keys, values, rename_value)
+                    except batch_rename.KeyCollisionError:
+                        renamed_value = None  # renamed as items below, those can keep both keys
+                    if renamed_value is not None:
+                        if renamed_value is not data_value:
+                            renamed_data_items.append(parent_item)
+                            old_data.append(unfetched_data)
+                            renamed_data.append(
+                                UnfetchedData(numeric_list.pack_values(renamed_value) or renamed_value))
+                        continue
+
+                in_dict = get_data_type(parent_item) in lk.dict_type_names
+                for item in get_sub_widgets(parent_item):
+                    if item not in selected_items:  # selected descendants were renamed already
+                        find_renames(item, in_dict)
+
+            if data_entries:
+                self.apply_change(ItemDataChange(data_entries))
+            if renamed_data_items:
+                # copies of an item share the UnfetchedData, so the renamed data gets a new one
+                self.apply_change(UnfetchedDataChange(renamed_data_items, old_data, renamed_data))
+
+    def action_scale_selected_numbers(self):
+        numbers = self.ask_for_numbers("Scale", "Multiply the numbers by:", "1.0", 1)
+        if numbers is not None:
+            self.change_selected_numbers("Scale", partial(numeric_list.scale_values, factor=numbers[0]))
+
+    def action_offset_selected_numbers(self):
+        numbers = self.ask_for_numbers("Offset", "Add to the numbers:", "0.0", 1)
+        if numbers is not None:
+            self.change_selected_numbers("Offset", partial(numeric_list.offset_values, offset=numbers[0]))
+
+    def action_clamp_selected_numbers(self):
+        numbers = self.ask_for_numbers("Clamp", "Minimum, maximum (leave one out to not limit it):", "0.0, 1.0", 2,
+                                       allow_empty=True)
+        if numbers is not None:
+            self.change_selected_numbers(
+                "Clamp", partial(numeric_list.clamp_values, minimum=numbers[0], maximum=numbers[1]))
+
+    def action_round_selected_numbers(self):
+        numbers = self.ask_for_numbers("Round", "Decimals:", "3", 1)
+        if numbers is None:
+            return
+        if not isinstance(numbers[0], int):
+            print("Decimals should be a whole number: {}".format(numbers[0]))
+            return
+        self.change_selected_numbers("Round", partial(numeric_list.round_values, digits=numbers[0]))
+
+    def action_replace_selected_numbers(self):
+        numbers = self.ask_for_numbers("Replace Value", "Value to find, value to replace it with:", "0, 0", 2)
+        if numbers is not None:
+            self.change_selected_numbers(
+                "Replace Value", partial(numeric_list.replace_values, find=numbers[0], replace=numbers[1]))
+
+    def ask_for_numbers(self, title, label, default_text, count, allow_empty=False):
+        """
+        :return: list of the numbers that were typed in, None if the dialog was cancelled or they aren't numbers
+        """
+        text, accepted = QtWidgets.QInputDialog.getText(self, title, label, text=default_text)
+        if not accepted:
+            return None
+        try:
+            return numeric_list.parse_numbers(text, count, allow_empty)
+        except ValueError as e:
+            print(e)
+            return None
+
+    def change_selected_numbers(self, text, change):
+        """
+        Change all the numbers of the selected lists at once, in one undo step.
+        Lists that hold anything but numbers are left alone.
+
+        The changed lists are packed into arrays, see numeric_list.
+        Their rows are taken out and created again from the array if the list was expanded.
+
+        :param text: name of the undo step
+        :param change: function that gets an array of numbers and returns the changed numbers
+        :return: the changed items
+        """
+        selected_items = set(self.get_selected_items(root_on_empty=False))
+        changed_items = []
+        old_data = []  # UnfetchedData before and after the change
+        new_data = []
+
+        for item in self.get_selected_items(root_on_empty=False):
+            if get_data_type(item) != list.__name__:
                 continue
 
-            item_parent = self.get_parent(item)
-            item_parent.removeChild(item)
-            fix_list_indices(item_parent)
+            # the numbers of a list that's selected along with its range are only changed once
+            parent_item = item.parent()
+            while parent_item is not None and parent_item not in selected_items:
+                parent_item = parent_item.parent()
+            if parent_item is not None:
+                continue
 
-        if self.tree_widget.invisibleRootItem().childCount() == 0:
-            # if we've gotten rid of everything do a full clear
-            self.action_clear()
+            unfetched_data = item.data(lk.col_value, lk.role_unfetched_data)
+            if unfetched_data is not None and numeric_list.is_packed(unfetched_data.value):
+                values = unfetched_data.value
+            else:
+                values = numeric_list.pack_values(self.get_widget_item_values(item), min_length=0)
+                if values is None:
+                    print("Not a list of numbers: {}".format(item.text(lk.col_key)))
+                    continue
+                if unfetched_data is None:
+                    unfetched_data = UnfetchedData(values)
+
+            changed_values = change(values)
+            if changed_values == values:
+                continue
+            changed_items.append(item)
+            old_data.append(unfetched_data)
+            new_data.append(UnfetchedData(changed_values))
 
-    def sort_selected_items(self):
-        selected_items = self.get_selected_items(root_on_empty=False)
-        common_parent_map = {}
-        for selected_item in selected_items:
-            item_parent = self.get_parent(selected_item)
+        if not changed_items:
+            return []
 
-            items_of_parent = common_parent_map.get(item_parent, list())
-            items_of_parent.append(selected_item)
-            common_parent_map[item_parent] = items_of_parent
+        expanded_items = [item for item in changed_items if item.isExpanded()]
+        with self.undo_step(text), self.edit_batch():
+            self.apply_change(UnfetchedDataChange(changed_items, old_data, new_data))
 
-        for parent, child_items in common_parent_map.items():
-            sorted_children = sorted(child_items, key=lambda x: x.text(lk.col_key))
-            first_child_index = min(parent.indexOfChild(child) for child in child_items)
-            [parent.takeChild(parent.indexOfChild(child)) for child in child_items]
+        for item in expanded_items:
+            item.setExpanded(True)
+        return changed_items
 
-            sorted_children.reverse()
-            [parent.insertChild(first_child_index, sorted_child) for sorted_child in sorted_children]
+    def delete_selected_items(self):
+        root_item = self.tree_widget.invisibleRootItem()
+        to_delete = [item for item in self.get_selected_items() if item is not root_item]
+
+        with self.undo_step("Delete"):
+            with self.edit_batch():
+                for item_parent, child_items in self.group_items_by_parent(to_delete).items():
+                    child_rows = get_child_rows(item_parent, child_items)
+                    self.apply_change(ChildRowsChange(item_parent, child_rows, child_items, [], []))
+
+            if root_item.childCount() == 0 and self.has_data():
+                # if we've gotten rid of everything do a full clear
+                self.apply_change(RootTypeChange(self._root_type, None))
+
+    def sort_selected_items(self):
+        selected_items = self.get_selected_items(root_on_empty=False)
+
+        with self.undo_step("Sort"), self.edit_batch():
+            for parent, child_items in self.group_items_by_parent(selected_items).items():
+                sorted_children = sorted(child_items, key=lambda x: x.text(lk.col_key))
+                child_rows = get_child_rows(parent, child_items)
+                first_row = min(child_rows)
+                sorted_rows = list(range(first_row, first_row + len(sorted_children)))
+                self.apply_change(ChildRowsChange(parent, child_rows, child_items, sorted_rows, sorted_children))
 
     def select_hierarchy(self):
-        for item in self.get_selected_items():
-            item_descendants = get_all_item_descendants(item)
-            for item in item_descendants:
-                item.setSelected(True)
+        descendants = [descendant for item in self.get_selected_items() for descendant in iter_item_descendants(item)]
+        select_tree_items(self.tree_widget, descendants)
 
     def action_clear(self):
-        self._root_type = None
-        self.tree_widget.clear()
-        self.data_is_shown.emit(False)
+        self.undo_stack.clear()
+        self.set_root_data_type(None)
+
+    def set_root_data_type(self, data_type):
+        """
+        :param data_type: type of the root container, None clears the tree
+        :return:
+        """
+        self._root_type = data_type
+        if data_type is None:
+            self.stop_population()
+            clear_tree_items(self.tree_widget)
+            self.clear_json_snapshot()
+            self.clear_filter_index()
+            self.data_is_shown.emit(False)
+            return
+
+        self.tree_widget.invisibleRootItem().setData(lk.col_type, QtCore.Qt.DisplayRole, data_type.__name__)
+        self.data_is_shown.emit(True)
 
     def set_root_type(self, add_type):
         root_data = lk.root_add_values.get(add_type, add_type())
@@ -254,12 +1100,20 @@ class DataTreeWidget(QtWidgets.QWidget):
         self.add_data_to_selected(data_to_add)
 
     def add_data_to_selected(self, data_to_add, merge=False):
-        for selected_item in self.get_selected_items():
-            if not item_supports_children(selected_item):
-                continue
+        selected_items = self.get_selected_items()
+        with self.undo_step("Add"), self.edit_batch():
+            for selected_item in selected_items:
+                if not item_supports_children(selected_item):
+                    continue
+
+                fetch_children(selected_item)
+                first_new_row = selected_item.childCount()
+                self.add_data_to_widget(data_value=data_to_add, parent_item=selected_item, merge=merge, key_safety=True)
+                self.update_list_indices(selected_item, first_new_row)
 
-            self.add_data_to_widget(data_value=data_to_add, parent_item=selected_item, merge=merge, key_safety=True)
-            fix_list_indices(selected_item)
+                new_rows = list(range(first_new_row, selected_item.childCount()))
+                new_items = [selected_item.child(row) for row in new_rows]
+                self.record_change(ChildRowsChange(selected_item, [], [], new_rows, new_items))
 
     def get_selected_items(self, root_on_empty=True):
         selected_items = self.tree_widget.selectedItems()
@@ -288,12 +1142,17 @@ class DataTreeWidget(QtWidgets.QWidget):
         most_common_parent_type = max(set(parent_data_types), key=parent_data_types.count)
 
         # build list or dict to put selected data in
-        output_data = convert_type_string_to_instance(most_common_parent_type)
+        if most_common_parent_type in lk.dict_type_names:
+            output_data = lk.types_by_name[most_common_parent_type]()
+        else:
+            output_data = []
 
         for item in selected_items:
             selected_item_data = self.get_widget_item_values(item)
             if most_common_parent_type in lk.dict_type_names:
                 output_data[item.text(lk.col_key)] = selected_item_data
+            elif is_list_bucket(item):
+                output_data.extend(selected_item_data)
             else:
                 output_data.append(selected_item_data)
 
@@ -303,77 +1162,159 @@ class DataTreeWidget(QtWidgets.QWidget):
         tree_header = self.tree_widget.header()  # type: QtWidgets.QHeaderView
         tree_header.setStretchLastSection(False)
         tree_header.setSectionResizeMode(1, QtWidgets.QHeaderView.ResizeMode.Stretch)
-        self.tree_widget.resizeColumnToContents(lk.col_key)
+        self.tree_widget.setColumnWidth(lk.col_key, self.estimate_key_column_width())
+
+    def estimate_key_column_width(self):
+        """
+        Width that fits the keys of the first rows that are shown,
+        resizeColumnToContents() lays out every expanded row before it measures them
+
+        :return:
+        """
+        font_metrics = self.tree_widget.fontMetrics()
+        text_width = getattr(font_metrics, "horizontalAdvance", None) or font_metrics.width
+        indentation = self.tree_widget.indentation()
+
+        key_width = self.tree_widget.header().sectionSizeHint(lk.col_key)
+        sample_count = lk.key_width_sample_count
+        root_item = self.tree_widget.invisibleRootItem()
+        stack = [(root_item.child(row), 1) for row in reversed(range(min(root_item.childCount(), sample_count)))]
+        while stack and sample_count:
+            item, depth = stack.pop()
+            sample_count -= 1
+            if item.isHidden():
+                continue
+            key_width = max(key_width, text_width(item.text(lk.col_key)) + indentation * depth + lk.key_column_padding)
+            if item.isExpanded():
+                child_count = min(item.childCount(), sample_count)
+                stack.extend((item.child(row), depth + 1) for row in reversed(range(child_count)))
+        return key_width
 
     def get_widget_item_values(self, widget_item):
-        data_type = get_data_type(widget_item)
-        data_value = get_data_as_correct_type(widget_item)
+        """
+        :param widget_item:
+        :return: data of the item, items that were never expanded hand back the data they were made from
+        """
+        try:
+            return get_item_data_recursive(widget_item)
+        except RuntimeError:  # RecursionError in python 3, the items are nested deeper than the recursion limit
+            return get_item_data_iterative(widget_item)
 
-        if data_type in lk.dict_type_names:
-            for sub_widget in get_sub_widgets(widget_item):
-                data_value[sub_widget.text(lk.col_key)] = self.get_widget_item_values(sub_widget)
+    def item_text_changed(self, item, column):
+        """
+        Edits made in the tree are recorded as an undo step, along with the conversion of the edited text
 
-        elif data_type in lk.list_type_names:
-            for sub_widget in get_sub_widgets(widget_item):
-                data_value.append(self.get_widget_item_values(sub_widget))
+        :param item:
+        :param column:
+        :return:
+        """
+        edited_text, self.item_delegate.edited_text = self.item_delegate.edited_text, None
+        if edited_text is None:
+            self.update_edited_item(item, column)  # not typed in by the user
+            return
 
-        return data_value
+        old_data = get_item_edit_data(item)
+        old_data[column] = edited_text
+        self.update_edited_item(item, column)
+        new_data = get_item_edit_data(item)
+
+        entries = [
+            (item, edit_column, edit_role, old, new)
+            for (edit_column, edit_role), old, new in zip(lk.edit_data_roles, old_data, new_data)
+            if old != new or type(old) is not type(new)  # True == 1
+        ]
+        if entries:
+            self.undo_stack.push(TreeEditCommand(self, "Edit", [ItemDataChange(entries)]))
+
+    def update_edited_item(self, item, column):
+        """
+        Mark the item as edited and convert edited text in the value or type column to a native value of the item type
+
+        :param item:
+        :param column:
+        :return:
+        """
+        mark_item_dirty(item)
+        parent_item = self.get_parent(item)
+        if column == lk.col_key and get_data_type(parent_item) in lk.dict_type_names:
+            key_index = self.get_child_key_index(parent_item)
+            key_index.rename_item(item)
+            if key_index.get_key_count(item.text(lk.col_key)) > 1:
+                print("Key '{}' is used more than once, only one of them will be saved".format(item.text(lk.col_key)))
+
+        if self._filter_index is not None and column in self._filter_index.search_columns:
+            self._filter_index.update_item(item)
+
+        if column not in (lk.col_value, lk.col_type) or item_supports_children(item):
+            return
+
+        data_value = get_item_value(item)
+        value_text = item.text(lk.col_value)
+        data_type = get_data_type(item)
+        if value_text == str(data_value) and data_type == type(data_value).__name__:
+            return  # nothing changed, we just stored the value
+
+        try:
+            new_value = convert_text_to_value(value_text, data_type)
+        except ValueError:
+            if column == lk.col_type:
+                new_value = lk.types_by_name[data_type]()  # type was changed, start from its default value
+            else:
+                print("Could not convert '{}' to {}".format(value_text, data_type))
+                new_value = data_value
+
+        if isinstance(new_value, lk.supports_children_types):
+            # item type was changed to a container, turn it into an empty one
+            item.setText(lk.col_value, get_item_count_text(0))
+            set_item_value(item, None)
+            return
+
+        item.setText(lk.col_value, str(new_value))
+        item.setText(lk.col_type, type(new_value).__name__)
+        set_item_value(item, new_value)
 
-    def add_data_to_widget(self, data_key="", data_value=None, parent_item=None, merge=False, key_safety=False):
-        data_type_name = type(data_value).__name__
-        return_item = None
+    def add_data_to_widget(
+            self, data_key="", data_value=None, parent_item=None, merge=False, key_safety=False, row=None):
+        fetch_children(parent_item)
+        self.item_children_changed(parent_item)
 
         if key_safety:
             parent_type = get_data_type(parent_item)
 
             if parent_type in lk.dict_type_names:
-                data_key = get_unique_dict_key(parent_item, key_name=data_key)
+                data_key = self.get_child_key_index(parent_item).get_unique_key(data_key)
 
             if parent_type in lk.list_type_names:
                 data_key = "[{}]".format(parent_item.childCount())
 
-        if isinstance(data_value, lk.dict_types):
-            if not merge:
-                parent_item = QtWidgets.QTreeWidgetItem(
-                    parent_item,
-                    [data_key, "-------- {} items --------".format(len(data_value)), data_type_name],
-                )
-                parent_item.setFlags(parent_item.flags() | QtCore.Qt.ItemIsEditable)
-                return_item = parent_item
-
-            for k, v in data_value.items():
-                self.add_data_to_widget(
-                    data_key=k,
-                    data_value=v,
-                    parent_item=parent_item,
-                    merge=False,
-                    key_safety=key_safety,
-                )
+        if merge and isinstance(data_value, lk.supports_children_types):
+            if not key_safety:
+                child_items = create_child_items(data_value)
+                parent_item.addChildren(child_items)
+                parent_item.setData(
+                    lk.col_value, lk.role_has_list_buckets, bool(child_items) and is_list_bucket(child_items[0]))
+                self.add_child_keys(parent_item, child_items)
+                self.add_items_to_filter_index(child_items)
+                return None
+
+            # keys need to be checked against the siblings that were added before them
+            if isinstance(data_value, lk.dict_types):
+                data_items = data_value.items()
+            else:
+                data_items = (("[{}]".format(i), v) for i, v in enumerate(data_value))
 
-        elif isinstance(data_value, lk.list_types):
-            if not merge:
-                parent_item = QtWidgets.QTreeWidgetItem(
-                    parent_item,
-                    [data_key, "-------- {} items --------".format(len(data_value)), data_type_name],
-                )
-                parent_item.setFlags(parent_item.flags() | QtCore.Qt.ItemIsEditable)
-                return_item = parent_item
-
-            for i, v in enumerate(data_value):
-                self.add_data_to_widget(
-                    data_key="[{}]".format(i),
-                    data_value=v,
-                    parent_item=parent_item,
-                    merge=False,
-                    key_safety=key_safety,
-                )
-        else:
-            widget_item = QtWidgets.QTreeWidgetItem(parent_item, [data_key, str(data_value), data_type_name])
-            # widget_item.setData(lk.col_value, QtCore.Qt.DisplayRole, data_value)
-            widget_item.setFlags(widget_item.flags() | QtCore.Qt.ItemIsEditable)
-            return_item = widget_item
+            for k, v in data_items:
+                self.add_data_to_widget(data_key=k, data_value=v, parent_item=parent_item, key_safety=key_safety)
+            return None
 
-        return return_item
+        widget_item = create_widget_item(data_key, data_value)
+        if row is None:
+            parent_item.addChild(widget_item)
+        else:
+            parent_item.insertChild(row, widget_item)
+        self.add_child_keys(parent_item, [widget_item])
+        self.add_items_to_filter_index([widget_item])
+        return widget_item
 
     def action_move_selected_items_up(self):
         self.reorder_selected_items(direction=-1)
@@ -383,164 +1324,2283 @@ class DataTreeWidget(QtWidgets.QWidget):
 
     def reorder_selected_items(self, direction=1):
         """
-        This thing is a mess
+        Move each selected item a row up or down, one after the other.
+        The new order is worked out first and the items are moved in one go.
 
-        :param direction:
+        :param direction: 1 moves down, -1 moves up
         :return:
         """
-        resolve_parent_list_items = []
         selected_items = self.get_selected_items(root_on_empty=False)
         if direction == 1:
             selected_items.reverse()
 
-        for i, item in enumerate(selected_items):  # Find new indices for selected items
+        children_by_parent = {}  # parent item: child items in their new order
+        child_rows_by_parent = {}  # parent item: {child item: new row}
+        moved_rows = OrderedDict()  # parent item: {moved item: row before the first move}
+        for item in selected_items:
             parent_item = self.get_parent(item)
+            child_items = children_by_parent.get(parent_item)
+            if child_items is None:
+                child_items = get_sub_widgets(parent_item)
+                children_by_parent[parent_item] = child_items
+                child_rows_by_parent[parent_item] = dict((child, row) for row, child in enumerate(child_items))
+            child_rows = child_rows_by_parent[parent_item]
+
+            current_index = child_rows[item]
+            new_index = min(max(current_index + direction, 0), len(child_items) - 1)
+
+            # only the item and the one it swaps places with move
+            other_item = child_items[new_index]
+            parent_moved_rows = moved_rows.setdefault(parent_item, OrderedDict())
+            parent_moved_rows.setdefault(item, current_index)
+            parent_moved_rows.setdefault(other_item, new_index)
+
+            child_items[current_index], child_items[new_index] = other_item, item
+            child_rows[item], child_rows[other_item] = new_index, current_index
+
+        with self.undo_step("Move"), self.edit_batch():
+            for parent_item, parent_moved_rows in moved_rows.items():
+                items = list(parent_moved_rows)
+                old_rows = list(parent_moved_rows.values())
+                new_rows = [child_rows_by_parent[parent_item][item] for item in items]
+                if new_rows != old_rows:
+                    self.apply_change(ChildRowsChange(parent_item, old_rows, items, new_rows, items))
+
+            if selected_items:
+                # Set highlight focus, the selection is restored along with the rest of the batch
+                self.tree_widget.setCurrentItem(
+                    selected_items[-1], lk.col_key, QtCore.QItemSelectionModel.NoUpdate)
+
+        for parent_item in moved_rows:
+            parent_item.setExpanded(True)
 
-            was_expanded = item.isExpanded()
-
-            current_index = parent_item.indexOfChild(item)
-            new_index = current_index + direction
+    def item_children_changed(self, parent_item):
+        """
+        Call before adding, removing or moving children of the item
+        """
+        mark_item_dirty(parent_item)
 
-            if new_index < 0:
-                new_index = 0
-            if new_index > parent_item.childCount() - 1:
-                new_index = parent_item.childCount() - 1
+        if self._edit_batch_depth and parent_item not in self._batch_collapsed_items \
+                and parent_item.childCount() > lk.batch_collapse_child_count \
+                and parent_item is not self.tree_widget.invisibleRootItem():
+            # the view lays out all children of an expanded item again on every insert and removal
+            self._batch_collapsed_items[parent_item] = parent_item.isExpanded()
+            parent_item.setExpanded(False)
 
-            parent_item.takeChild(current_index)
-            parent_item.insertChild(new_index, item)  # ReOrder
+    @contextlib.contextmanager
+    def edit_batch(self):
+        """
+        Group structural edits, the tree doesn't redraw or emit signals until the outermost batch is done.
+        List indices and item counts queued with update_list_indices are updated once at the end.
+        Big parents passed to item_children_changed stay collapsed during the batch and the selection is cleared,
+        both are restored at the end. So get the selected items before starting a batch.
 
-            resolve_parent_list_items.append(parent_item)
-            item.treeWidget().setCurrentItem(item)  # Set highlight focus
-            item.setExpanded(was_expanded)
-            parent_item.setExpanded(True)
+        Item text set within a batch doesn't go through item_text_changed
+        and expanding items doesn't fetch their children.
+        """
+        self.finish_population(rows_only=True)
+        self._edit_batch_depth += 1
+        if self._edit_batch_depth == 1:
+            signals_blocked = self.tree_widget.blockSignals(True)
+            updates_enabled = self.tree_widget.updatesEnabled()
+            self.tree_widget.setUpdatesEnabled(False)
+            scroll_position = self.tree_widget.verticalScrollBar().value()
+
+            # the selection is updated on every insert and removal otherwise
+            selected_items = self.tree_widget.selectedItems()
+            self.tree_widget.clearSelection()
+        try:
+            yield
+        finally:
+            self._edit_batch_depth -= 1
+            if self._edit_batch_depth == 0:
+                reindex_rows, self._reindex_rows = self._reindex_rows, OrderedDict()
+                for parent_item, first_row in reindex_rows.items():
+                    self.update_list_indices(parent_item, first_row)
 
-        if direction == 1:
-            selected_items.reverse()  # reverse back
+                collapsed_items, self._batch_collapsed_items = self._batch_collapsed_items, OrderedDict()
+                for parent_item, was_expanded in collapsed_items.items():
+                    if was_expanded:
+                        parent_item.setExpanded(True)
 
-        for item in selected_items:  # ReSelect
-            item.setSelected(True)
+                if collapsed_items:
+                    self.tree_widget.doItemsLayout()
+                    self.tree_widget.verticalScrollBar().setValue(scroll_position)
 
-        for resolved_parent in resolve_parent_list_items:
-            fix_list_indices(resolved_parent)
+                select_tree_items(self.tree_widget, [item for item in selected_items if item.treeWidget()])
 
-    def get_parent(self, item):
-        item_parent = item.parent()
-        if item_parent is None:
-            item_parent = self.tree_widget.invisibleRootItem()
-        return item_parent
+                self.tree_widget.blockSignals(signals_blocked)
+                self.tree_widget.setUpdatesEnabled(updates_enabled)
 
+    def update_list_indices(self, parent_item, first_row=0):
+        """
+        Update the item count of the parent and the list indices of its children from first_row on.
+        Within an edit_batch this waits for the end of the batch, so every parent is only updated once.
 
-def get_sub_widgets(tree_widget_item):
-    return [tree_widget_item.child(i) for i in range(tree_widget_item.childCount())]
+        :param parent_item:
+        :param first_row: children before this row kept their index
+        :return:
+        """
+        if self._edit_batch_depth:
+            self._reindex_rows[parent_item] = min(first_row, self._reindex_rows.get(parent_item, first_row))
+            return
 
+        if get_data_type(parent_item) in lk.list_type_names:
+            self._child_key_indexes.pop(parent_item, None)
 
-def get_all_item_descendants(tree_widget_item, item_list=None):
-    if item_list is None:
-        item_list = []
+        signals_blocked = self.tree_widget.blockSignals(True)
+        try:
+            changed_items = fix_list_indices(parent_item, first_row)
+        finally:
+            self.tree_widget.blockSignals(signals_blocked)
 
-    item_children = get_sub_widgets(tree_widget_item)
+        if self._filter_index is not None:
+            root_item = self.tree_widget.invisibleRootItem()
+            for changed_item in changed_items:
+                if changed_item is not root_item:
+                    self._filter_index.update_item(changed_item)
 
-    # This list is recursively extended. So mutability comes into play here.
-    item_list.extend(item_children)
+    def group_items_by_parent(self, items):
+        """
+        :param items:
+        :return: OrderedDict {parent item: [child items]}
+        """
+        items_by_parent = OrderedDict()
+        for item in items:
+            items_by_parent.setdefault(self.get_parent(item), []).append(item)
+        return items_by_parent
 
-    for item_child in item_children:
-        get_all_item_descendants(item_child, item_list)
+    def get_child_key_index(self, parent_item):
+        """
+        :param parent_item: dict item
+        :return: ChildKeyIndex of the children, kept up to date with adds, deletes and renames
+        """
+        key_index = self._child_key_indexes.get(parent_item)
+        if key_index is None:
+            key_index = ChildKeyIndex(get_sub_widgets(parent_item))
+            self._child_key_indexes[parent_item] = key_index
+        return key_index
+
+    def add_child_keys(self, parent_item, child_items):
+        key_index = self._child_key_indexes.get(parent_item)
+        if key_index is not None:
+            key_index.add_items(child_items)
+
+    def remove_child_keys(self, parent_item, child_items):
+        key_index = self._child_key_indexes.get(parent_item)
+        if key_index is not None:
+            key_index.remove_items(child_items)
+
+    def get_item_at_path(self, data_path, parent_item=None):
+        """
+        :param data_path: keys and list indices leading to the item
+        :param parent_item: item the path starts at, the root by default
+        :return: tree item, or None if there's nothing at the path
+        """
+        self.finish_population(rows_only=True)
+        item = self.tree_widget.invisibleRootItem() if parent_item is None else parent_item
+        for key in data_path:
+            fetch_children(item)
+            if get_data_type(item) in lk.dict_type_names:
+                item = self.get_child_key_index(item).get(key)
+            elif isinstance(key, int):
+                item, bucket_index = get_list_entry(item, key)
+                while bucket_index is not None:
+                    # the rows of a big list are only created for the range that holds the index
+                    fetch_children(item)
+                    item, bucket_index = get_list_entry(item, bucket_index)
+            else:
+                return None
 
-    return item_list
+            if item is None:
+                return None
+        return item
 
+    def find_data_item(self, data_path):
+        """
+        Same as get_item_at_path() without creating any items
 
-def get_data_as_correct_type(tree_widget_item):
-    data_value = tree_widget_item.text(lk.col_value)
-    data_type = tree_widget_item.text(lk.col_type)
+        :param data_path: keys and list indices leading to the item
+        :return: (item, number of keys of the path that lead to it). The item is the first container along the path
+            whose children haven't been created, if there is one. (None, 0) if there's nothing at the path
+        """
+        item = self.tree_widget.invisibleRootItem()
+        for depth, key in enumerate(data_path):
+            if not is_fetched(item):
+                return item, depth
+            if get_data_type(item) in lk.dict_type_names:
+                item = self.get_child_key_index(item).get(key)
+            elif isinstance(key, int):
+                item, bucket_index = get_list_entry(item, key)
+                if bucket_index is not None:
+                    return item, depth  # range of the list that holds the index
+            else:
+                return None, 0
 
-    if data_type == "NoneType":
-        return None
+            if item is None:
+                return None, 0
+        return item, len(data_path)
 
-    if data_type in ("int", "float"):
-        try:  # This is kinda dumb, but check if the values in the fields are valid
-            if data_type == "int":
-                int(data_value)
-            if data_type == "float":
-                float(data_value)
-        except ValueError:
-            data_value = "".join([s for s in str(data_value) if not s.isalpha()])  # remove letters
-
-    if data_type == "bool":
-        # I let you be really sloppy with typing here
-        if data_value.lower().startswith("t"):
-            return True
-        elif data_value.lower() in ["1", "y"]:
-            return True
-        elif data_value.lower().startswith("f"):
-            return False
+    def get_item_at_key_path(self, key_path, fetch=True):
+        """
+        :param key_path: see get_item_key_path()
+        :param fetch: create the child items along the way, otherwise items that haven't been expanded are the end
+        :return: tree item, or None if there's nothing at the path
+        """
+        item = self.tree_widget.invisibleRootItem()
+        for key_text in key_path:
+            if fetch:
+                fetch_children(item)
+            elif not is_fetched(item):
+                return None
+
+            item = self.get_child_item_by_key(item, key_text)
+            if item is None:
+                return None
+        return item
+
+    def get_child_item_by_key(self, parent_item, key_text):
+        """
+        :param parent_item: fetched item
+        :param key_text: key column text of the child, the rows and ranges of lists show their list index
+        :return: child item, None if no child has the key
+        """
+        if get_data_type(parent_item) in lk.dict_type_names:
+            return self.get_child_key_index(parent_item).get(key_text)
+
+        list_index = get_key_list_index(key_text)
+        if list_index is None:
+            return None
+        if has_list_buckets(parent_item):
+            child_item = find_list_child(parent_item, list_index)
         else:
-            return False
+            row = list_index - get_list_start(parent_item)
+            child_item = parent_item.child(row) if 0 <= row < parent_item.childCount() else None
 
-    if data_type in lk.supports_children_type_names:
-        eval_statement = "{}()".format(data_type)
-    else:
-        eval_statement = "{}('{}')".format(data_type, data_value)
+        if child_item is None or child_item.text(lk.col_key) != key_text:
+            return None
+        return child_item
 
-    data_of_correct_type = eval(eval_statement)
+    def find_query_items(self, query_text, limit=None):
+        """
+        Run a json query over the data in the tree
 
-    return data_of_correct_type
+        :param query_text: see json_query
+        :param limit: stop looking after this many results
+        :return: matching tree items
+        :raises json_query.JsonQueryError: if the query can't be parsed
+        """
+        query = json_query.compile_query(query_text)
+        self.finish_population(rows_only=True)
 
+        items = []
+        for data_path, node in query.iter_matches(self.tree_widget.invisibleRootItem(), TreeQueryAdapter(self)):
+            if not data_path:
+                continue  # the root doesn't have an item
 
-def convert_type_string_to_instance(data_type):
-    eval_statement = "{}()".format(data_type)
-    data_of_correct_type = eval(eval_statement)
-    return data_of_correct_type
+            if not isinstance(node, QtWidgets.QTreeWidgetItem):
+                node = self.get_item_at_path(data_path)  # inside data that hasn't been expanded yet
 
+            items.append(node)
+            if limit is not None and len(items) >= limit:
+                break
+        return items
 
-def get_data_type(tree_widget_item):
-    return tree_widget_item.text(lk.col_type)
+    def select_items(self, items):
+        self.tree_widget.clearSelection()
+        for item in items:
+            item.setSelected(True)
 
+            parent_item = item.parent()
+            while parent_item is not None and not parent_item.isExpanded():
+                parent_item.setExpanded(True)
+                parent_item = parent_item.parent()
 
-def item_supports_children(item):
-    return get_data_type(item) in lk.supports_children_type_names
+        if items:
+            self.tree_widget.scrollToItem(items[0])
 
+    def get_parent(self, item):
+        item_parent = item.parent()
+        if item_parent is None:
+            item_parent = self.tree_widget.invisibleRootItem()
+        return item_parent
 
-def get_unique_dict_key(parent_item, key_name=""):
-    """
-    Creates a unique key to use in a dictionary
-    +1 to end of name if key already exists
+    #################################################################################################################
+    # undo
 
-    :param parent_item:
-    :param key_name:
-    :return:
+    @contextlib.contextmanager
+    def undo_step(self, text):
+        """
+        Record the changes made within as one undo step, a step within another step is part of the outer one
+
+        :param text: name of the step, like "Delete"
+        :return:
+        """
+        if self._undo_command is not None:
+            yield
+            return
+
+        self.finish_population(rows_only=True)
+        self._undo_command = TreeEditCommand(self, text)
+        try:
+            yield
+        finally:
+            command, self._undo_command = self._undo_command, None
+            if command.changes:
+                self.undo_stack.push(command)
+
+    def record_change(self, change):
+        """
+        :param change: change that was made to the tree, kept if an undo step is being recorded
+        :return:
+        """
+        if self._undo_command is not None:
+            self._undo_command.changes.append(change)
+
+    def apply_change(self, change):
+        change.apply(self)
+        self.record_change(change)
+
+    def undo(self):
+        if not self.isEnabled():
+            return  # disabled while it's being saved, see JsonEditorWidget.save_json
+        self.undo_stack.undo()
+
+    def redo(self):
+        if not self.isEnabled():
+            return
+        self.undo_stack.redo()
+
+    def apply_changes(self, changes, undo=False):
+        """
+        Make recorded changes again, or revert them in reverse order. Items that are put back get selected
+
+        :param changes:
+        :param undo:
+        :return:
+        """
+        inserted_items = []
+        with self.edit_batch():
+            for change in (reversed(changes) if undo else changes):
+                inserted_items.extend(change.apply(self, undo))
+
+        inserted_items = [item for item in inserted_items if item.treeWidget() is self.tree_widget]
+        if not inserted_items:
+            return
+
+        # the view works out the area of every selected range to repaint otherwise
+        updates_enabled = self.tree_widget.updatesEnabled()
+        self.tree_widget.setUpdatesEnabled(False)
+        try:
+            self.tree_widget.clearSelection()
+            select_tree_items(self.tree_widget, inserted_items)
+        finally:
+            self.tree_widget.setUpdatesEnabled(updates_enabled)
+        self.tree_widget.scrollToItem(inserted_items[0])
+
+    @contextlib.contextmanager
+    def block_model_signals(self):
+        """
+        Set data on items without the view handling every single change, it's repainted once at the end.
+        Don't add or remove items within, the view wouldn't know about them.
+        """
+        model = self.tree_widget.model()
+        signals_blocked = model.blockSignals(True)
+        try:
+            yield
+        finally:
+            model.blockSignals(signals_blocked)
+            self.tree_widget.viewport().update()
+
+    def replace_child_rows(
+            self, parent_item, removed_rows, removed_items, inserted_rows, inserted_items, expanded_items=None):
+        """
+        Take items out of a parent and put items into it, items that are in both are moved
+
+        :param parent_item:
+        :param removed_rows: rows of the removed items before the change
+        :param removed_items:
+        :param inserted_rows: rows of the inserted items after the change
+        :param inserted_items:
+        :param expanded_items: set of taken out items that were expanded, removed items are added to it
+            and inserted items in it are expanded again
+        :return: inserted items that weren't moved
+        """
+        self.item_children_changed(parent_item)
+
+        removed_item_set = set(removed_items)
+        inserted_item_set = set(inserted_items)
+        taken_items = [item for item in removed_items if item not in inserted_item_set]
+        added_items = [item for item in inserted_items if item not in removed_item_set]
+
+        self.remove_child_keys(parent_item, taken_items)
+        self.remove_items_from_filter_index(taken_items)
+        clear_json_spans(taken_items)
+        clear_json_spans(added_items)
+        if expanded_items is not None:
+            expanded_items.update(item for item in removed_items if item.isExpanded())
+
+        run_count = len(get_row_ranges(sorted(removed_rows))) + len(get_row_ranges(sorted(inserted_rows)))
+        if run_count > max(lk.rebuild_children_run_count,
+                           parent_item.childCount() // lk.rebuild_children_rows_per_run):
+            rebuild_child_rows(parent_item, removed_rows, inserted_rows, inserted_items)
+        else:
+            take_child_rows(parent_item, removed_rows)
+            insert_child_rows(parent_item, inserted_rows, inserted_items)
+
+        self.add_child_keys(parent_item, added_items)
+        self.add_items_to_filter_index(added_items)
+        if expanded_items:
+            for item in inserted_items:
+                if item in expanded_items:
+                    item.setExpanded(True)
+
+        changed_rows = list(removed_rows) + list(inserted_rows)
+        if changed_rows:
+            self.update_list_indices(parent_item, min(changed_rows))
+        return added_items
+
+    def set_items_data(self, entries, undo=False):
+        """
+        Set data on many items at once, then update the key indexes, the filter index and what needs to be saved
+
+        :param entries: (item, column, role, old data, new data)
+        :param undo: set the old data instead of the new data
+        :return:
+        """
+        data_index = 3 if undo else 4
+        with self.block_model_signals():
+            for entry in entries:
+                if entry[2] == lk.role_value:
+                    entry[0].setData(entry[1], entry[2], None)  # Qt keeps a value that compares equal, like True for 1
+                entry[0].setData(entry[1], entry[2], entry[data_index])
+
+        filter_columns = self._filter_index.search_columns if self._filter_index is not None else ()
+        dirty_items = OrderedDict()
+        filter_items = OrderedDict()
+        for entry in entries:
+            item, column, role = entry[:3]
+            parent_item = self.get_parent(item)
+            if column == lk.col_type:
+                dirty_items[item] = None  # might be written as another kind of container now
+            else:
+                dirty_items[parent_item] = None  # scalars aren't written on their own
+
+            if role != QtCore.Qt.DisplayRole:
+                continue
+
+            if column == lk.col_key:
+                key_index = self._child_key_indexes.get(parent_item)
+                if key_index is not None:
+                    key_index.rename_item(item)
+                    if key_index.get_key_count(entry[data_index]) > 1:
+                        print("Key '{}' is used more than once, only one of them will be saved".format(
+                            entry[data_index]))
+
+            if column in filter_columns:
+                filter_items[item] = None
+
+        for item in dirty_items:
+            mark_item_dirty(item)
+        for item in filter_items:
+            self._filter_index.update_item(item)
+
+    def set_unfetched_data(self, items, unfetched_data, fetched_children, taken_children):
+        """
+        Set the data of container items whose children haven't been created yet
+
+        :param items:
+        :param unfetched_data: UnfetchedData of each item
+        :param fetched_children: {item: child items}, these are put back instead of the data
+        :param taken_children: gets the children of items that were expanded since, they're taken out
+        :return:
+        """
+        unfetched_items = []
+        for item, data in zip(items, unfetched_data):
+            if not is_fetched(item):
+                if item not in fetched_children:
+                    unfetched_items.append((item, data))
+                    continue
+            else:
+                item.setExpanded(False)
+                self._child_key_indexes.pop(item, None)
+                child_items = item.takeChildren()
+                self.remove_items_from_filter_index(child_items)
+                clear_json_spans(child_items)
+                taken_children[item] = child_items
+
+            child_items = fetched_children.pop(item, None)
+            if child_items is None:
+                unfetched_items.append((item, data))
+                item.setChildIndicatorPolicy(QtWidgets.QTreeWidgetItem.ShowIndicator)
+                continue
+
+            item.setData(lk.col_value, lk.role_unfetched_data, None)
+            clear_json_spans(child_items)
+            item.addChildren(child_items)
+            item.setData(lk.col_value, lk.role_has_list_buckets, bool(child_items) and is_list_bucket(child_items[0]))
+            self.add_items_to_filter_index(child_items)
+            item.setText(lk.col_value, get_item_count_text(get_list_length(item)))
+            item.setChildIndicatorPolicy(QtWidgets.QTreeWidgetItem.DontShowIndicatorWhenChildless)
+
+        with self.block_model_signals():
+            for item, data in unfetched_items:
+                item.setData(lk.col_value, lk.role_unfetched_data, data)
+                item.setText(lk.col_value, get_item_count_text(get_unfetched_item_count(data)))
+
+        for item in items:
+            mark_item_dirty(item)
+
+        if self._filter_index is not None and lk.col_value in self._filter_index.search_columns:
+            for item in items:
+                self._filter_index.update_item(item)
+
+
+class UnfetchedData(object):
     """
-    if key_name == "":
-        key_name = "KEY_0"
+    Holds the data of a container item until its children are created.
+    Wrapped so Qt stores the python object as is, instead of converting it to a QVariantMap/List
+    """
+    __slots__ = ("value", "row_tokens")
 
-    existing_keys = [i.text(lk.col_key) for i in get_sub_widgets(parent_item)]
-    if key_name and key_name not in existing_keys:
-        return key_name
+    def __init__(self, value):
+        self.value = value
+        self.row_tokens = None  # hashes of the rows of a range, see get_item_content
 
-    if not key_name[-1].isdigit():
-        key_name += "_0"
 
-    while key_name in existing_keys:
-        old_index = re.findall(r'\d+', key_name)[-1]
-        key_name_without_last_number = key_name[:-len(str(old_index))]
-        key_name = key_name_without_last_number + str(int(old_index) + 1)
+def create_widget_item(data_key, data_value):
+    """
+    Create a tree item for the data, containers only get their child items once they're fetched
 
-    return key_name
+    :param data_key:
+    :param data_value:
+    :return:
+    """
+    data_type_name = type(data_value).__name__
+
+    if isinstance(data_value, DeferredContainer):
+        # still in the file, read when expanded
+        widget_item = QtWidgets.QTreeWidgetItem(
+            [data_key, get_item_count_text(data_value.item_count), data_value.data_type.__name__]
+        )
+        if data_value.item_count:
+            widget_item.setData(lk.col_value, lk.role_unfetched_data, UnfetchedData(data_value))
+            widget_item.setChildIndicatorPolicy(QtWidgets.QTreeWidgetItem.ShowIndicator)
+
+    elif isinstance(data_value, lk.supports_children_types):
+        widget_item = QtWidgets.QTreeWidgetItem([data_key, get_item_count_text(len(data_value)), data_type_name])
+        if data_value:
+            data_value = numeric_list.pack_values(data_value) or data_value
+            widget_item.setData(lk.col_value, lk.role_unfetched_data, UnfetchedData(data_value))
+            widget_item.setChildIndicatorPolicy(QtWidgets.QTreeWidgetItem.ShowIndicator)
+    else:
+        widget_item = QtWidgets.QTreeWidgetItem([data_key, str(data_value), data_type_name])
+        set_item_value(widget_item, data_value)
+
+    if isinstance(data_value, (DeferredContainer,) + lk.supports_children_types):
+        widget_item.setData(lk.col_value, lk.role_json_span, JsonSpan())
+
+    widget_item.setFlags(widget_item.flags() | QtCore.Qt.ItemIsEditable)
+    return widget_item
+
+
+def create_child_items(data_value, first_index=0):
+    """
+    :param data_value:
+    :param first_index: list index of the first value, for the rows of a range of a big list
+    :return:
+    """
+    if isinstance(data_value, lk.dict_types):
+        return [create_widget_item(k, v) for k, v in data_value.items()]
+    if len(data_value) > lk.list_bucket_size:
+        return create_bucket_items(data_value, first_index)
+    return [create_widget_item("[{}]".format(first_index + i), v) for i, v in enumerate(data_value)]
+
+
+def iter_child_items(data_value):
+    """
+    :param data_value: data of the root
+    :return: generator of the items create_child_items() makes, each one is created when it's asked for
+    """
+    if isinstance(data_value, lk.dict_types):
+        return (create_widget_item(k, v) for k, v in data_value.items())
+    if not isinstance(data_value, lk.supports_children_types):
+        return iter([create_widget_item("", data_value)])
+    if len(data_value) > lk.list_bucket_size:
+        return iter(create_bucket_items(data_value))
+    return (create_widget_item("[{}]".format(i), v) for i, v in enumerate(data_value))
+
+
+def create_bucket_items(data_value, first_index=0):
+    """
+    Split a big list into range items, ranges of ranges if there would be too many of them
+
+    :param data_value: list with more than lk.list_bucket_size values
+    :param first_index: list index of the first value
+    :return:
+    """
+    bucket_size = lk.list_bucket_size
+    while len(data_value) > bucket_size * lk.list_bucket_size:
+        bucket_size *= lk.list_bucket_size
+
+    return [
+        create_bucket_item(data_value[start:start + bucket_size], first_index + start)
+        for start in range(0, len(data_value), bucket_size)
+    ]
+
+
+def create_bucket_item(data_value, start):
+    """
+    Create an item for a range of rows of a big list, the rows are created when it's expanded.
+    It isn't editable, its key and item count follow from the rows in it.
+
+    :param data_value: values of the rows
+    :param start: list index of the first row
+    :return:
+    """
+    data_value = numeric_list.pack_values(data_value) or list(data_value)
+    item_count = len(data_value)
+    widget_item = QtWidgets.QTreeWidgetItem([
+        lk.list_bucket_key_format.format(start, start + item_count - 1),
+        get_item_count_text(item_count),
+        list.__name__,
+    ])
+    widget_item.setData(lk.col_value, lk.role_list_bucket, ListBucket(start, item_count))
+    if item_count:
+        widget_item.setData(lk.col_value, lk.role_unfetched_data, UnfetchedData(data_value))
+        widget_item.setChildIndicatorPolicy(QtWidgets.QTreeWidgetItem.ShowIndicator)
+    return widget_item
+
+
+def fetch_children(tree_widget_item):
+    """
+    Create the child items of a container item that hasn't been expanded yet
+
+    :param tree_widget_item:
+    :return: True if children were created
+    """
+    unfetched_data = tree_widget_item.data(lk.col_value, lk.role_unfetched_data)
+    if unfetched_data is None:
+        return False
+
+    data_value = unfetched_data.value
+    if isinstance(data_value, DeferredContainer):
+        data_value = data_value.load(max_depth=1)
+
+    # not an edit, so don't let the tree report it as one
+    tree_widget = tree_widget_item.treeWidget()
+    signals_blocked = tree_widget.blockSignals(True) if tree_widget else False
+
+    # adding the children first makes an expanded view lay itself out later, instead of looking for the item
+    # in all of its rows to update it
+    child_items = create_child_items(data_value, get_list_start(tree_widget_item))
+    if unfetched_data.row_tokens is not None:
+        store_row_hashes(child_items, unfetched_data.row_tokens)
+    tree_widget_item.addChildren(child_items)
+    tree_widget_item.setData(lk.col_value, lk.role_unfetched_data, None)
+    if child_items and is_list_bucket(child_items[0]):
+        tree_widget_item.setData(lk.col_value, lk.role_has_list_buckets, True)
+    tree_widget_item.setChildIndicatorPolicy(QtWidgets.QTreeWidgetItem.DontShowIndicatorWhenChildless)
+
+    if tree_widget:
+        root_item = tree_widget.invisibleRootItem()
+        if child_items and not root_item.data(lk.col_value, lk.role_has_deep_items) \
+                and is_deep_item(tree_widget_item):
+            root_item.setData(lk.col_value, lk.role_has_deep_items, True)
+        tree_widget.blockSignals(signals_blocked)
+    return True
+
+
+def store_row_hashes(child_items, row_tokens):
+    """
+    The rows of an expanded range keep the hashes they had, see get_item_content
+
+    :param child_items: new rows and ranges of the range
+    :param row_tokens: row_tokens of its UnfetchedData
+    :return:
+    """
+    position = 0
+    for child_item in child_items:
+        list_bucket = child_item.data(lk.col_value, lk.role_list_bucket)
+        if list_bucket is not None:
+            child_item.data(lk.col_value, lk.role_unfetched_data).row_tokens = \
+                row_tokens[position:position + list_bucket.count]
+            position += list_bucket.count
+            continue
+
+        row_token = row_tokens[position]
+        position += 1
+        if row_token.startswith(content_hash.lk.hash_prefix):
+            child_item.data(lk.col_value, lk.role_json_span).content_hash = row_token[len(content_hash.lk.hash_prefix):]
+
+
+def is_deep_item(tree_widget_item):
+    """
+    :param tree_widget_item:
+    :return: True if the item is at least lk.deep_item_depth levels below the top level items
+    """
+    for _ in range(lk.deep_item_depth):
+        tree_widget_item = tree_widget_item.parent()
+        if tree_widget_item is None:
+            return False
+    return True
+
+
+def clear_tree_items(tree_widget):
+    """
+    Same as tree_widget.clear(), but deep trees are deleted from the bottom up a few levels at a time.
+    Qt deletes the children of an item recursively and runs out of stack on items nested tens of thousands deep.
+
+    :param tree_widget:
+    :return:
+    """
+    root_item = tree_widget.invisibleRootItem()
+    if not root_item.data(lk.col_value, lk.role_has_deep_items):
+        tree_widget.clear()
+        return
+
+    root_item.setData(lk.col_value, lk.role_has_deep_items, None)
+    # taking out items looks for the parents of every selected range and expanded item
+    tree_widget.clearSelection()
+    tree_widget.collapseAll()
+    top_level_items = root_item.takeChildren()  # out of the view, so deleting them doesn't update it
+    chain_items = [item for top_level_item in top_level_items
+                   for item, depth in walk_items(top_level_item, fetch=False)
+                   if depth and not depth % lk.deleted_item_chain_depth]
+    for item in reversed(chain_items):
+        shiboken2.delete(item)
+    for top_level_item in top_level_items:
+        shiboken2.delete(top_level_item)
+
+
+def is_deferred(tree_widget_item):
+    unfetched_data = tree_widget_item.data(lk.col_value, lk.role_unfetched_data)
+    return unfetched_data is not None and isinstance(unfetched_data.value, DeferredContainer)
+
+
+def is_fetched(tree_widget_item):
+    return tree_widget_item.data(lk.col_value, lk.role_unfetched_data) is None
+
+
+def is_packed(tree_widget_item):
+    """
+    :param tree_widget_item:
+    :return: True if the item is a list of numbers whose rows haven't been created, they're kept in an array
+    """
+    unfetched_data = tree_widget_item.data(lk.col_value, lk.role_unfetched_data)
+    return unfetched_data is not None and numeric_list.is_packed(unfetched_data.value)
+
+
+def get_list_bucket(tree_widget_item):
+    """
+    :param tree_widget_item:
+    :return: ListBucket if the item is a range of a big list, otherwise None
+    """
+    return tree_widget_item.data(lk.col_value, lk.role_list_bucket)
+
+
+def is_list_bucket(tree_widget_item):
+    return tree_widget_item.data(lk.col_value, lk.role_list_bucket) is not None
+
+
+def has_list_buckets(tree_widget_item):
+    """
+    :param tree_widget_item:
+    :return: True if the children of the list item include ranges of rows, they're only created along with the rows
+    """
+    return bool(tree_widget_item.data(lk.col_value, lk.role_has_list_buckets))
 
 
-def fix_list_indices(parent_item):
+def get_list_start(tree_widget_item):
+    """
+    :param tree_widget_item:
+    :return: list index of the first row of a range item, 0 for other items
+    """
+    list_bucket = tree_widget_item.data(lk.col_value, lk.role_list_bucket)
+    return list_bucket.start if list_bucket is not None else 0
+
+
+def iter_list_rows(list_item):
+    """
+    :param list_item: fetched list or range item
+    :return: generator of the row items of the list, going into its ranges.
+        Ranges that haven't been expanded give their UnfetchedData instead
+    """
+    check_buckets = has_list_buckets(list_item)
+    for row in range(list_item.childCount()):
+        child_item = list_item.child(row)
+        if not check_buckets or not is_list_bucket(child_item):
+            yield child_item
+            continue
+
+        unfetched_data = child_item.data(lk.col_value, lk.role_unfetched_data)
+        if unfetched_data is not None:
+            yield unfetched_data
+        else:
+            for row_item in iter_list_rows(child_item):
+                yield row_item
+
+
+def get_first_list_index(tree_widget_item):
+    """
+    :param tree_widget_item: child of a list or range item
+    :return: list index of the row, or of the first row of a range. None if the key isn't a list index
+    """
+    list_bucket = tree_widget_item.data(lk.col_value, lk.role_list_bucket)
+    if list_bucket is not None:
+        return list_bucket.start
+
+    key_text = tree_widget_item.text(lk.col_key)
+    if key_text.startswith("[") and key_text.endswith("]") and key_text[1:-1].isdigit():
+        return int(key_text[1:-1])
+    return None
+
+
+def get_key_list_index(key_text):
+    """
+    :param key_text: key of a list row like "[3]", or of a range like "[0...9999]"
+    :return: the (first) list index in the key, None if it isn't a list key
+    """
+    if not key_text.startswith("[") or not key_text.endswith("]"):
+        return None
+    index_text = key_text[1:-1].split(u"\u2026", 1)[0]
+    return int(index_text) if index_text.isdigit() else None
+
+
+def get_item_key_path(tree_widget_item):
+    """
+    Unlike a data path this includes the ranges of big lists, so it can lead to a range item.
+
+    :param tree_widget_item:
+    :return: tuple of the key column texts from the top level item down to the item
+    """
+    key_path = []
+    while tree_widget_item is not None:
+        key_path.append(tree_widget_item.text(lk.col_key))
+        tree_widget_item = tree_widget_item.parent()
+    return tuple(reversed(key_path))
+
+
+def get_list_entry(list_item, index):
+    """
+    Find a list index among the children of a fetched list or range item, going into the ranges that are expanded.
+    Rows show their list index and ranges know their first one, so the children are searched by those.
+
+    :param list_item:
+    :param index: list index, counted from the first row of the item
+    :return: (row item, None), or (range item that hasn't been expanded, index within it).
+        (None, None) if there's no row at the index
+    """
+    child_count = list_item.childCount()
+    if not has_list_buckets(list_item):
+        return (list_item.child(index), None) if 0 <= index < child_count else (None, None)
+    if index < 0:
+        return None, None
+
+    list_index = get_list_start(list_item) + index
+    child_item = find_list_child(list_item, list_index)
+    if child_item is None:
+        return None, None
+    list_bucket = get_list_bucket(child_item)
+    if list_bucket is None:
+        return (child_item, None) if get_first_list_index(child_item) == list_index else (None, None)
+
+    bucket_index = list_index - list_bucket.start
+    if bucket_index >= list_bucket.count:
+        return None, None
+    if not is_fetched(child_item):
+        return child_item, bucket_index
+    return get_list_entry(child_item, bucket_index)
+
+
+def find_list_child(list_item, list_index):
+    """
+    :param list_item: fetched list or range item that has ranges among its children
+    :param list_index: list index, counted from the start of the whole list
+    :return: last child whose first list index is at or before the list index, None if there's no such child
+        or the keys aren't list indices
+    """
+    low, high = 0, list_item.childCount()
+    while low < high:
+        middle = (low + high) // 2
+        middle_index = get_first_list_index(list_item.child(middle))
+        if middle_index is None:
+            return None
+        if middle_index <= list_index:
+            low = middle + 1
+        else:
+            high = middle
+    return list_item.child(low - 1) if low else None
+
+
+def get_list_length(list_item):
+    """
+    :param list_item: fetched list or range item
+    :return: number of rows in the list, counting the rows in its ranges
+    """
+    child_count = list_item.childCount()
+    if not child_count or not has_list_buckets(list_item):
+        return child_count
+
+    last_item = list_item.child(child_count - 1)
+    last_index = get_first_list_index(last_item)
+    if last_index is None:
+        return child_count
+
+    list_bucket = get_list_bucket(last_item)
+    return last_index + (list_bucket.count if list_bucket is not None else 1) - get_list_start(list_item)
+
+
+def get_new_dict_row(parent_item, data, data_path, dict_rows):
+    """
+    :param parent_item: dict item
+    :param data: new data
+    :param data_path: of a child of the dict
+    :param dict_rows: {dict item: {key: row}} the rows of the keys are looked up once per dict
+    :return: row of the key in the new data
+    """
+    key_rows = dict_rows.get(parent_item)
+    if key_rows is None:
+        key_rows = dict((key, row) for row, key in enumerate(data_diff.get_path_value(data, data_path[:-1])))
+        dict_rows[parent_item] = key_rows
+    return key_rows[data_path[-1]]
+
+
+def get_item_count_text(item_count):
+    return "-------- {} items --------".format(item_count)
+
+
+def get_sub_widgets(tree_widget_item):
+    fetch_children(tree_widget_item)
+    return [tree_widget_item.child(i) for i in range(tree_widget_item.childCount())]
+
+
+def get_dict_entries(dict_item):
+    """
+    :param dict_item:
+    :return: (key, child item) of a dict item. A key that's used more than once is where it's first used,
+        with its last item, the same as in the dict that get_data() makes
+    """
+    entries = [(child_item.text(lk.col_key), child_item) for child_item in get_sub_widgets(dict_item)]
+    key_items = OrderedDict(entries)
+    if len(key_items) < len(entries):
+        return list(key_items.items())
+    return entries
+
+
+def get_item_data_recursive(tree_widget_item):
+    unfetched_data = tree_widget_item.data(lk.col_value, lk.role_unfetched_data)
+    if unfetched_data is not None:
+        # never been expanded, so the data can't have been edited
+        if isinstance(unfetched_data.value, DeferredContainer):
+            return unfetched_data.value.load()
+        return numeric_list.unpack_values(unfetched_data.value)
+
+    data_type = get_data_type(tree_widget_item)
+
+    if data_type in lk.dict_type_names:
+        data_value = lk.types_by_name[data_type]()
+        for sub_widget in get_sub_widgets(tree_widget_item):
+            data_value[sub_widget.text(lk.col_key)] = get_item_data_recursive(sub_widget)
+        return data_value
+
+    if data_type in lk.list_type_names:
+        if has_list_buckets(tree_widget_item):
+            data_value = []
+            for sub_widget in get_sub_widgets(tree_widget_item):
+                if is_list_bucket(sub_widget):
+                    data_value.extend(get_item_data_recursive(sub_widget))
+                else:
+                    data_value.append(get_item_data_recursive(sub_widget))
+        else:
+            data_value = [get_item_data_recursive(sub_widget) for sub_widget in get_sub_widgets(tree_widget_item)]
+        if data_type != list.__name__:
+            data_value = lk.types_by_name[data_type](data_value)
+        return data_value
+
+    return get_item_value(tree_widget_item)
+
+
+def get_item_data_iterative(tree_widget_item):
+    """Same as get_item_data_recursive(), for items nested deeper than the recursion limit"""
+    root_value = []
+    # (container, is dict, has list buckets) that the items at each depth go into, the ranges of big lists
+    # put their rows straight into their list
+    containers = [(root_value, False, False)]
+    converted_entries = []  # (container, key, list that becomes the data type, data type), in the order they're made
+
+    for item, depth in walk_items(tree_widget_item, fetch=False):
+        del containers[depth + 1:]
+        parent_value, parent_is_dict, parent_has_buckets = containers[depth]
+
+        unfetched_data = item.data(lk.col_value, lk.role_unfetched_data)
+        is_bucket = parent_has_buckets and is_list_bucket(item)
+        data_type = get_data_type(item)
+        if unfetched_data is not None:
+            # never been expanded, so the data can't have been edited
+            data_value = unfetched_data.value
+            if isinstance(data_value, DeferredContainer):
+                data_value = data_value.load()
+            else:
+                data_value = numeric_list.unpack_values(data_value)
+            if is_bucket:
+                parent_value.extend(data_value)
+                continue
+        elif is_bucket:
+            containers.append(containers[depth])
+            continue
+        elif data_type in lk.dict_type_names:
+            data_value = lk.types_by_name[data_type]()
+            containers.append((data_value, True, False))
+        elif data_type in lk.list_type_names:
+            data_value = []
+            containers.append((data_value, False, has_list_buckets(item)))
+        else:
+            data_value = get_item_value(item)
+
+        if parent_is_dict:
+            key = item.text(lk.col_key)
+            parent_value[key] = data_value
+        else:
+            key = len(parent_value)
+            parent_value.append(data_value)
+
+        if unfetched_data is None and data_type in lk.list_type_names and data_type != list.__name__:
+            converted_entries.append((parent_value, key, data_value, data_type))
+
+    # containers within containers were made after them, so going backwards they're converted first
+    for parent_value, key, data_value, data_type in reversed(converted_entries):
+        parent_value[key] = lk.types_by_name[data_type](data_value)
+    return root_value[0]
+
+
+def iter_item_children(tree_widget_item):
+    return (tree_widget_item.child(row) for row in range(tree_widget_item.childCount()))
+
+
+def iter_fetched_item_children(tree_widget_item):
+    fetch_children(tree_widget_item)
+    return iter_item_children(tree_widget_item)
+
+
+def walk_items(tree_widget_item, fetch=True):
+    """
+    :param tree_widget_item:
+    :param fetch: create the children of items that haven't been expanded yet
+    :return: generator of (item, depth) of the item and all items below it in the order they're shown,
+             see tree_walk.walk()
+    """
+    return tree_walk.walk(tree_widget_item, iter_fetched_item_children if fetch else iter_item_children)
+
+
+def iter_item_descendants(tree_widget_item, fetch=True):
+    """
+    :param tree_widget_item:
+    :param fetch: create the children of items that haven't been expanded yet
+    :return: generator of the items below the item, in the order they're shown
+    """
+    items = walk_items(tree_widget_item, fetch=fetch)
+    next(items)
+    for item, _ in items:
+        yield item
+
+
+class BigIntValue(object):
+    """Holds ints that don't fit in a QVariant"""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+def set_item_value(tree_widget_item, data_value):
+    stored_value = get_stored_value(data_value)
+    if type(tree_widget_item.data(lk.col_value, lk.role_value)) is not type(stored_value):
+        # Qt keeps a value that compares equal, like True for 1. Clearing it isn't an edit
+        tree_widget = tree_widget_item.treeWidget()
+        signals_blocked = tree_widget.blockSignals(True) if tree_widget else False
+        tree_widget_item.setData(lk.col_value, lk.role_value, None)
+        if tree_widget:
+            tree_widget.blockSignals(signals_blocked)
+    tree_widget_item.setData(lk.col_value, lk.role_value, stored_value)
+
+
+def get_stored_value(data_value):
+    """
+    :param data_value:
+    :return: the value the way it's stored on an item
+    """
+    if isinstance(data_value, int) and not -lk.max_variant_int <= data_value <= lk.max_variant_int:
+        return BigIntValue(data_value)
+    return data_value
+
+
+def get_item_value(tree_widget_item):
+    data_value = tree_widget_item.data(lk.col_value, lk.role_value)
+    if isinstance(data_value, BigIntValue):
+        return data_value.value
+    return data_value
+
+
+def strip_letters(data_value):
+    return "".join([s for s in data_value if not s.isalpha()])
+
+
+def convert_text_to_int(data_value):
+    try:
+        return int(data_value)
+    except ValueError:
+        return int(strip_letters(data_value))
+
+
+def convert_text_to_float(data_value):
+    try:
+        return float(data_value)
+    except ValueError:
+        return float(strip_letters(data_value))
+
+
+def convert_text_to_bool(data_value):
+    # I let you be really sloppy with typing here
+    data_value = data_value.lower()
+    return data_value.startswith("t") or data_value in ("1", "y")
+
+
+text_converters = {
+    lk.none_type_name: lambda data_value: None,
+    bool.__name__: convert_text_to_bool,
+    int.__name__: convert_text_to_int,
+    float.__name__: convert_text_to_float,
+    str.__name__: str,
+}
+
+
+def convert_text_to_value(data_value, data_type):
+    """
+    Convert the text of a value column to the type in the type column
+
+    :param data_value: text to convert
+    :param data_type: type name
+    :return:
+    """
+    converter = text_converters.get(data_type)
+    if converter is not None:
+        return converter(data_value)
+
+    if data_type in lk.supports_children_type_names:
+        return lk.types_by_name[data_type]()
+
+    return data_value  # unknown types are kept as strings
+
+
+def convert_renamed_value(data_value, value_text):
+    """
+    :param data_value: value before the rename
+    :param value_text: renamed text of the value
+    :return: the text converted to the type of the value, or the value itself if the text can't be converted
+    """
+    data_type = type(data_value).__name__
+    try:
+        return convert_text_to_value(value_text, data_type)
+    except ValueError:
+        print("Could not convert '{}' to {}".format(value_text, data_type))
+        return data_value
+
+
+def rename_scalar_value(data_value, rename):
+    """
+    :param data_value:
+    :param rename: function that renames a string
+    :return: renamed value of the same type, or the value itself if the rename didn't change it
+    """
+    value_text = str(data_value)
+    renamed_text = rename(value_text)
+    if renamed_text == value_text:
+        return data_value
+    return convert_renamed_value(data_value, renamed_text)
+
+
+def iter_item_json_chunks(tree_widget_item, indent=None, snapshot=None):
+    """
+    Encode a tree item and its children the same way json.dump encodes the data they hold
+
+    Every container item remembers where it was written, when the snapshot of that output is passed in
+    the containers that haven't been edited since are copied from it instead of being encoded again.
+
+    :param tree_widget_item:
+    :param indent: same as json.dump
+    :param snapshot: JsonFileSnapshot of the file the previous chunks were written to
+    :return: generator of text chunks
+    """
+    if indent is not None and not isinstance(indent, string_types):
+        indent = " " * indent
+    item_separator = "," if indent is not None else ", "
+    data_encoder = json.JSONEncoder(indent=indent)
+    tree_widget = tree_widget_item.treeWidget()
+
+    if written_newline_size == 1:
+        written_size = len
+    else:
+        def written_size(text):
+            return len(text) + text.count("\n") * (written_newline_size - 1)
+
+    def encode_data(data_value):
+        try:
+            return data_encoder.encode(data_value)
+        except RuntimeError:  # RecursionError in python 3
+            return "".join(iter_encode_json(data_value, indent=indent))
+
+    def encode_item(item, data_type, level):
+        """
+        :return: (text, child items or None when the text holds the whole value), dicts give (key, child item)
+        """
+        unfetched_data = item.data(lk.col_value, lk.role_unfetched_data)
+        if unfetched_data is not None:
+            data_value = unfetched_data.value
+            if isinstance(data_value, DeferredContainer):
+                data_value = data_value.load()
+
+            item_text = encode_data(numeric_list.unpack_values(data_value))
+            if indent is not None and level:
+                # encoded strings never hold raw newlines, so this only touches the indentation
+                item_text = item_text.replace("\n", "\n" + indent * level)
+            return item_text, None
+
+        if data_type not in lk.supports_children_type_names:
+            return encode_json_scalar(get_item_value(item)), None
+
+        if data_type in lk.dict_type_names:
+            dict_entries = get_dict_entries(item)
+            if not dict_entries:
+                return "{}", None
+            return "{", dict_entries
+
+        if not has_list_buckets(item):
+            child_items = get_sub_widgets(item)
+            if not child_items:
+                return "[]", None
+            return "[", child_items
+
+        # rows in the ranges of big lists are written as rows of the list
+        child_items = iter_list_rows(item)
+        first_child_item = next(child_items, None)
+        if first_child_item is None:
+            return "[]", None
+        return "[", itertools.chain([first_child_item], child_items)
+
+    def encode_list_values(data_value, level):
+        """
+        :return: text of the values of a range that hasn't been expanded, as it's written within its list
+        """
+        values_text = encode_data(numeric_list.unpack_values(data_value))
+        if indent is None:
+            return values_text[1:-1]
+        values_text = values_text.replace("\n", "\n" + indent * (level - 1))
+        return values_text[1:values_text.rindex("\n")]
+
+    def store_span(item, start, size):
+        json_span = item.data(lk.col_value, lk.role_json_span)
+        if json_span is None:
+            # setting data on an item counts as an edit of it otherwise
+            signals_blocked = tree_widget.blockSignals(True) if tree_widget else False
+            json_span = JsonSpan()
+            item.setData(lk.col_value, lk.role_json_span, json_span)
+            if tree_widget:
+                tree_widget.blockSignals(signals_blocked)
+
+        json_span.start = start
+        json_span.size = size
+        json_span.dirty = False
+
+    position = 0
+    stack = []
+
+    # item to write next: (item, text before it, indentation level, parent start, parent start in the snapshot)
+    pending = (tree_widget_item, "", 0, 0, 0 if snapshot is not None else None)
+    try:
+        while pending is not None or stack:
+            if pending is None:
+                container_entry = stack[-1]
+                child_iterator, is_dict, level, is_first_child, item, item_start, old_start, parent_start = container_entry
+
+                child_item = next(child_iterator, None)
+                if child_item is None:
+                    stack.pop()
+                    closing_text = "}" if is_dict else "]"
+                    if indent is not None:
+                        closing_text = "\n" + indent * (level - 1) + closing_text
+                    yield closing_text
+                    position += written_size(closing_text)
+                    store_span(item, item_start - parent_start, position - item_start)
+                    continue
+
+                prefix = "" if is_first_child else item_separator
+                container_entry[3] = False
+                if isinstance(child_item, UnfetchedData):
+                    chunk = prefix + encode_list_values(child_item.value, level)
+                    yield chunk
+                    position += written_size(chunk)
+                    continue
+
+                if indent is not None:
+                    prefix += "\n" + indent * level
+                if is_dict:
+                    child_key, child_item = child_item
+                    prefix += encode_basestring_ascii(child_key) + ": "
+
+                pending = (child_item, prefix, level, item_start, old_start)
+
+            item, prefix, level, parent_start, parent_old_start = pending
+            pending = None
+
+            item_start = position + written_size(prefix)
+            old_start = None
+            data_type = get_data_type(item)
+            is_container = data_type in lk.supports_children_type_names
+
+            if is_container and parent_old_start is not None:
+                json_span = item.data(lk.col_value, lk.role_json_span)
+                if json_span is not None and json_span.start is not None:
+                    old_start = parent_old_start + json_span.start
+                    if not json_span.dirty:
+                        # unchanged since the snapshot was written
+                        chunk = prefix + snapshot.read(old_start, json_span.size)
+                        json_span.start = item_start - parent_start
+                        position = item_start + json_span.size
+                        yield chunk
+                        continue
+
+            item_text, child_items = encode_item(item, data_type, level)
+            chunk = prefix + item_text
+            yield chunk
+            position += written_size(chunk)
+
+            if child_items is not None:
+                is_dict = data_type in lk.dict_type_names
+                stack.append([iter(child_items), is_dict, level + 1, True, item, item_start, old_start, parent_start])
+            elif is_container:
+                store_span(item, item_start - parent_start, position - item_start)
+    finally:
+        if snapshot is not None:
+            snapshot.close()
+
+
+class TreeQueryAdapter(json_query.DataAdapter):
+    """
+    Runs json queries over the items of a DataTreeWidget.
+    Items that haven't been expanded are searched through the data they hold, without creating their children
+    """
+
+    def __init__(self, data_tree_widget):
+        super(TreeQueryAdapter, self).__init__()
+        self.data_tree_widget = data_tree_widget
+
+    def get_kind(self, node):
+        if not isinstance(node, QtWidgets.QTreeWidgetItem):
+            return json_query.get_data_kind(node)
+
+        unfetched_data = node.data(lk.col_value, lk.role_unfetched_data)
+        if unfetched_data is not None:
+            return json_query.get_data_kind(unfetched_data.value)
+
+        data_type = get_data_type(node)
+        if data_type in lk.dict_type_names:
+            return json_query.lk.dict_kind
+        if data_type in lk.list_type_names:
+            return json_query.lk.list_kind
+        return None
+
+    def get_child(self, node, key):
+        if not isinstance(node, QtWidgets.QTreeWidgetItem):
+            return super(TreeQueryAdapter, self).get_child(node, key)
+
+        unfetched_data = node.data(lk.col_value, lk.role_unfetched_data)
+        if unfetched_data is not None:
+            return super(TreeQueryAdapter, self).get_child(unfetched_data.value, key)
+
+        if get_data_type(node) in lk.dict_type_names:
+            return self.data_tree_widget.get_child_key_index(node).get(key, json_query.missing)
+        if not isinstance(key, int):
+            return json_query.missing
+
+        child_item, bucket_index = get_list_entry(node, key)
+        if bucket_index is not None:
+            # in a range of a big list that hasn't been expanded
+            return child_item.data(lk.col_value, lk.role_unfetched_data).value[bucket_index]
+        return child_item if child_item is not None else json_query.missing
+
+    def get_length(self, node):
+        if not isinstance(node, QtWidgets.QTreeWidgetItem):
+            return super(TreeQueryAdapter, self).get_length(node)
+
+        unfetched_data = node.data(lk.col_value, lk.role_unfetched_data)
+        if unfetched_data is not None:
+            return super(TreeQueryAdapter, self).get_length(unfetched_data.value)
+        if get_data_type(node) in lk.dict_type_names:
+            return node.childCount()
+        return get_list_length(node)
+
+    def iter_children(self, node):
+        if not isinstance(node, QtWidgets.QTreeWidgetItem):
+            return super(TreeQueryAdapter, self).iter_children(node)
+
+        unfetched_data = node.data(lk.col_value, lk.role_unfetched_data)
+        if unfetched_data is not None:
+            return super(TreeQueryAdapter, self).iter_children(unfetched_data.value)
+
+        if get_data_type(node) in lk.dict_type_names:
+            child_items = [node.child(i) for i in range(node.childCount())]
+            return ((child_item.text(lk.col_key), child_item) for child_item in child_items)
+        return enumerate(self.iter_list_values(node))
+
+    def iter_list_values(self, node):
+        """
+        :return: generator of the row items of a list item, and the values of its ranges that haven't been expanded
+        """
+        for row_item in iter_list_rows(node):
+            if isinstance(row_item, UnfetchedData):
+                for data_value in row_item.value:
+                    yield data_value
+            else:
+                yield row_item
+
+    def get_value(self, node):
+        if isinstance(node, QtWidgets.QTreeWidgetItem):
+            return get_item_value(node)
+        return node
+
+
+class UnfetchedRow(object):
+    """A value in the data of a container item whose children haven't been created yet, see ItemFilterIndex"""
+    __slots__ = ("item", "parent_row", "key")
+
+    def __init__(self, item, parent_row, key):
+        self.item = item
+        self.parent_row = parent_row  # row of the container the value is in, None if that's the data of the item
+        self.key = key
+
+    def get_data_path(self):
+        """
+        :return: keys and list indices from the item to the value
+        """
+        data_path = []
+        row = self
+        while row is not None:
+            data_path.append(row.key)
+            row = row.parent_row
+        return tuple(reversed(data_path))
+
+
+class ItemFilterIndex(object):
+    """
+    Lowercase text of the searched columns of every item, joined into one string.
+    So a filter is a few str.find calls instead of lowering the text of every item again.
+
+    Items that haven't been expanded are indexed through their data, as UnfetchedRows with the text their
+    items would show. So the items are only created for the matches. Containers that are still in a file
+    aren't read for the index, they're searched once they're expanded.
+
+    Edited and added items are kept on the side until there's enough of them to be worth a rebuild
+    """
+    separator = "\0"  # can't be typed into the filter, so a match never spans two cells
+
+    def __init__(self, items, search_columns):
+        self.search_columns = search_columns
+        self.items = []  # items and UnfetchedRows
+        self.item_rows = {}
+        self.unfetched_items = {}  # item: (UnfetchedData, list start, rows of its data) as it was indexed
+
+        item_texts = []
+        for entry, item_text in self.iter_entries(items):
+            self.add_entry(entry)
+            item_texts.append(item_text)
+        self.text = "".join(item_text + self.separator for item_text in item_texts)
+
+        # start of every row, plus the end of the text
+        self.row_starts = array.array("q", [0])
+        row_start = 0
+        for item_text in item_texts:
+            row_start += len(item_text) + 1
+            self.row_starts.append(row_start)
+        self.indexed_row_count = len(self.items)
+
+        self.changed_rows = {}  # row: new text, or None if the item was removed
+        self._last_query = None
+        self._last_rows = []
+
+    def get_item_text(self, item):
+        return self.separator.join(item.text(col) for col in self.search_columns).lower()
+
+    def iter_entries(self, items):
+        """
+        :param items: items that aren't in the index yet
+        :return: generator of (item or UnfetchedRow, its text)
+        """
+        for item in items:
+            yield item, self.get_item_text(item)
+            unfetched_data = item.data(lk.col_value, lk.role_unfetched_data)
+            if unfetched_data is None:
+                continue
+            parent_rows = [None]  # rows only hold on to their parent, a path for each would grow with the depth
+            for depth, key, row_texts in iter_unfetched_rows(unfetched_data, get_list_start(item)):
+                del parent_rows[depth:]
+                row = UnfetchedRow(item, parent_rows[-1], key)
+                parent_rows.append(row)
+                yield row, self.separator.join(row_texts[col] for col in self.search_columns).lower()
+
+    def add_entry(self, entry):
+        """
+        :param entry: item or UnfetchedRow
+        :return: its row
+        """
+        row = len(self.items)
+        self.items.append(entry)
+        if isinstance(entry, UnfetchedRow):
+            self.unfetched_items[entry.item][2].append(row)
+            return row
+
+        self.item_rows[entry] = row
+        unfetched_data = entry.data(lk.col_value, lk.role_unfetched_data)
+        if unfetched_data is not None:
+            self.unfetched_items[entry] = (unfetched_data, get_list_start(entry), [])
+        return row
+
+    def update_unfetched_items(self):
+        """
+        Index the items that were expanded since they were indexed through their data, or that got other data
+
+        :return:
+        """
+        for item, (unfetched_data, list_start, rows) in list(self.unfetched_items.items()):
+            if item.data(lk.col_value, lk.role_unfetched_data) is unfetched_data and \
+                    get_list_start(item) == list_start:
+                continue
+
+            del self.unfetched_items[item]
+            for row in rows:
+                self.changed_rows[row] = None
+            self._last_query = None
+            if item not in self.item_rows:
+                continue  # taken out of the tree
+
+            unfetched_data = item.data(lk.col_value, lk.role_unfetched_data)
+            if unfetched_data is None:
+                self.add_items(list(iter_item_descendants(item, fetch=False)))
+                continue
+
+            self.unfetched_items[item] = (unfetched_data, get_list_start(item), [])
+            for entry, item_text in itertools.islice(self.iter_entries([item]), 1, None):
+                self.changed_rows[self.add_entry(entry)] = item_text
+
+    def get_row_text(self, row):
+        if row in self.changed_rows:
+            return self.changed_rows[row]
+        return self.text[self.row_starts[row]:self.row_starts[row + 1]]
+
+    def needs_rebuild(self):
+        return len(self.changed_rows) > max(1000, self.indexed_row_count // 10)
+
+    def update_item(self, item):
+        row = self.item_rows.get(item)
+        if row is None:
+            self.add_items([item])
+            return
+
+        self.changed_rows[row] = self.get_item_text(item)
+        self._last_query = None
+
+    def add_items(self, items):
+        items = [item for item in items if item not in self.item_rows]
+        for entry, item_text in self.iter_entries(items):
+            self.changed_rows[self.add_entry(entry)] = item_text
+        self._last_query = None
+
+    def remove_items(self, items):
+        for item in items:
+            row = self.item_rows.pop(item, None)
+            if row is not None:
+                self.changed_rows[row] = None
+            unfetched_entry = self.unfetched_items.pop(item, None)
+            if unfetched_entry is not None:
+                for row in unfetched_entry[2]:
+                    self.changed_rows[row] = None
+        self._last_query = None
+
+    def find_rows(self, query):
+        query = query.lower()
+        if self.separator in query:
+            return []
+
+        last_query = self._last_query
+        if last_query is not None and last_query in query and len(self._last_rows) * 8 < len(self.items):
+            # the query got longer, so only the previous matches can still match
+            rows = [row for row in self._last_rows if query in self.get_row_text(row)]
+        else:
+            rows = self.find_indexed_rows(query)
+            rows.extend(row for row, row_text in self.changed_rows.items() if row_text and query in row_text)
+
+        self._last_query = query
+        self._last_rows = rows
+        return rows
+
+    def find_indexed_rows(self, query):
+        rows = []
+        row_starts = self.row_starts
+        changed_rows = self.changed_rows
+        find = self.text.find
+
+        position = find(query)
+        while position != -1:
+            row = bisect.bisect_right(row_starts, position) - 1
+            if row not in changed_rows:
+                rows.append(row)
+            position = find(query, row_starts[row + 1])  # skip the rest of the row
+        return rows
+
+    def find_items(self, query):
+        """
+        :param query:
+        :return: matching items and UnfetchedRows
+        """
+        return [self.items[row] for row in self.find_rows(query)]
+
+
+def iter_unfetched_rows(unfetched_data, list_start=0):
+    """
+    Values in the data of an item whose children haven't been created, with the text their items would show.
+    The data of containers that are still in a file isn't read for this.
+
+    :param unfetched_data: UnfetchedData of the item
+    :param list_start: list index of the first value, for the rows of a range of a big list
+    :return: generator of (depth below the item, key or list index, (key text, value text, type text))
+        in the order the items would be shown
+    """
+    data_value = unfetched_data.value
+    if isinstance(data_value, DeferredContainer):
+        return
+
+    walk = tree_walk.walk_data(numeric_list.unpack_values(data_value))
+    next(walk)  # the data of the item itself
+    for (key, value), depth in walk:
+        key_text = key
+        if isinstance(key, int):
+            key_text = "[{}]".format(key + list_start if depth == 1 else key)
+
+        if isinstance(value, DeferredContainer):
+            yield depth, key, (key_text, get_item_count_text(value.item_count), value.data_type.__name__)
+        elif isinstance(value, lk.supports_children_types):
+            yield depth, key, (key_text, get_item_count_text(len(value)), type(value).__name__)
+        else:
+            yield depth, key, (key_text, str(value), type(value).__name__)
+
+
+class ChildKeyIndex(object):
+    """
+    Keys of the children of a dict item, so finding a child or a free key doesn't have to go over every child.
+    Searches for a free numbered key remember which numbers they skipped, so the next search can jump past them.
+    """
+
+    def __init__(self, child_items):
+        self.items_by_key = {}  # key: child items, keys can be used more than once while editing
+        self.item_keys = {}  # child item: key
+        self.taken_number_skips = {}  # key base: {taken number: number to continue the search at}
+        self.add_items(child_items)
+
+    def add_items(self, child_items):
+        for child_item in child_items:
+            key = child_item.text(lk.col_key)
+            self.item_keys[child_item] = key
+            self.items_by_key.setdefault(key, []).append(child_item)
+
+    def remove_items(self, child_items):
+        for child_item in child_items:
+            key = self.item_keys.pop(child_item, None)
+            if key is None:
+                continue
+
+            key_items = self.items_by_key[key]
+            key_items.remove(child_item)
+            if not key_items:
+                del self.items_by_key[key]
+                self.taken_number_skips.pop(get_key_base(key), None)  # a skipped number might be free now
+
+    def rename_item(self, child_item):
+        self.remove_items([child_item])
+        self.add_items([child_item])
+
+    def get(self, key, default=None):
+        """
+        :param key:
+        :param default:
+        :return: child item with the key, the one added last if the key is used more than once
+        """
+        key_items = self.items_by_key.get(key)
+        return key_items[-1] if key_items else default
+
+    def get_key_count(self, key):
+        return len(self.items_by_key.get(key, ()))
+
+    def get_unique_key(self, key_name=""):
+        """
+        Creates a unique key to use in the dictionary
+        +1 to end of name if key already exists
+
+        :param key_name:
+        :return:
+        """
+        if key_name == "":
+            key_name = "KEY_0"
+
+        if key_name not in self.items_by_key:
+            return key_name
+
+        if not key_name[-1].isdigit():
+            key_name += "_0"
+            if key_name not in self.items_by_key:
+                return key_name
+
+        key_base = get_key_base(key_name)
+        number = int(key_name[len(key_base):]) + 1
+
+        number_skips = self.taken_number_skips.setdefault(key_base, {})
+        skipped_numbers = []
+        while True:
+            if number in number_skips:
+                skipped_numbers.append(number)
+                number = number_skips[number]
+            elif key_base + str(number) in self.items_by_key:
+                skipped_numbers.append(number)
+                number += 1
+            else:
+                break
+
+        # everything from the skipped numbers up to this one is taken
+        for skipped_number in skipped_numbers:
+            number_skips[skipped_number] = number
+        return key_base + str(number)
+
+
+class JsonSpan(object):
+    """
+    Where a container item was last written to, relative to the start of its parent, and the hash of its content.
+    Marked dirty and the hash is cleared when the item or anything below it is edited.
+
+    Container items get one when they're created and it's updated in place,
+    setting data on an item that's already in the tree is slow.
+    """
+    __slots__ = ("start", "size", "dirty", "content_hash")
+
+    def __init__(self):
+        self.start = None  # not written yet
+        self.size = 0
+        self.dirty = False
+        self.content_hash = None  # not hashed yet, see get_item_hash
+
+
+class ListBucket(object):
+    """
+    Range of rows of a big list that's shown as one item, see create_bucket_items.
+    The list indices go on across the ranges, fix_list_indices updates them after an edit.
+    """
+    __slots__ = ("start", "count")
+
+    def __init__(self, start, count):
+        self.start = start  # list index of the first row
+        self.count = count  # rows in the range, counting the rows of the ranges in it
+
+
+def mark_item_dirty(tree_widget_item):
+    """
+    Mark the item and its parents as edited, so their last written json and their hash can't be reused
+
+    :param tree_widget_item:
+    :return:
+    """
+    tree_widget = tree_widget_item.treeWidget()
+    while tree_widget_item is not None:
+        json_span = tree_widget_item.data(lk.col_value, lk.role_json_span)
+        if json_span is not None:
+            if json_span.dirty and json_span.content_hash is None:
+                return  # parents were marked along with it, they're only hashed along with their children
+            json_span.dirty = True
+            json_span.content_hash = None
+        tree_widget_item = tree_widget_item.parent()
+
+    if tree_widget is not None:
+        json_span = tree_widget.invisibleRootItem().data(lk.col_value, lk.role_json_span)
+        if json_span is not None:
+            json_span.dirty = True
+            json_span.content_hash = None
+
+
+def clear_json_spans(tree_widget_items):
+    """
+    Forget where items were written, for items that are taken out of the tree or put back into it.
+    Other items are written again after a save and their spans are kept up to date, these might be put back
+    after the next save, or at another place in it.
+
+    :param tree_widget_items:
+    :return:
+    """
+    for tree_widget_item in tree_widget_items:
+        json_span = tree_widget_item.data(lk.col_value, lk.role_json_span)
+        if json_span is not None:
+            json_span.start = None  # its children are written again along with it
+
+
+def get_item_hash(tree_widget_item):
+    """
+    Containers keep their hash until they're edited, so hashing again only goes through the edited containers
+
+    :param tree_widget_item:
+    :return: hash of the data of the item, the same as content_hash.hash_data() of its data
+    """
+    return content_hash.get_content_hash(tree_widget_item, get_item_content, store_item_hash)
+
+
+def get_item_content(node):
+    """
+    get_content of content_hash.get_content_hash() for items,
+    and the UnfetchedData of ranges that haven't been expanded, which stand for all their rows
+
+    :param node:
+    :return:
+    """
+    if isinstance(node, UnfetchedData):
+        if node.row_tokens is None:
+            node.row_tokens = [content_hash.get_data_token(value) for value in numeric_list.unpack_values(node.value)]
+        return None, ",".join(node.row_tokens)
+
+    json_span = node.data(lk.col_value, lk.role_json_span)
+    if json_span is not None and json_span.content_hash is not None:
+        return None, content_hash.lk.hash_prefix + json_span.content_hash
+
+    unfetched_data = node.data(lk.col_value, lk.role_unfetched_data)
+    if unfetched_data is not None:
+        data_value = unfetched_data.value
+        if isinstance(data_value, DeferredContainer):
+            data_value = data_value.load()
+        node_hash = content_hash.hash_data(numeric_list.unpack_values(data_value))
+        if json_span is not None:
+            json_span.content_hash = node_hash
+        return None, content_hash.lk.hash_prefix + node_hash
+
+    data_type = get_data_type(node)
+    if data_type in lk.dict_type_names:
+        return "{", ((encode_json_key(child_key), child_item) for child_key, child_item in get_dict_entries(node))
+    if data_type in lk.list_type_names:
+        return "[", ((None, row) for row in iter_list_rows(node))
+    return None, encode_json_scalar(get_item_value(node))
+
+
+def store_item_hash(node, node_hash):
+    if isinstance(node, QtWidgets.QTreeWidgetItem):
+        json_span = node.data(lk.col_value, lk.role_json_span)
+        if json_span is not None:
+            json_span.content_hash = node_hash
+
+
+def get_data_type(tree_widget_item):
+    return tree_widget_item.text(lk.col_type)
+
+
+def item_supports_children(item):
+    return get_data_type(item) in lk.supports_children_type_names
+
+
+def get_unique_dict_key(parent_item, key_name=""):
+    """
+    Creates a unique key to use in a dictionary
+    +1 to end of name if key already exists
+
+    :param parent_item:
+    :param key_name:
+    :return:
+    """
+    return ChildKeyIndex(get_sub_widgets(parent_item)).get_unique_key(key_name)
+
+
+def get_key_base(key_name):
+    """
+    :param key_name:
+    :return: key without its trailing number
+    """
+    return key_name.rstrip("0123456789")
+
+
+def fix_list_indices(parent_item, first_row=0):
     """
     Sets the list indices on a list tree widget item
 
+    The rows of big lists are in range items and the indices go on across them. So for an edit within a range
+    the ranges after it get their new first index, but only the rows of ranges that were expanded are set again.
+
+    :param parent_item: list, dict or range item
+    :param first_row: children before this row already have the right index
+    :return: items whose text was changed
+    """
+    if not is_fetched(parent_item):
+        return []  # no child items to fix
+
+    data_type = get_data_type(parent_item)
+    if data_type not in lk.list_type_names:
+        if data_type not in lk.dict_type_names:
+            return []
+        parent_item.setText(lk.col_value, get_item_count_text(parent_item.childCount()))
+        return [parent_item]
+
+    # the edited item and the ranges it's in, with their first row that might have another index now
+    outdated_rows = {parent_item: first_row}
+    list_item = parent_item
+    while is_list_bucket(list_item):
+        bucket_item = list_item
+        list_item = bucket_item.parent()
+        if list_item is None:
+            list_item = bucket_item.treeWidget().invisibleRootItem()
+        outdated_rows[list_item] = list_item.indexOfChild(bucket_item)
+
+    changed_items = []
+    item_count = set_list_indices(list_item, 0, outdated_rows, changed_items)
+    list_item.setText(lk.col_value, get_item_count_text(item_count))
+    changed_items.append(list_item)
+    return changed_items
+
+
+def set_list_indices(parent_item, first_index, outdated_rows, changed_items):
+    """
+    Set the list index of the rows of a list or range item, and of the rows in ranges that start at another index now
+
+    :param parent_item:
+    :param first_index: list index of the first row
+    :param outdated_rows: {item: first row that might have another index}, ranges that aren't in it
+        only need to be set again if they start at another index
+    :param changed_items: items whose text was changed are added to it
+    :return: number of rows in the item, counting the rows in its ranges
+    """
+    first_row = outdated_rows.get(parent_item, 0)
+    if not has_list_buckets(parent_item):
+        for row in range(first_row, parent_item.childCount()):
+            child_item = parent_item.child(row)
+            child_item.setText(lk.col_key, "[{}]".format(first_index + row))
+            changed_items.append(child_item)
+        return parent_item.childCount()
+
+    index = first_index
+    for row in range(parent_item.childCount()):
+        child_item = parent_item.child(row)
+        list_bucket = child_item.data(lk.col_value, lk.role_list_bucket)
+        if list_bucket is None:
+            if row >= first_row:
+                child_item.setText(lk.col_key, "[{}]".format(index))
+                changed_items.append(child_item)
+            index += 1
+            continue
+
+        if list_bucket.start != index or child_item in outdated_rows:
+            if list_bucket.start != index:
+                outdated_rows[child_item] = 0
+
+            unfetched_data = child_item.data(lk.col_value, lk.role_unfetched_data)
+            if unfetched_data is None:
+                item_count = set_list_indices(child_item, index, outdated_rows, changed_items)
+            else:
+                item_count = len(unfetched_data.value)
+
+            if list_bucket.start != index or list_bucket.count != item_count:
+                list_bucket.start = index
+                list_bucket.count = item_count
+                child_item.setText(lk.col_key, lk.list_bucket_key_format.format(index, index + item_count - 1))
+                child_item.setText(lk.col_value, get_item_count_text(item_count))
+                changed_items.append(child_item)
+        index += list_bucket.count
+    return index - first_index
+
+
+def select_tree_items(tree_widget, items):
+    """
+    Add the items to the selection in one go, selecting them one by one gets slower the bigger the selection is
+
+    :param tree_widget:
+    :param items:
+    :return:
+    """
+    # every range spans the whole row, the Rows flag would merge each range with all the others
+    last_column = tree_widget.columnCount() - 1
+    selection = QtCore.QItemSelection()
+    first_index = last_index = None
+    for item in items:
+        item_index = tree_widget.indexFromItem(item)
+        if last_index is not None and item_index.parent() == last_index.parent() \
+                and item_index.row() == last_index.row() + 1:
+            last_index = item_index  # one range for consecutive rows
+            continue
+
+        if first_index is not None:
+            selection.select(first_index, last_index.sibling(last_index.row(), last_column))
+        first_index = last_index = item_index
+
+    if first_index is not None:
+        selection.select(first_index, last_index.sibling(last_index.row(), last_column))
+    tree_widget.selectionModel().select(selection, QtCore.QItemSelectionModel.Select)
+
+
+def get_child_rows(parent_item, child_items):
+    """
+    :param parent_item:
+    :param child_items:
+    :return: row of each child item, -1 for items that aren't a child of the parent
+    """
+    if len(child_items) <= lk.index_of_child_limit:
+        return [parent_item.indexOfChild(child_item) for child_item in child_items]
+
+    rows = dict((child_item, row) for row, child_item in enumerate(get_sub_widgets(parent_item)))
+    return [rows.get(child_item, -1) for child_item in child_items]
+
+
+def get_row_ranges(rows):
+    """
+    :param rows: sorted child rows
+    :return: [first row, row count] of each run of consecutive rows
+    """
+    row_ranges = []
+    for row in rows:
+        if row_ranges and sum(row_ranges[-1]) == row:
+            row_ranges[-1][1] += 1
+        else:
+            row_ranges.append([row, 1])
+    return row_ranges
+
+
+def take_child_rows(parent_item, rows):
+    """
+    Take the children at the rows out of the parent, one run of consecutive rows at a time starting from the end
+
+    :param parent_item:
+    :param rows:
+    :return:
+    """
+    for first_row, row_count in reversed(get_row_ranges(sorted(row for row in rows if row >= 0))):
+        if row_count == parent_item.childCount():
+            parent_item.takeChildren()
+            continue
+
+        for row in reversed(range(first_row, first_row + row_count)):
+            parent_item.takeChild(row)
+
+
+def insert_child_rows(parent_item, rows, items):
+    """
+    Insert the items into the parent, one run of consecutive rows at a time
+
     :param parent_item:
+    :param rows: row each item ends up at
+    :param items:
     :return:
     """
-    if get_data_type(parent_item) in lk.supports_children_type_names:
-        parent_item.setText(lk.col_value, "-------- {} items --------".format(parent_item.childCount()))
+    row_runs = []  # [first row, items]
+    for row, item in sorted(zip(rows, items), key=lambda row_and_item: row_and_item[0]):
+        if row_runs and row_runs[-1][0] + len(row_runs[-1][1]) == row:
+            row_runs[-1][1].append(item)
+        else:
+            row_runs.append([row, [item]])
+
+    # every run is inserted after the runs before it, so its first row is already right
+    for first_row, run_items in row_runs:
+        parent_item.insertChildren(first_row, run_items)
+
+
+def rebuild_child_rows(parent_item, removed_rows, inserted_rows, inserted_items):
+    """
+    Same as take_child_rows followed by insert_child_rows, but all children are taken out and put back in one go.
+    Children that stay are expanded again.
+
+    :param parent_item:
+    :param removed_rows: rows to take out
+    :param inserted_rows: row each inserted item ends up at
+    :param inserted_items:
+    :return:
+    """
+    removed_row_set = set(removed_rows)
+    kept_items = [parent_item.child(row) for row in range(parent_item.childCount()) if row not in removed_row_set]
+    expanded_items = [kept_item for kept_item in kept_items if kept_item.isExpanded()]
+    parent_item.takeChildren()
+
+    kept_items = iter(kept_items)
+    new_child_items = []
+    for row, item in sorted(zip(inserted_rows, inserted_items), key=lambda row_and_item: row_and_item[0]):
+        while len(new_child_items) < row:
+            new_child_items.append(next(kept_items))
+        new_child_items.append(item)
+    new_child_items.extend(kept_items)
+    parent_item.addChildren(new_child_items)
+
+    for expanded_item in expanded_items:
+        expanded_item.setExpanded(True)
+
+
+class ItemEditDelegate(QtWidgets.QStyledItemDelegate):
+    """Keeps the text a cell had before it was edited, until DataTreeWidget.item_text_changed picks it up"""
+
+    def __init__(self, parent=None):
+        super(ItemEditDelegate, self).__init__(parent)
+        self.edited_text = None
+
+    def setModelData(self, editor, model, index):
+        self.edited_text = index.data()
+        try:
+            super(ItemEditDelegate, self).setModelData(editor, model, index)
+        finally:
+            self.edited_text = None
+
+
+class TreeEditCommand(undo_stack.UndoCommand):
+    """
+    Undo step of a DataTreeWidget, made of the changes that were recorded while doing it.
+    Changes only hold what changed, items that were taken out are kept by reference so they can be put back.
+    """
+
+    def __init__(self, data_tree_widget, text, changes=None):
+        self.data_tree_widget = data_tree_widget
+        self.text = text
+        self.changes = [] if changes is None else changes
+
+    def undo(self):
+        self.data_tree_widget.apply_changes(self.changes, undo=True)
+
+    def redo(self):
+        self.data_tree_widget.apply_changes(self.changes)
+
+    def get_memory_size(self):
+        return sum(change.get_memory_size() for change in self.changes)
+
+
+class ChildRowsChange(object):
+    """Children taken out of a parent and put into it, moved children are both removed and inserted"""
+
+    def __init__(self, parent_item, removed_rows, removed_items, inserted_rows, inserted_items):
+        """
+        :param parent_item:
+        :param removed_rows: rows of the removed items before the change
+        :param removed_items:
+        :param inserted_rows: rows of the inserted items after the change
+        :param inserted_items:
+        """
+        self.parent_item = parent_item
+        self.removed_rows = removed_rows
+        self.removed_items = removed_items
+        self.inserted_rows = inserted_rows
+        self.inserted_items = inserted_items
+        self.expanded_items = set()  # taken out items that were expanded
+
+    def apply(self, data_tree_widget, undo=False):
+        """
+        :return: items that were put into the tree
+        """
+        if undo:
+            return data_tree_widget.replace_child_rows(
+                self.parent_item, self.inserted_rows, self.inserted_items, self.removed_rows, self.removed_items,
+                self.expanded_items)
+        return data_tree_widget.replace_child_rows(
+            self.parent_item, self.removed_rows, self.removed_items, self.inserted_rows, self.inserted_items,
+            self.expanded_items)
+
+    def get_memory_size(self):
+        # items that aren't moved are out of the tree on one side of the change, estimated from their child count
+        moved_items = set(self.removed_items).intersection(self.inserted_items)
+        item_count = 0
+        for item in self.removed_items + self.inserted_items:
+            if item not in moved_items:
+                item_count += 1 + item.childCount()
+
+        row_count = len(self.removed_rows) + len(self.inserted_rows)
+        return item_count * lk.undo_item_memory_size + row_count * lk.undo_entry_memory_size
+
+
+class ItemDataChange(object):
+    """Data set on items, see DataTreeWidget.set_items_data"""
+
+    def __init__(self, entries):
+        """
+        :param entries: (item, column, role, old data, new data)
+        """
+        self.entries = entries
+
+    def apply(self, data_tree_widget, undo=False):
+        data_tree_widget.set_items_data(self.entries, undo)
+        return []
+
+    def get_memory_size(self):
+        return len(self.entries) * lk.undo_entry_memory_size
+
+
+class UnfetchedDataChange(object):
+    """
+    Data of containers whose children weren't created yet, like a batch rename of collapsed items.
+    If an item gets expanded afterwards its children are kept for when the change is made again.
+    """
+
+    def __init__(self, items, old_data, new_data):
+        """
+        :param items:
+        :param old_data: UnfetchedData of each item before the change
+        :param new_data: UnfetchedData of each item after the change
+        """
+        self.items = items
+        self.old_data = old_data
+        self.new_data = new_data
+        self.old_children = {}  # item: children created from the old data
+        self.new_children = {}
+
+    def apply(self, data_tree_widget, undo=False):
+        if undo:
+            data_tree_widget.set_unfetched_data(self.items, self.old_data, self.old_children, self.new_children)
+        else:
+            data_tree_widget.set_unfetched_data(self.items, self.new_data, self.new_children, self.old_children)
+        return []
+
+    def get_memory_size(self):
+        memory_size = len(self.items) * lk.undo_entry_memory_size
+        memory_size += sum(get_unfetched_memory_size(data) for data in self.old_data + self.new_data)
+        for child_items in itertools.chain(self.old_children.values(), self.new_children.values()):
+            memory_size += len(child_items) * lk.undo_item_memory_size
+        return memory_size
+
+
+class RootTypeChange(object):
+    """Type of the root changed, None when the tree got cleared"""
+
+    def __init__(self, old_type, new_type):
+        self.old_type = old_type
+        self.new_type = new_type
+
+    def apply(self, data_tree_widget, undo=False):
+        data_tree_widget.set_root_data_type(self.old_type if undo else self.new_type)
+        return []
+
+    def get_memory_size(self):
+        return lk.undo_entry_memory_size
+
+
+def get_item_edit_data(item):
+    """
+    :param item:
+    :return: list of the data an edit can change, see lk.edit_data_roles
+    """
+    return [item.data(column, role) for column, role in lk.edit_data_roles]
+
+
+def get_unfetched_item_count(unfetched_data):
+    data_value = unfetched_data.value
+    if isinstance(data_value, DeferredContainer):
+        return data_value.item_count
+    return len(data_value)
+
 
-    if get_data_type(parent_item) in lk.list_type_names:
-        children = get_sub_widgets(parent_item)
-        for i, child_item in enumerate(children):
-            child_item.setData(lk.col_key, QtCore.Qt.DisplayRole, "[{}]".format(i))
+def get_unfetched_memory_size(unfetched_data):
+    data_value = unfetched_data.value
+    if numeric_list.is_packed(data_value):
+        return len(data_value) * data_value.itemsize
+    return get_unfetched_item_count(unfetched_data) * lk.undo_entry_memory_size
 
 
 def test_data_tree():
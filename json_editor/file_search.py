@@ -0,0 +1,285 @@
+"""
+Search keys and values across many json files
+
+Every file is turned into rows of key and value text, the same text the tree shows.
+The rows are kept in an index on disk along with the size and modification time of each file,
+so only files that changed since the last search are parsed again, in a pool of worker processes.
+"""
+import array
+import bisect
+import hashlib
+import multiprocessing
+import os
+import pickle
+import tempfile
+
+from . import batch_files
+from . import json_editor_system as system
+
+
+class LocalConstants:
+    index_format_version = 1
+    index_folder = os.path.join(os.path.expanduser("~"), ".json_editor", "search_index")
+
+    # can't be typed into a search, so a match never spans two cells
+    separator = "\0"
+
+    # files parsed per worker task
+    pool_chunk_size = 16
+
+
+lk = LocalConstants
+
+
+class SearchResult(object):
+    def __init__(self, json_path, data_path, key, value):
+        """
+        :param json_path:
+        :param data_path: keys and list indices leading to the node, see DataTreeWidget.get_item_at_path
+        :param key: key text as shown in the tree
+        :param value: value text as shown in the tree, empty for containers
+        """
+        self.json_path = json_path
+        self.data_path = data_path
+        self.key = key
+        self.value = value
+
+    def __repr__(self):
+        return "SearchResult({!r}, {!r})".format(self.json_path, self.data_path)
+
+
+class FileEntry(object):
+    """Rows of one file, the searched text is lowercased on the first search"""
+    __slots__ = ("size", "mtime", "text", "row_starts", "data_paths", "_search_text")
+
+    def __init__(self, size, mtime, text, row_starts, data_paths):
+        self.size = size
+        self.mtime = mtime
+        self.text = text
+        self.row_starts = row_starts  # start of every row in the text, plus the end of it
+        self.data_paths = data_paths
+        self._search_text = None
+
+    def __getstate__(self):
+        return self.size, self.mtime, self.text, self.row_starts, self.data_paths
+
+    def __setstate__(self, state):
+        self.size, self.mtime, self.text, self.row_starts, self.data_paths = state
+        self._search_text = None
+
+    def find_rows(self, query):
+        """
+        :param query: lowercase text
+        :return: generator of the rows that contain the query
+        """
+        if self._search_text is None:
+            self._search_text = self.text.lower()
+
+        search_text = self._search_text
+        row_starts = self.row_starts
+        position = search_text.find(query)
+        while position != -1:
+            row = bisect.bisect_right(row_starts, position) - 1
+            yield row
+            position = search_text.find(query, row_starts[row + 1])  # skip the rest of the row
+
+    def get_row_text(self, row):
+        """
+        :return: (key, value)
+        """
+        row_text = self.text[self.row_starts[row]:self.row_starts[row + 1] - 1]
+        key, value = row_text.split(lk.separator, 1)
+        return key, value
+
+
+def build_file_entry(json_path):
+    """
+    :param json_path:
+    :return: FileEntry, without rows if the file isn't valid json. None if it can't be read
+    """
+    file_stat = system.get_file_stat(json_path)
+    if file_stat is None:
+        return None
+
+    try:
+        json_data = system.load_json(json_path)
+    except (IOError, OSError):
+        return None
+    except ValueError:
+        json_data = None  # kept without rows, so it's only parsed again once it changes
+
+    row_texts = []
+    data_paths = []
+    if isinstance(json_data, (dict, list)):
+        # in document order, so results of a file come out top to bottom
+        containers = [((), iter_children(json_data))]
+        while containers:
+            parent_path, children = containers[-1]
+            for key, key_text, value in children:
+                data_path = parent_path + (key,)
+                data_paths.append(data_path)
+                if isinstance(value, (dict, list)):
+                    row_texts.append(key_text + lk.separator + lk.separator)
+                    containers.append((data_path, iter_children(value)))
+                    break
+                row_texts.append(key_text + lk.separator + str(value) + lk.separator)
+            else:
+                containers.pop()
+
+    row_starts = array.array("q", [0])
+    row_start = 0
+    for row_text in row_texts:
+        row_start += len(row_text)
+        row_starts.append(row_start)
+
+    return FileEntry(file_stat[0], file_stat[1], "".join(row_texts), row_starts, data_paths)
+
+
+def iter_children(data):
+    """
+    :return: generator of (key or index, key text as shown in the tree, value)
+    """
+    if isinstance(data, dict):
+        return ((key, key, value) for key, value in data.items())
+    return ((i, "[{}]".format(i), value) for i, value in enumerate(data))
+
+
+def build_file_entry_in_worker(json_path):
+    return json_path, build_file_entry(json_path)
+
+
+def get_search_index_path(name):
+    """
+    :param name: what the index covers, like the searched directory
+    :return: path of the index file in the user folder
+    """
+    name_hash = hashlib.sha1(os.path.normcase(os.path.abspath(name)).encode("utf-8")).hexdigest()
+    return os.path.join(lk.index_folder, name_hash + ".index")
+
+
+class FileSearchIndex(object):
+    def __init__(self, index_path):
+        """
+        :param index_path: file the index is saved to, loaded from if it exists
+        """
+        self.index_path = index_path
+        self.entries = {}  # json path: FileEntry, or None for files that couldn't be read
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.index_path):
+            return
+
+        try:
+            with open(self.index_path, "rb") as fp:
+                version, entries = pickle.load(fp)
+        except Exception:
+            return  # unreadable or from another python version, it gets rebuilt
+
+        if version == lk.index_format_version:
+            self.entries = entries
+
+    def save(self):
+        index_folder = os.path.dirname(self.index_path)
+        try:
+            if not os.path.isdir(index_folder):
+                os.makedirs(index_folder)
+            file_handle, temp_path = tempfile.mkstemp(dir=index_folder, suffix=".tmp")
+            with os.fdopen(file_handle, "wb") as fp:
+                pickle.dump((lk.index_format_version, self.entries), fp, protocol=pickle.HIGHEST_PROTOCOL)
+            system.replace_file(temp_path, self.index_path)
+        except (IOError, OSError) as e:
+            print("Could not save search index: {}\n{}".format(self.index_path, e))
+
+    def get_outdated_paths(self, json_paths):
+        """
+        :param json_paths:
+        :return: the paths that are new or changed since they were indexed
+        """
+        outdated_paths = []
+        for json_path in json_paths:
+            entry = self.entries.get(json_path)
+            if entry is None or system.get_file_stat(json_path) != (entry.size, entry.mtime):
+                outdated_paths.append(json_path)
+        return outdated_paths
+
+    def update(self, paths, file_pattern=batch_files.lk.file_pattern, jobs=None, progress_callback=None):
+        """
+        Index the json files in the paths, files that didn't change since the last update are skipped
+
+        :param paths: files and directories, directories are searched recursively
+        :param file_pattern: pattern of the file names to pick from directories
+        :param jobs: worker process count, all cpus by default. 1 parses in this process
+        :param progress_callback: called with (files done, file count), raise system.LoadCancelled to stop
+        :return: number of files that were parsed
+        """
+        json_paths = list(batch_files.iter_json_paths(paths, file_pattern))
+        json_path_set = set(json_paths)
+        removed_paths = [json_path for json_path in self.entries if json_path not in json_path_set]
+        for json_path in removed_paths:
+            del self.entries[json_path]
+
+        outdated_paths = self.get_outdated_paths(json_paths)
+        if not outdated_paths:
+            if removed_paths:
+                self.save()
+            return 0
+
+        if jobs is None:
+            jobs = multiprocessing.cpu_count()
+
+        pool = None
+        if jobs > 1 and len(outdated_paths) > lk.pool_chunk_size:
+            pool = multiprocessing.Pool(jobs)
+            results = pool.imap_unordered(build_file_entry_in_worker, outdated_paths, lk.pool_chunk_size)
+        else:
+            results = (build_file_entry_in_worker(json_path) for json_path in outdated_paths)
+
+        try:
+            for done_count, (json_path, entry) in enumerate(results, 1):
+                self.entries[json_path] = entry
+                if progress_callback is not None:
+                    progress_callback(done_count, len(outdated_paths))
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+            # whatever got parsed is kept, even if cancelled
+            self.save()
+
+        return len(outdated_paths)
+
+    def find(self, query, paths=None, limit=None):
+        """
+        :param query: text to find in keys and values, not case sensitive
+        :param paths: only search files in these files and directories, everything that's indexed by default
+        :param limit: stop after this many results
+        :return: list of SearchResult
+        """
+        query = query.lower()
+        if not query or lk.separator in query:
+            return []
+
+        json_paths = sorted(self.entries)
+        if paths is not None:
+            json_paths = [json_path for json_path in json_paths if is_in_paths(json_path, paths)]
+
+        results = []
+        for json_path in json_paths:
+            entry = self.entries[json_path]
+            if entry is None:
+                continue
+
+            for row in entry.find_rows(query):
+                key, value = entry.get_row_text(row)
+                results.append(SearchResult(json_path, entry.data_paths[row], key, value))
+                if limit is not None and len(results) >= limit:
+                    return results
+        return results
+
+
+def is_in_paths(json_path, paths):
+    for path in paths:
+        if json_path == path or json_path.startswith(os.path.join(path, "")):
+            return True
+    return False
@@ -0,0 +1,270 @@
+import os
+
+from . import file_search
+from . import json_editor_system as system
+from . import json_query
+from . import ui_utils
+from .ui_utils import QtCore, QtWidgets
+
+
+class LocalConstants:
+    search_delay_ms = 250
+    result_limit = 10000
+
+    col_file = 0
+    col_path = 1
+    col_key = 2
+    col_value = 3
+    header_names = ("File", "Path", "Key", "Value")
+
+    role_result = QtCore.Qt.UserRole
+
+    recent_files_index_name = "recent files"
+
+
+lk = LocalConstants
+
+
+class FileSearchWidget(QtWidgets.QWidget):
+    """
+    Finds keys and values in every json file of a directory, or in the recent files of the editor.
+    The files are indexed in the background the first time a directory is searched,
+    after that only changed files are parsed again.
+    """
+    result_activated = QtCore.Signal(str, object)  # json path, data path
+
+    def __init__(self, get_recent_paths=None, *args, **kwargs):
+        """
+        :param get_recent_paths: function that returns the recent file paths of the editor
+        """
+        super(FileSearchWidget, self).__init__(*args, **kwargs)
+        self.get_recent_paths = get_recent_paths
+
+        self._indexes = {}  # index path: FileSearchIndex
+        self._updated_index_paths = set()  # checked for changed files in this session
+        self._index_thread = None
+
+        self.path_widget = ui_utils.QtPathWidget(
+            settings_name="JsonEditorFileSearch",
+            use_directory_dialog=True,
+            only_show_existing_recent_paths=True,
+        )
+        self.path_widget.path_changed.connect(self.search)
+
+        self.recent_files_checkbox = QtWidgets.QCheckBox("Recent Files")
+        self.recent_files_checkbox.setToolTip("Search the recently opened files instead of a directory")
+        self.recent_files_checkbox.setVisible(get_recent_paths is not None)
+        self.recent_files_checkbox.toggled.connect(self.path_widget.setDisabled)
+        self.recent_files_checkbox.toggled.connect(self.search)
+
+        self.rescan_button = QtWidgets.QPushButton("Rescan")
+        self.rescan_button.setToolTip("Look for changed files again")
+        self.rescan_button.clicked.connect(self.rescan)
+
+        self.search_line_edit = QtWidgets.QLineEdit()
+        self.search_line_edit.setPlaceholderText("find keys and values in files")
+        self.search_line_edit.setClearButtonEnabled(True)
+        self.search_line_edit.textEdited.connect(self.search_text_edited)
+
+        self.search_timer = QtCore.QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(lk.search_delay_ms)
+        self.search_timer.timeout.connect(self.search)
+
+        self.index_progress_bar = QtWidgets.QProgressBar()
+        self.index_progress_bar.setRange(0, 1000)
+        self.index_cancel_button = QtWidgets.QPushButton("Cancel")
+        self.index_cancel_button.clicked.connect(self.cancel_indexing)
+
+        index_progress_layout = QtWidgets.QHBoxLayout()
+        index_progress_layout.setContentsMargins(0, 0, 0, 0)
+        index_progress_layout.addWidget(self.index_progress_bar)
+        index_progress_layout.addWidget(self.index_cancel_button)
+        self.index_progress_widget = QtWidgets.QWidget()
+        self.index_progress_widget.setLayout(index_progress_layout)
+        self.index_progress_widget.setVisible(False)
+
+        self.results_tree_widget = QtWidgets.QTreeWidget()
+        self.results_tree_widget.setRootIsDecorated(False)
+        self.results_tree_widget.setUniformRowHeights(True)
+        self.results_tree_widget.setAlternatingRowColors(True)
+        self.results_tree_widget.setHeaderLabels(lk.header_names)
+        self.results_tree_widget.itemActivated.connect(self.result_item_activated)
+
+        self.status_label = QtWidgets.QLabel()
+
+        path_layout = QtWidgets.QHBoxLayout()
+        path_layout.setContentsMargins(0, 0, 0, 0)
+        path_layout.addWidget(self.path_widget)
+        path_layout.addWidget(self.recent_files_checkbox)
+        path_layout.addWidget(self.rescan_button)
+
+        main_layout = QtWidgets.QVBoxLayout()
+        main_layout.setContentsMargins(0, 0, 0, 0)
+        main_layout.addLayout(path_layout)
+        main_layout.addWidget(self.search_line_edit)
+        main_layout.addWidget(self.index_progress_widget)
+        main_layout.addWidget(self.results_tree_widget)
+        main_layout.addWidget(self.status_label)
+        self.setLayout(main_layout)
+
+    def get_search_paths(self):
+        """
+        :return: (searched paths, path of their index)
+        """
+        if self.recent_files_checkbox.isChecked() and self.get_recent_paths is not None:
+            paths = [path for path in self.get_recent_paths() if os.path.isfile(path)]
+            return paths, file_search.get_search_index_path(lk.recent_files_index_name)
+
+        directory = self.path_widget.path()
+        if not directory or not os.path.isdir(directory):
+            return [], None
+        directory = os.path.abspath(directory)
+        return [directory], file_search.get_search_index_path(directory)
+
+    def search_text_edited(self):
+        self.search_timer.start()
+
+    def rescan(self):
+        self._updated_index_paths.clear()
+        self.search()
+
+    def search(self):
+        self.search_timer.stop()
+        paths, index_path = self.get_search_paths()
+        if index_path is None:
+            self.show_results([])
+            self.status_label.setText("Pick a directory to search")
+            return
+
+        if index_path not in self._updated_index_paths:
+            # searched once the files are indexed
+            index_thread = self._index_thread
+            if index_thread is None or index_thread.index_path != index_path or index_thread.paths != paths:
+                self.start_indexing(paths, index_path)
+            return
+
+        query = self.search_line_edit.text()
+        results = self._indexes[index_path].find(query, paths=paths, limit=lk.result_limit)
+        self.show_results(results)
+
+        result_file_count = len(set(result.json_path for result in results))
+        if len(results) >= lk.result_limit:
+            self.status_label.setText("First {} results, in {} files".format(len(results), result_file_count))
+        elif query:
+            self.status_label.setText("{} results in {} files".format(len(results), result_file_count))
+        else:
+            self.status_label.setText("{} files indexed".format(len(self._indexes[index_path].entries)))
+
+    def show_results(self, results):
+        self.results_tree_widget.clear()
+
+        result_items = []
+        for result in results:
+            result_item = QtWidgets.QTreeWidgetItem([
+                os.path.basename(result.json_path),
+                json_query.format_path(result.data_path),
+                result.key,
+                result.value,
+            ])
+            result_item.setToolTip(lk.col_file, result.json_path)
+            result_item.setData(lk.col_file, lk.role_result, result)
+            result_items.append(result_item)
+        self.results_tree_widget.addTopLevelItems(result_items)
+
+    def result_item_activated(self, item, column):
+        result = item.data(lk.col_file, lk.role_result)
+        self.result_activated.emit(result.json_path, result.data_path)
+
+    ###############################################################################
+    # Indexing
+
+    def start_indexing(self, paths, index_path):
+        self.cancel_indexing()
+
+        index_thread = FileIndexThread(paths, index_path, self._indexes.get(index_path), parent=self)
+        index_thread.progress.connect(self.index_progress_changed)
+        index_thread.indexed.connect(self.index_updated)
+        index_thread.finished.connect(self.index_thread_finished)
+        self._index_thread = index_thread
+
+        self.index_progress_bar.setValue(0)
+        self.index_progress_bar.setFormat("Indexing files - %p%")
+        self.index_progress_widget.setVisible(True)
+        self.status_label.setText("Looking for changed files")
+        index_thread.start()
+
+    def cancel_indexing(self):
+        if self._index_thread is None:
+            return
+
+        self._index_thread.cancel()
+        # the thread might still be writing to it, it's loaded from disk again next time
+        self._indexes.pop(self._index_thread.index_path, None)
+        self._index_thread = None
+        self.index_progress_widget.setVisible(False)
+        self.status_label.setText("")
+
+    def index_progress_changed(self, done_count, file_count):
+        self.index_progress_bar.setFormat("Indexing {} of {} files - %p%".format(done_count, file_count))
+        self.index_progress_bar.setValue(int(1000 * done_count / file_count))
+
+    def index_updated(self, index_path, search_index):
+        if self.sender() is not self._index_thread:
+            return  # cancelled or replaced by a newer search
+
+        self._index_thread = None
+        self.index_progress_widget.setVisible(False)
+        self._indexes[index_path] = search_index
+        self._updated_index_paths.add(index_path)
+        self.search()
+
+    def index_thread_finished(self):
+        index_thread = self.sender()
+        if index_thread is self._index_thread:
+            # finished without an index, so something went wrong
+            self._index_thread = None
+            self.index_progress_widget.setVisible(False)
+        index_thread.deleteLater()
+
+
+class FileIndexThread(QtCore.QThread):
+    progress = QtCore.Signal(object, object)
+    indexed = QtCore.Signal(str, object)
+
+    def __init__(self, paths, index_path, search_index=None, parent=None):
+        """
+        :param paths: files and directories to index
+        :param index_path: where the index is saved
+        :param search_index: FileSearchIndex that's already loaded, otherwise it's loaded from index_path
+        :param parent:
+        """
+        super(FileIndexThread, self).__init__(parent)
+        self.paths = paths
+        self.index_path = index_path
+        self.search_index = search_index
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        # worker processes would start another instance of the host application inside a dcc
+        jobs = 1 if ui_utils.active_dcc_is_maya or ui_utils.active_dcc_is_houdini else None
+        try:
+            if self.search_index is None:
+                self.search_index = file_search.FileSearchIndex(self.index_path)
+            self.search_index.update(self.paths, jobs=jobs, progress_callback=self.report_progress)
+        except system.LoadCancelled:
+            return
+        except Exception as e:
+            print("Failed to index files in: {}\n{}".format(", ".join(self.paths), e))
+            return
+
+        if not self._cancelled:
+            self.indexed.emit(self.index_path, self.search_index)
+
+    def report_progress(self, done_count, file_count):
+        if self._cancelled:
+            raise system.LoadCancelled()
+        self.progress.emit(done_count, file_count)
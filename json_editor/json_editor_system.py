@@ -1,7 +1,24 @@
+import array
+import bisect
+import codecs
 import collections
+import io
 import json
+import mmap
 import os
+import re
+import shutil
 import sys
+import tempfile
+from json.decoder import scanstring
+from json.encoder import encode_basestring_ascii
+
+from . import tree_walk
+
+if sys.version_info.major >= 3:
+    string_types = str
+else:
+    string_types = basestring
 
 active_dcc_is_maya = "maya" in os.path.basename(sys.executable)
 
@@ -15,13 +32,57 @@ else:
     dcc = dcc_module.JsonEditorCoreInterface()
 
 
-def load_json(json_path):
+class LoadCancelled(Exception):
+    pass
+
+
+def load_json(json_path, progress_callback=None, chunk_size=4 * 1024 * 1024):
+    """
+    Load json data from path
+
+    :param json_path:
+    :param progress_callback: called with (bytes_read, total_bytes) after each chunk, raise LoadCancelled to stop
+    :param chunk_size: bytes to read between progress updates
+    :return:
+    """
     if not os.path.exists(json_path):
         return
 
-    with open(json_path, "r") as fp:
-        json_data = json.load(fp, object_pairs_hook=collections.OrderedDict)
-    return json_data
+    if progress_callback is None:
+        with open(json_path, "r") as fp:
+            json_data = loads_json(fp.read())
+        return json_data
+
+    total_bytes = os.path.getsize(json_path)
+    chunks = []
+    bytes_read = 0
+    with open(json_path, "rb") as fp:
+        while True:
+            chunk = fp.read(chunk_size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            bytes_read += len(chunk)
+            progress_callback(bytes_read, total_bytes)
+
+    json_text = b"".join(chunks).decode("utf-8-sig")
+    del chunks
+    return loads_json(json_text)
+
+
+def loads_json(json_text):
+    """
+    Same as json.loads with OrderedDicts, json nested deeper than the recursion limit is parsed
+    by the streaming parser, which doesn't recurse
+
+    :param json_text:
+    :return:
+    """
+    try:
+        return json.loads(json_text, object_pairs_hook=collections.OrderedDict)
+    except RuntimeError:  # RecursionError in python 3
+        events = iter_json_events(io.StringIO(json_text))
+        return build_json_value(events, next(events))
 
 
 def get_json_indent_level(json_path):
@@ -40,5 +101,872 @@ def get_json_indent_level(json_path):
 
 
 def save_json(json_data, json_path, indent=2):
-    with open(json_path, "w+") as fp:
-        json.dump(json_data, fp, indent=indent)
+    try:
+        write_json_chunks(json.JSONEncoder(indent=indent).iterencode(json_data), json_path)
+    except RuntimeError:  # RecursionError in python 3
+        write_json_chunks(iter_encode_json(json_data, indent=indent), json_path)
+
+
+def write_json_chunks(chunks, json_path):
+    file_writer = JsonFileWriter(json_path)
+    try:
+        for chunk in chunks:
+            file_writer.write(chunk)
+    except Exception:
+        file_writer.abort()
+        raise
+    file_writer.commit()
+
+
+def iter_encode_json(json_data, indent=None):
+    """
+    Encode the data the same way json.JSONEncoder(indent=indent).iterencode() does, without recursing.
+    It's slower than the json module, it's meant for data nested deeper than the recursion limit
+
+    :param json_data:
+    :param indent: same as json.dump
+    :return: generator of text chunks
+    """
+    if indent is not None and not isinstance(indent, string_types):
+        indent = " " * indent
+    item_separator = "," if indent is not None else ", "
+
+    open_containers = []  # [closing text, is dict, has children so far] from the root down
+    for (key, value), depth in tree_walk.walk_data(json_data):
+        while len(open_containers) > depth:
+            yield open_containers.pop()[0]
+
+        chunk = ""
+        if depth:
+            parent_entry = open_containers[-1]
+            if parent_entry[2]:
+                chunk = item_separator
+            parent_entry[2] = True
+            if indent is not None:
+                chunk += "\n" + indent * depth
+            if parent_entry[1]:
+                chunk += encode_json_key(key) + ": "
+
+        if isinstance(value, (dict, list, tuple)):
+            is_dict = isinstance(value, dict)
+            if not value:
+                chunk += "{}" if is_dict else "[]"
+            else:
+                chunk += "{" if is_dict else "["
+                closing_text = "}" if is_dict else "]"
+                if indent is not None:
+                    closing_text = "\n" + indent * depth + closing_text
+                open_containers.append([closing_text, is_dict, False])
+        else:
+            chunk += encode_json_scalar(value)
+        yield chunk
+
+    while open_containers:
+        yield open_containers.pop()[0]
+
+
+def encode_json_float(data_value):
+    # same as the json module
+    if data_value != data_value:
+        return "NaN"
+    if data_value == float("inf"):
+        return "Infinity"
+    if data_value == -float("inf"):
+        return "-Infinity"
+    return float.__repr__(data_value)
+
+
+def encode_json_scalar(data_value):
+    if isinstance(data_value, string_types):
+        return encode_basestring_ascii(data_value)
+    if data_value is None:
+        return "null"
+    if data_value is True:
+        return "true"
+    if data_value is False:
+        return "false"
+    if isinstance(data_value, float):
+        return encode_json_float(data_value)
+    return int.__repr__(data_value)
+
+
+def encode_json_key(key):
+    # the json module turns these keys into strings
+    if isinstance(key, string_types):
+        return encode_basestring_ascii(key)
+    if isinstance(key, float):
+        return encode_basestring_ascii(encode_json_float(key))
+    if key is True or key is False or key is None:
+        return '"' + encode_json_scalar(key) + '"'
+    if isinstance(key, int):
+        return '"' + int.__repr__(key) + '"'
+    raise TypeError("keys must be str, int, float, bool or None, not {}".format(type(key).__name__))
+
+
+class JsonFileWriter(object):
+    """
+    Writes to a temp file next to json_path, which replaces json_path on commit.
+    So a failed or cancelled save never leaves a half written file behind
+    """
+
+    def __init__(self, json_path, buffer_size=1024 * 1024):
+        self.json_path = json_path
+        file_handle, self.temp_path = tempfile.mkstemp(
+            prefix=os.path.basename(json_path) + ".",
+            suffix=".tmp",
+            dir=os.path.dirname(os.path.abspath(json_path)),
+        )
+        os.close(file_handle)
+        self._fp = open(self.temp_path, "w", buffering=buffer_size)
+
+    def write(self, chunk):
+        self._fp.write(chunk)
+
+    def commit(self):
+        self._fp.close()
+        if os.path.exists(self.json_path):
+            shutil.copymode(self.json_path, self.temp_path)
+        else:
+            # mkstemp only lets the owner read it, give it the mode open() would have
+            os.chmod(self.temp_path, 0o666 & ~get_umask())
+        replace_file(self.temp_path, self.json_path)
+
+    def abort(self):
+        self._fp.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+# text mode files write os.linesep for every newline
+written_newline_size = len(os.linesep)
+
+
+class JsonFileSnapshot(object):
+    """
+    A json file as it was written by a save, so the unchanged parts of it can be copied into the next save.
+
+    Offsets are in bytes of the file, the encoded json is ascii so there's nothing to decode besides newlines
+    """
+
+    def __init__(self, json_path, indent):
+        self.json_path = json_path
+        self.indent = indent
+        self._file_stat = get_file_stat(json_path)
+        self._fp = None
+
+    def is_current(self, indent):
+        """
+        :param indent:
+        :return: True if the file hasn't been touched since it was written with this indent
+        """
+        return indent == self.indent and get_file_stat(self.json_path) == self._file_stat
+
+    def read(self, start, size):
+        if self._fp is None:
+            self._fp = open(self.json_path, "rb")
+
+        self._fp.seek(start)
+        text = self._fp.read(size).decode("ascii")
+        if written_newline_size != 1:
+            text = text.replace(os.linesep, "\n")
+        return text
+
+    def close(self):
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+
+def get_file_stat(file_path):
+    """
+    :param file_path:
+    :return: (size, modification time) or None if the file doesn't exist
+    """
+    try:
+        file_stat = os.stat(file_path)
+    except OSError:
+        return None
+    return file_stat.st_size, file_stat.st_mtime
+
+
+def get_umask():
+    umask = os.umask(0)  # it can only be read by setting it
+    os.umask(umask)
+    return umask
+
+
+def replace_file(source_path, target_path):
+    if hasattr(os, "replace"):
+        os.replace(source_path, target_path)
+        return
+
+    # python 2 can't rename over an existing file on windows
+    if os.path.exists(target_path):
+        os.remove(target_path)
+    os.rename(source_path, target_path)
+
+
+#####################################################################################################################
+# Streaming parser, reads the file in chunks so only the requested parts of it end up in memory
+
+json_token_regex = re.compile(
+    r'[ \t\n\r]*(?:([{}\[\],:])|(")|(-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?)'
+    r'|(true|false|null|NaN|Infinity|-Infinity))'
+)
+json_literals = {
+    "true": True, "false": False, "null": None,
+    "NaN": float("nan"), "Infinity": float("inf"), "-Infinity": float("-inf"),
+}
+
+
+class DeferredContainer(object):
+    """
+    A dict or list that hasn't been read from the file yet
+
+    load(max_depth=1) only reads one level, the nested containers come back as DeferredContainers again.
+    load() reads everything
+    """
+    __slots__ = ("data_type", "item_count")
+
+    def __init__(self, data_type, item_count):
+        self.data_type = data_type
+        self.item_count = item_count
+
+    def load(self, max_depth=None):
+        raise NotImplementedError
+
+
+class UnloadedContainer(DeferredContainer):
+    """
+    Stands in for a dict or list that was deeper than the requested depth.
+    Loading it streams through the file again with load_json_subtree
+    """
+    __slots__ = ("data_path", "json_path")
+
+    def __init__(self, data_type, item_count, data_path, json_path=None):
+        super(UnloadedContainer, self).__init__(data_type, item_count)
+        self.data_path = data_path
+        self.json_path = json_path
+
+    def __repr__(self):
+        return "UnloadedContainer({}, {} items, {})".format(self.data_type.__name__, self.item_count, self.data_path)
+
+    def load(self, max_depth=None):
+        return load_json_subtree(self.json_path, data_path=self.data_path, max_depth=max_depth)
+
+
+def iter_json_events(fp, chunk_size=64 * 1024):
+    """
+    Parse json from a text file object, one chunk at a time
+
+    Yields (event, value) tuples, events are
+    start_map, key, end_map, start_array, end_array and value
+
+    :param fp: file object opened in text mode
+    :param chunk_size: characters to read at a time
+    :return:
+    """
+    buffer = ""
+    pos = 0
+    eof = False
+    read_size = chunk_size
+    container_stack = []
+    expect_key = False
+
+    while True:
+        match = json_token_regex.match(buffer, pos)
+
+        # tokens touching the end of the buffer might continue in the next chunk
+        needs_data = match is None or (match.end() == len(buffer) and not eof)
+
+        if not needs_data and match.group(3) and not eof:
+            # "1." or "1e" at the end of the buffer, the rest of the number is in the next chunk
+            number_tail = buffer[match.end():match.end() + 3]
+            needs_data = len(number_tail) < 3 and not number_tail.strip(".eE+-")
+
+        if not needs_data and match.group(2):
+            try:
+                string_value, string_end = scanstring(buffer, match.end())
+            except ValueError:
+                if eof:
+                    raise
+                needs_data = True
+                read_size *= 2  # long string, read bigger chunks so we don't rescan it over and over
+
+        if needs_data:
+            if eof:
+                if buffer[pos:].strip():
+                    raise ValueError("Invalid JSON: {}".format(buffer[pos:pos + 20]))
+                return
+
+            chunk = fp.read(read_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+
+        read_size = chunk_size
+        punctuation, string_start, number, literal = match.groups()
+        pos = match.end()
+
+        if punctuation:
+            if punctuation == "{":
+                container_stack.append(dict)
+                expect_key = True
+                yield "start_map", None
+            elif punctuation == "[":
+                container_stack.append(list)
+                yield "start_array", None
+            elif punctuation == "}":
+                container_stack.pop()
+                yield "end_map", None
+            elif punctuation == "]":
+                container_stack.pop()
+                yield "end_array", None
+            elif punctuation == ",":
+                expect_key = container_stack[-1] is dict
+            continue
+
+        if string_start:
+            pos = string_end
+            if expect_key:
+                expect_key = False
+                yield "key", string_value
+            else:
+                yield "value", string_value
+
+        elif number:
+            if "." in number or "e" in number or "E" in number:
+                yield "value", float(number)
+            else:
+                yield "value", int(number)
+
+        else:
+            yield "value", json_literals[literal]
+
+
+def skip_json_value(events, first_event):
+    """
+    Consume the events of the value that first_event starts
+
+    :param events:
+    :param first_event:
+    :return: amount of direct children the value had
+    """
+    event_name = first_event[0]
+    if event_name == "value":
+        return 0
+
+    counted_event = "key" if event_name == "start_map" else None
+    child_count = 0
+    depth = 1
+    for event_name, _ in events:
+        if depth == 1:
+            if counted_event:
+                child_count += event_name == counted_event
+            elif event_name not in ("end_map", "end_array"):
+                child_count += 1
+
+        if event_name in ("start_map", "start_array"):
+            depth += 1
+        elif event_name in ("end_map", "end_array"):
+            depth -= 1
+            if depth == 0:
+                break
+
+    return child_count
+
+
+def seek_json_path(events, data_path):
+    """
+    Consume events until the value at data_path
+
+    :param events:
+    :param data_path: sequence of dict keys and list indices
+    :return: first event of the value
+    """
+    event = next(events)
+    for path_key in data_path:
+        if event[0] == "start_map":
+            while True:
+                event = next(events)
+                if event[0] == "end_map":
+                    raise KeyError(path_key)
+                key = event[1]
+                event = next(events)
+                if key == path_key:
+                    break
+                skip_json_value(events, event)
+
+        elif event[0] == "start_array":
+            index = 0
+            while True:
+                event = next(events)
+                if event[0] == "end_array":
+                    raise KeyError(path_key)
+                if index == path_key:
+                    break
+                skip_json_value(events, event)
+                index += 1
+
+        else:
+            raise KeyError(path_key)
+
+    return event
+
+
+def build_json_value(events, first_event, max_depth=None, data_path=(), json_path=None):
+    """
+    Build the value that first_event starts
+
+    :param events:
+    :param first_event:
+    :param max_depth: containers nested deeper than this are replaced with an UnloadedContainer
+    :param data_path: path of the value, used for the UnloadedContainers
+    :param json_path: file the events come from, used for the UnloadedContainers
+    :return:
+    """
+    event_name, value = first_event
+    if event_name == "value":
+        return value
+
+    root = collections.OrderedDict() if event_name == "start_map" else []
+    container_stack = [root]
+    path_stack = []
+    key = None
+
+    for event_name, value in events:
+        if event_name == "key":
+            key = value
+            continue
+
+        if event_name in ("end_map", "end_array"):
+            container_stack.pop()
+            if not container_stack:
+                break
+            path_stack.pop()
+            continue
+
+        parent = container_stack[-1]
+        child_key = len(parent) if isinstance(parent, list) else key
+
+        if event_name == "value":
+            child = value
+        elif max_depth is not None and len(container_stack) >= max_depth:
+            child_type = collections.OrderedDict if event_name == "start_map" else list
+            child_path = tuple(data_path) + tuple(path_stack) + (child_key,)
+            child_count = skip_json_value(events, (event_name, value))
+            child = UnloadedContainer(child_type, child_count, child_path, json_path)
+        else:
+            child = collections.OrderedDict() if event_name == "start_map" else []
+            container_stack.append(child)
+            path_stack.append(child_key)
+
+        if isinstance(parent, list):
+            parent.append(child)
+        else:
+            parent[child_key] = child
+
+    return root
+
+
+def load_json_subtree(json_path, data_path=(), max_depth=None, chunk_size=64 * 1024):
+    """
+    Load part of a json file without reading all of it into memory
+
+    :param json_path:
+    :param data_path: sequence of dict keys and list indices to the value to load
+    :param max_depth: only build this many levels, deeper containers become UnloadedContainer
+    :param chunk_size: characters to read at a time
+    :return:
+    """
+    with io.open(json_path, "r", encoding="utf-8-sig") as fp:
+        events = iter_json_events(fp, chunk_size=chunk_size)
+        first_event = seek_json_path(events, data_path)
+        return build_json_value(events, first_event, max_depth=max_depth, data_path=data_path, json_path=json_path)
+
+
+#####################################################################################################################
+# Large files, memory mapped with an index of where each dict and list starts and ends
+
+# skips over anything that isn't a bracket or comma (including strings) and captures the next bracket or comma
+container_token_regex = re.compile(br'[^"{}\[\],]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"{}\[\],]*)*([{}\[\],])')
+non_whitespace_regex = re.compile(br'\S')
+
+index_file_extension = ".index"
+index_format_version = 1
+
+
+class JsonOffsetIndex(object):
+    """
+    Byte offsets of every dict and list in a json file, in the order they start.
+
+    starts[i] is the offset of the opening bracket, ends[i] is one past the closing bracket
+    """
+
+    def __init__(self, max_depth):
+        self.max_depth = max_depth
+        self.starts = array.array("q")
+        self.ends = array.array("q")
+        self.item_counts = array.array("q")
+        self.depths = array.array("b")
+
+    def __len__(self):
+        return len(self.starts)
+
+    def find(self, start):
+        """position of the container starting at this offset, or -1 if it isn't in the index"""
+        position = bisect.bisect_left(self.starts, start)
+        if position < len(self.starts) and self.starts[position] == start:
+            return position
+        return -1
+
+    def child_positions(self, position):
+        """positions of the containers directly inside the container at position"""
+        end = self.ends[position]
+        child_position = position + 1
+        while child_position < len(self.starts) and self.starts[child_position] < end:
+            yield child_position
+            # skip past everything nested in the child
+            child_position = bisect.bisect_left(self.starts, self.ends[child_position], child_position + 1)
+
+
+def scan_json_containers(buffer, start=0, end=None, max_depth=None, progress_callback=None):
+    """
+    Find where the dicts and lists in the buffer start and end, without decoding anything
+
+    :param buffer: bytes or mmap
+    :param start:
+    :param end:
+    :param max_depth: don't record containers nested deeper than this, the first container is depth 0
+    :param progress_callback: called with (bytes_scanned, total_bytes) now and then
+    :return: JsonOffsetIndex
+    """
+    if end is None:
+        end = len(buffer)
+
+    index = JsonOffsetIndex(max_depth)
+    open_containers = []  # (index position or -1, start offset, comma count of the parent container)
+    comma_count = 0
+    tokens_until_progress = 100000
+
+    for match in container_token_regex.finditer(buffer, start, end):
+        token = match.group(1)
+        if token == b",":
+            comma_count += 1
+            continue
+
+        token_start = match.end() - 1
+        if token in b"{[":
+            depth = len(open_containers)
+            position = -1
+            if max_depth is None or depth <= max_depth:
+                position = len(index.starts)
+                index.starts.append(token_start)
+                index.ends.append(0)
+                index.item_counts.append(0)
+                index.depths.append(depth)
+            open_containers.append((position, token_start, comma_count))
+            comma_count = 0
+
+        else:
+            position, container_start, parent_comma_count = open_containers.pop()
+            if position != -1:
+                if comma_count:
+                    item_count = comma_count + 1
+                else:
+                    is_empty = non_whitespace_regex.search(buffer, container_start + 1, token_start) is None
+                    item_count = 0 if is_empty else 1
+                index.ends[position] = token_start + 1
+                index.item_counts[position] = item_count
+            comma_count = parent_comma_count
+
+        if progress_callback:
+            tokens_until_progress -= 1
+            if not tokens_until_progress:
+                tokens_until_progress = 100000
+                progress_callback(token_start - start, end - start)
+
+    return index
+
+
+def get_json_index_path(json_path):
+    return json_path + index_file_extension
+
+
+def save_json_offset_index(index, json_path):
+    """
+    Save the index next to the json file, keyed by the size and modification time of the file
+
+    :param index:
+    :param json_path:
+    :return:
+    """
+    file_stat = os.stat(json_path)
+    header = {
+        "version": index_format_version,
+        "size": file_stat.st_size,
+        "mtime": file_stat.st_mtime,
+        "max_depth": index.max_depth,
+        "count": len(index),
+    }
+    try:
+        with open(get_json_index_path(json_path), "wb") as fp:
+            fp.write(json.dumps(header).encode("utf-8") + b"\n")
+            for index_array in (index.starts, index.ends, index.item_counts, index.depths):
+                index_array.tofile(fp)
+    except (IOError, OSError) as e:
+        print("Could not save index next to: {}\n{}".format(json_path, e))
+
+
+def load_json_offset_index(json_path, max_depth):
+    """
+    Load the index saved next to the json file, if it still matches the file
+
+    :param json_path:
+    :param max_depth: depth the index needs to cover
+    :return: JsonOffsetIndex or None
+    """
+    index_path = get_json_index_path(json_path)
+    if not os.path.exists(index_path):
+        return None
+
+    file_stat = os.stat(json_path)
+    with open(index_path, "rb") as fp:
+        try:
+            header = json.loads(fp.readline().decode("utf-8"))
+        except ValueError:
+            return None
+
+        if (header.get("version") != index_format_version
+                or header.get("size") != file_stat.st_size
+                or header.get("mtime") != file_stat.st_mtime
+                or header.get("max_depth") != max_depth):
+            return None
+
+        index = JsonOffsetIndex(max_depth)
+        try:
+            for index_array in (index.starts, index.ends, index.item_counts, index.depths):
+                index_array.fromfile(fp, header["count"])
+        except EOFError:
+            return None
+
+    return index
+
+
+class IndexedContainer(DeferredContainer):
+    """A dict or list in a LargeJsonFile, only decoded when loaded"""
+    __slots__ = ("large_file", "start", "end", "depth", "index_position")
+
+    def __init__(self, large_file, data_type, item_count, start, end, depth, index_position=-1):
+        super(IndexedContainer, self).__init__(data_type, item_count)
+        self.large_file = large_file
+        self.start = start
+        self.end = end
+        self.depth = depth
+        self.index_position = index_position
+
+    def __repr__(self):
+        return "IndexedContainer({}, {} items, bytes {}-{})".format(
+            self.data_type.__name__, self.item_count, self.start, self.end
+        )
+
+    def load(self, max_depth=None):
+        return self.large_file.load_container(self, max_depth=max_depth)
+
+
+class LargeJsonFile(object):
+    """
+    Memory mapped json file, containers are decoded one level at a time when they're loaded.
+
+    The offset index is saved next to the file so opening it again skips the scan
+    """
+
+    def __init__(self, json_path, index_depth=3, progress_callback=None):
+        self.json_path = json_path
+        self._fp = open(json_path, "rb")
+        self.buffer = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self.index = load_json_offset_index(json_path, index_depth)
+            if self.index is None:
+                self.index = scan_json_containers(self.buffer, max_depth=index_depth, progress_callback=progress_callback)
+                save_json_offset_index(self.index, json_path)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        self.buffer.close()
+        self._fp.close()
+
+    def root(self):
+        """the top level data, with nested containers left as IndexedContainers"""
+        if not len(self.index):
+            return json.loads(self.buffer[:].decode("utf-8-sig"))
+        return self.load_container(self.get_container(0), max_depth=1)
+
+    def get_container(self, position):
+        index = self.index
+        data_type = collections.OrderedDict if self.buffer[index.starts[position]:index.starts[position] + 1] == b"{" else list
+        return IndexedContainer(
+            self,
+            data_type,
+            index.item_counts[position],
+            index.starts[position],
+            index.ends[position],
+            index.depths[position],
+            position,
+        )
+
+    def get_child_containers(self, container):
+        if container.index_position != -1 and container.depth < self.index.max_depth:
+            return [self.get_container(position) for position in self.index.child_positions(container.index_position)]
+
+        # not covered by the index, scan just this container
+        span_index = scan_json_containers(self.buffer, container.start, container.end, max_depth=1)
+        child_containers = []
+        for position in range(1, len(span_index)):
+            data_type = collections.OrderedDict if self.buffer[span_index.starts[position]:span_index.starts[position] + 1] == b"{" else list
+            child_containers.append(IndexedContainer(
+                self,
+                data_type,
+                span_index.item_counts[position],
+                span_index.starts[position],
+                span_index.ends[position],
+                container.depth + 1,
+            ))
+        return child_containers
+
+    def load_container(self, container, max_depth=None):
+        if max_depth is None:
+            return loads_json(self.buffer[container.start:container.end].decode("utf-8"))
+
+        child_containers = self.get_child_containers(container)
+        data = decode_shallow(self.buffer, container, child_containers)
+
+        if max_depth > 1:
+            data_items = data.items() if isinstance(data, dict) else enumerate(data)
+            for key, value in list(data_items):
+                if isinstance(value, IndexedContainer):
+                    data[key] = value.load(max_depth=max_depth - 1)
+
+        return data
+
+
+def decode_shallow(buffer, container, child_containers):
+    """
+    Decode a container, with the containers inside it left as they are
+
+    The text between child containers is decoded in bulk by json.loads
+
+    :param buffer:
+    :param container:
+    :param child_containers: containers directly inside the container, in order
+    :return:
+    """
+    is_map = container.data_type is not list
+    data = collections.OrderedDict() if is_map else []
+
+    segment_start = container.start + 1
+    for child_container in child_containers + [None]:
+        segment_end = child_container.start if child_container else container.end - 1
+        segment = buffer[segment_start:segment_end].strip().strip(b",").strip()
+
+        if is_map:
+            child_key = None
+            if child_container:
+                # the segment ends with the key of the child container
+                segment = segment.rstrip(b":").rstrip()
+                key_start = find_string_start(segment)
+                child_key = json.loads(segment[key_start:].decode("utf-8"))
+                segment = segment[:key_start].strip().strip(b",")
+
+            if segment:
+                data.update(json.loads(b"{" + segment + b"}", object_pairs_hook=collections.OrderedDict))
+            if child_container:
+                data[child_key] = child_container
+
+        else:
+            if segment:
+                data.extend(json.loads(b"[" + segment + b"]"))
+            if child_container:
+                data.append(child_container)
+
+        if child_container:
+            segment_start = child_container.end
+
+    return data
+
+
+def find_string_start(segment):
+    """offset of the opening quote of the string the segment ends with"""
+    quote_index = len(segment) - 1
+    while True:
+        quote_index = segment.rfind(b'"', 0, quote_index)
+
+        backslash_count = 0
+        while segment[quote_index - backslash_count - 1:quote_index - backslash_count] == b"\\":
+            backslash_count += 1
+
+        if backslash_count % 2 == 0:
+            return quote_index
+
+
+def preview_json(json_path, item_count=100):
+    """
+    Decode the first items of the top level container without reading the rest of the file
+
+    :param json_path:
+    :param item_count:
+    :return: (preview data, True if the container has more items than were read)
+    """
+    with open(json_path, "rb") as fp:
+        buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            root_match = non_whitespace_regex.search(buffer, 3 if buffer[:3] == codecs.BOM_UTF8 else 0)
+            if root_match is None or root_match.group() not in (b"{", b"["):
+                return json.loads(buffer[:].decode("utf-8-sig")), False
+
+            root_start = root_match.start()
+            is_map = buffer[root_start:root_start + 1] == b"{"
+            depth = 0
+            item_start = root_start + 1
+            item_texts = []
+
+            for match in container_token_regex.finditer(buffer, root_start):
+                token = match.group(1)
+                if token in b"{[":
+                    depth += 1
+                elif token != b",":
+                    depth -= 1
+                    if depth == 0:
+                        item_texts.append(buffer[item_start:match.end() - 1])
+                        break
+                elif depth == 1:
+                    item_texts.append(buffer[item_start:match.end() - 1])
+                    item_start = match.end()
+                    if len(item_texts) == item_count:
+                        break
+        finally:
+            buffer.close()
+
+    has_more_items = depth != 0
+    item_texts = [item_text for item_text in item_texts if item_text.strip()]
+    joined_text = b",".join(item_texts)
+    if is_map:
+        return json.loads(b"{" + joined_text + b"}", object_pairs_hook=collections.OrderedDict), has_more_items
+    return json.loads(b"[" + joined_text + b"]", object_pairs_hook=collections.OrderedDict), has_more_items
+
+
+def load_large_json(json_path, index_depth=3, progress_callback=None):
+    """
+    Open a json file as a LargeJsonFile
+
+    :param json_path:
+    :param index_depth: how deep to index containers up front, deeper ones are scanned when loaded
+    :param progress_callback: called with (bytes_scanned, total_bytes) while the index is built
+    :return: (LargeJsonFile, top level data)
+    """
+    large_file = LargeJsonFile(json_path, index_depth=index_depth, progress_callback=progress_callback)
+    return large_file, large_file.root()
@@ -1,11 +1,17 @@
 import collections
 import json
+import os
 import sys
 import time
 
 from . import batch_name
+from . import batch_rename
+from . import content_hash
+from . import data_diff
 from . import data_tree
+from . import file_search_ui
 from . import json_editor_system as system
+from . import json_query
 from . import ui_utils
 from .ui_utils import QtCore, QtWidgets, QtGui
 
@@ -25,11 +31,29 @@ class LocalConstants:
     keys_and_values = "Keys & Values"
     batch_modify_options = [keys_and_values, keys, values]
 
+    # large files
+    preview_item_count = 100
+
+    # wait for typing to pause before filtering
+    filter_delay_ms = 250
+
+    # filter text starting with $ is run as a json query, see json_query
+    query_result_limit = 10000
+
+    # find duplicate subtrees prints the biggest savings, with the first few paths of each
+    duplicate_report_count = 10
+    duplicate_report_path_count = 5
+
+    # a watched file is read again once it hasn't changed for this long, programs often write in several steps
+    watch_delay_ms = 300
+
 
 lk = LocalConstants
 
 
 class JsonEditorWidget(QtWidgets.QWidget):
+    saving_changed = QtCore.Signal(bool)  # edits are blocked while the tree is being written
+
     def __init__(self, *args, **kwargs):
         super(JsonEditorWidget, self).__init__(*args, **kwargs)
 
@@ -37,6 +61,17 @@ class JsonEditorWidget(QtWidgets.QWidget):
 
         self.active_json_indent_level = None
         self.last_font_change_time = 1
+        self._load_thread = None
+        self._large_json_file = None  # memory mapped file the tree is reading from
+        self._save_job = None
+        self._select_after_load = None  # data path to select once the loading file is shown
+
+        # the open file is read again when another program changes it, see set_watch_file()
+        self._watch_file = False
+        self._watch_thread = None
+        self._disk_data = None  # data of the file as the tree shows it, None if it has to be read from the tree
+        self._disk_revision = None  # undo_stack.revision the tree had when it matched the file
+        self._disk_file_stat = None  # system.get_file_stat() of the file when it was read or saved
 
         self.path_widget = ui_utils.QtPathWidget(
             settings_name="JsonEditor",
@@ -45,10 +80,36 @@ class JsonEditorWidget(QtWidgets.QWidget):
             only_show_existing_recent_paths=True,
         )
 
+        # shown while a file is being read in the background
+        self.load_progress_bar = QtWidgets.QProgressBar()
+        self.load_progress_bar.setRange(0, 1000)
+        self.load_cancel_button = QtWidgets.QPushButton("Cancel")
+        self.load_cancel_button.clicked.connect(self.cancel_load)
+
+        load_progress_layout = QtWidgets.QHBoxLayout()
+        load_progress_layout.setContentsMargins(0, 0, 0, 0)
+        load_progress_layout.addWidget(self.load_progress_bar)
+        load_progress_layout.addWidget(self.load_cancel_button)
+        self.load_progress_widget = QtWidgets.QWidget()
+        self.load_progress_widget.setLayout(load_progress_layout)
+        self.load_progress_widget.setVisible(False)
+
         self.filter_widget = QtWidgets.QLineEdit()
-        self.filter_widget.setPlaceholderText("filter")
+        self.filter_widget.setPlaceholderText("filter, or a query like $.key[*].child")
         self.filter_widget.setClearButtonEnabled(True)
-        self.filter_widget.textEdited.connect(self.filter_data)
+        self.filter_widget.textEdited.connect(self.filter_text_edited)
+
+        self.filter_timer = QtCore.QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(lk.filter_delay_ms)
+        self.filter_timer.timeout.connect(self.filter_data)
+
+        self.file_watcher = QtCore.QFileSystemWatcher(self)
+        self.file_watcher.fileChanged.connect(self.watched_file_changed)
+        self.watch_timer = QtCore.QTimer(self)
+        self.watch_timer.setSingleShot(True)
+        self.watch_timer.setInterval(lk.watch_delay_ms)
+        self.watch_timer.timeout.connect(self.read_watched_file)
 
         self.data_tree_widget = data_tree.DataTreeWidget()
         self.batch_modify_widget = batch_name.BatchNameWidget()
@@ -81,6 +142,7 @@ class JsonEditorWidget(QtWidgets.QWidget):
         ###########################################################
 
         self.main_layout.addWidget(self.path_widget)
+        self.main_layout.addWidget(self.load_progress_widget)
         self.main_layout.addWidget(self.filter_widget)
         self.main_layout.addWidget(self.data_tree_widget)
         self.main_layout.addWidget(self.batch_modify_widget)
@@ -89,110 +151,263 @@ class JsonEditorWidget(QtWidgets.QWidget):
 
         self.path_widget.path_changed.connect(self.load_json)
 
+    def get_modify_rename_function(self):
+        """
+        :return: function that renames a string with the batch modify rules, or None if the rules are invalid
+        """
+        try:
+            return self.batch_modify_widget.get_rename_function()
+        except batch_rename.RenameRulesError as e:
+            print(e)
+            return None
+
     def modify_rename(self):
         modify_keys = self.modify_type_chooser.currentText() in (lk.keys, lk.keys_and_values)
         modify_values = self.modify_type_chooser.currentText() in (lk.values, lk.keys_and_values)
 
-        items_to_modify = self.data_tree_widget.get_selected_items()
-
-        if self.modify_hierarchy.isChecked():
-            item_descendants = []
-            for item in items_to_modify:
-                item_descendants.extend(data_tree.get_all_item_descendants(item))
-            items_to_modify.extend(item_descendants)
-
-        for item in items_to_modify:
-            if modify_keys:
-                item.setText(
-                    data_tree.lk.col_key,
-                    self.batch_modify_widget.modify_string(item.text(data_tree.lk.col_key))
-                )
+        rename = self.get_modify_rename_function()
+        if rename is None:
+            return
 
-            if modify_values and not data_tree.item_supports_children(item):
-                item.setText(
-                    data_tree.lk.col_value,
-                    self.batch_modify_widget.modify_string(item.text(data_tree.lk.col_value))
-                )
+        self.data_tree_widget.rename_items(
+            self.data_tree_widget.get_selected_items(),
+            rename,
+            keys=modify_keys,
+            values=modify_values,
+            hierarchy=self.modify_hierarchy.isChecked(),
+        )
 
     def modify_duplicate(self):
         modify_keys = self.modify_type_chooser.currentText() in (lk.keys, lk.keys_and_values)
         modify_values = self.modify_type_chooser.currentText() in (lk.values, lk.keys_and_values)
 
-        for item in self.data_tree_widget.get_selected_items():
-            item_data = self.data_tree_widget.get_widget_item_values(item)
-            item_key = item.text(data_tree.lk.col_key)
-            if modify_keys:
-                item_key = self.batch_modify_widget.modify_string(item_key)
+        rename = self.get_modify_rename_function()
+        if rename is None:
+            return
 
-            parent = item.parent() if item.parent() else self.data_tree_widget.tree_widget.invisibleRootItem()
+        with self.data_tree_widget.undo_step("Duplicate"):
+            new_items = self.data_tree_widget.duplicate_items(
+                self.data_tree_widget.get_selected_items(),
+                modify_key=rename if modify_keys else None,
+            )
 
-            new_item = self.data_tree_widget.add_data_to_widget(
-                data_key=item_key,
-                data_value=item_data,
-                parent_item=parent,
-                merge=not data_tree.item_supports_children(item),
-                key_safety=True
+            # key of the copies has already been modified
+            self.data_tree_widget.rename_items(
+                new_items,
+                rename,
+                keys=False,
+                values=modify_values,
+                hierarchy=self.modify_hierarchy.isChecked() and not modify_keys,
             )
+            if modify_keys and self.modify_hierarchy.isChecked():
+                child_items = []
+                for new_item in new_items:
+                    child_items.extend(data_tree.get_sub_widgets(new_item))
+                self.data_tree_widget.rename_items(
+                    child_items, rename, keys=True, values=modify_values, hierarchy=True)
+
+    def filter_text_edited(self):
+        if self.filter_widget.text():
+            self.filter_timer.start()
+        else:
+            # cleared, no need to wait
+            self.filter_timer.stop()
+            self.filter_data()
 
-            # insert next to the original
-            item_index = parent.indexOfChild(item)
-            parent.takeChild(parent.indexOfChild(new_item))
-            parent.insertChild(item_index + 1, new_item)
+    def filter_data(self):
+        if self._save_job is not None:
+            self.filter_timer.start()  # filtering fetches and hides items, look again once the save is done
+            return
 
-            items_to_modify = [new_item]
-            if self.modify_hierarchy.isChecked():
-                items_to_modify.extend(data_tree.get_all_item_descendants(new_item))
+        filter_text = self.filter_widget.text()
 
-            for duped_item in items_to_modify:
-                if modify_keys and duped_item != new_item:  # key has already been modified, so can skip that on root
-                    duped_item.setText(
-                        data_tree.lk.col_key,
-                        self.batch_modify_widget.modify_string(duped_item.text(data_tree.lk.col_key))
-                    )
+        if json_query.is_query(filter_text):
+            self.data_tree_widget.set_filter("")
+            self.select_query_results(filter_text)
+            return
 
-                if modify_values and not data_tree.item_supports_children(duped_item):
-                    duped_item.setText(
-                        data_tree.lk.col_value,
-                        self.batch_modify_widget.modify_string(duped_item.text(data_tree.lk.col_value))
-                    )
+        # expands the parents of the matches, clearing the filter puts back what was expanded before it
+        self.data_tree_widget.set_filter(filter_text, search_columns=(data_tree.lk.col_key, data_tree.lk.col_value))
 
-            data_tree.fix_list_indices(parent)
+    def select_query_results(self, query_text):
+        try:
+            result_items = self.data_tree_widget.find_query_items(query_text, limit=lk.query_result_limit)
+        except json_query.JsonQueryError as e:
+            print(e)
+            return
 
-    def filter_data(self):
-        filter_text = self.filter_widget.text()
+        self.data_tree_widget.select_items(result_items)
+        if len(result_items) >= lk.query_result_limit:
+            print("Selected the first {} results of: {}".format(lk.query_result_limit, query_text))
+        else:
+            print("Selected {} results of: {}".format(len(result_items), query_text))
 
-        self.data_tree_widget.set_filter(filter_text, search_columns=(data_tree.lk.col_key, data_tree.lk.col_value))
+    def report_duplicate_subtrees(self):
+        """
+        Print the containers that appear more than once and select the ones with the biggest savings
+        """
+        if not self.data_tree_widget.has_data():
+            return
 
-        if filter_text:
-            self.data_tree_widget.tree_widget.expandAll()
-        else:
-            self.data_tree_widget.tree_widget.expandToDepth(self.data_tree_widget.default_expand_depth)
+        duplicates = self.data_tree_widget.find_duplicate_subtrees()
+        if not duplicates:
+            print("No duplicate subtrees of {} characters or more".format(content_hash.lk.min_duplicate_size))
+            return
+
+        for duplicate in duplicates[:lk.duplicate_report_count]:
+            paths = [json_query.format_path(data_path) for data_path in duplicate.paths]
+            if len(paths) > lk.duplicate_report_path_count:
+                paths = paths[:lk.duplicate_report_path_count] + ["..."]
+            print("{} copies of {} characters, {} could be saved: {}".format(
+                len(duplicate.paths), duplicate.size, duplicate.get_saved_size(), ", ".join(paths)))
+
+        items = [self.data_tree_widget.get_item_at_path(data_path) for data_path in duplicates[0].paths]
+        self.data_tree_widget.select_items([item for item in items if item is not None])
 
     def data_visibility_state_changed(self, state):
         self.helper_overlay.setVisible(not state)
 
     ###############################################################################
     # File Handling
-    def load_json(self, path):
-        json_data = system.load_json(path)
-        if json_data is None:
+    def load_json(self, path, large_file=False):
+        """
+        Read the file in a background thread, the tree is only replaced once it's done
+
+        :param path:
+        :param large_file: memory map the file and only decode the parts that get expanded
+        :return:
+        """
+        self.cancel_load()
+
+        if not os.path.exists(path):
+            return
+
+        load_thread = JsonLoadThread(path, large_file=large_file, parent=self)
+        load_thread.progress.connect(self.load_progress_changed)
+        load_thread.loaded.connect(self.json_loaded)
+        load_thread.finished.connect(self.load_thread_finished)
+        self._load_thread = load_thread
+
+        self.load_progress_bar.setValue(0)
+        self.load_progress_bar.setFormat("Loading {} - %p%".format(os.path.basename(path)))
+        self.load_progress_widget.setVisible(True)
+        load_thread.start()
+
+    def open_json_at_path(self, path, data_path):
+        """
+        Open the file and select the item at the data path, the file isn't loaded again if it's already open
+
+        :param path:
+        :param data_path: keys and list indices leading to the item
+        :return:
+        """
+        if self.data_tree_widget.has_data() and self._load_thread is None \
+                and os.path.normcase(os.path.abspath(self.path_widget.path())) == os.path.normcase(path):
+            self.select_data_path(data_path)
             return
 
+        self.path_widget.set_path(path, emit_change_signal=False)
+        self.load_json(path)
+        self._select_after_load = data_path
+
+    def select_data_path(self, data_path):
+        item = self.data_tree_widget.get_item_at_path(data_path)
+        if item is None:
+            print("Nothing found at: {}".format(json_query.format_path(data_path)))
+            return
+        self.data_tree_widget.select_items([item])
+
+    def cancel_load(self):
+        self._select_after_load = None
+        if self._watch_thread is not None:
+            self._watch_thread.cancel()
+            self._watch_thread = None
+
+        if self._load_thread is None:
+            return
+
+        self._load_thread.cancel()
+        self._load_thread = None
+        self.load_progress_widget.setVisible(False)
+
+    def load_progress_changed(self, bytes_read, total_bytes):
+        if total_bytes:
+            self.load_progress_bar.setValue(int(1000 * bytes_read / total_bytes))
+
+    def json_loaded(self, path, json_data):
+        load_thread = self.sender()
+        if load_thread is not self._load_thread:
+            if load_thread.large_json_file:
+                load_thread.large_json_file.close()
+            return  # cancelled or replaced by a newer load
+
+        self._load_thread = None
+        self.load_progress_widget.setVisible(False)
+
         self.active_json_indent_level = system.get_json_indent_level(path)
         if self.active_json_indent_level is not None:
             print("found indentation in file, setting to: {}".format(self.active_json_indent_level))
 
+        self.cancel_save()
         self.data_tree_widget.set_data(json_data)
+        self.set_large_json_file(load_thread.large_json_file)
+        self.set_disk_state(None if load_thread.large_json_file else json_data, load_thread.file_stat)
         print("Loaded Json from: {}".format(path))
 
+        select_data_path, self._select_after_load = self._select_after_load, None
+        if select_data_path is not None:
+            self.select_data_path(select_data_path)
+
+    def load_thread_finished(self):
+        load_thread = self.sender()
+        if load_thread is self._load_thread:
+            # finished without sending data, so something went wrong
+            self._load_thread = None
+            self.load_progress_widget.setVisible(False)
+        load_thread.deleteLater()
+
+    def open_large_json(self):
+        path = self.path_widget.get_dialog_path()
+        if not path:
+            return
+
+        self.path_widget.set_path(path, emit_change_signal=False)
+        self.load_json(path, large_file=True)
+
+    def preview_large_json(self):
+        """Show the first items of a file without reading the rest of it"""
+        path = self.path_widget.get_dialog_path()
+        if not path:
+            return
+
+        preview_data, has_more_items = system.preview_json(path, item_count=lk.preview_item_count)
+
+        # not the full file, so don't let it be saved over the original
+        self.new_file()
+        self.data_tree_widget.set_data(preview_data)
+
+        if has_more_items:
+            print("Previewing the first {} items of: {}".format(lk.preview_item_count, path))
+        else:
+            print("Previewing: {}".format(path))
+
+    def set_large_json_file(self, large_json_file):
+        if self._large_json_file is not None and self._large_json_file is not large_json_file:
+            self._large_json_file.close()
+        self._large_json_file = large_json_file
+        self.update_watched_path()
+
     def new_file(self):
+        self.cancel_load()
+        self.cancel_save()
         self.path_widget.set_path("")
         self.data_tree_widget.action_clear()
+        self.set_large_json_file(None)
+        self.set_disk_state(None, None)
         self.active_json_indent_level = None
 
     def save_json(self, path=None):
-        data_from_ui = self.data_tree_widget.get_data()
-        if data_from_ui == "":
+        if not self.data_tree_widget.has_data():
             print("No data found in UI, please define a root type before saving")
             return
 
@@ -202,21 +417,176 @@ class JsonEditorWidget(QtWidgets.QWidget):
                 path = ui_path
             else:
                 path = self.path_widget.get_dialog_path()
+        if not path:
+            return
 
-        system.save_json(data_from_ui, path, indent=self.active_json_indent_level)
-        print("Saved Json to: {}".format(path))
+        self.cancel_save()
+
+        if (os.name == "nt" and self._large_json_file and
+                os.path.normpath(path) == os.path.normpath(self._large_json_file.json_path)):
+            # windows can't replace a file that is memory mapped, so read the rest of it into the tree first
+            self.data_tree_widget.set_data(self.data_tree_widget.get_data())
+            self.set_large_json_file(None)
+
+        save_job = JsonSaveJob(self.data_tree_widget, path, indent=self.active_json_indent_level, parent=self)
+        save_job.saved.connect(self.json_saved)
+        save_job.failed.connect(self.json_save_failed)
+        self._save_job = save_job
+
+        self.set_edits_enabled(False)
+        save_job.start()
 
         # file was newly saved, set the path in the UI
         if not ui_path:
-            self.path_widget.set_path(path)
+            self.path_widget.set_path(path, emit_change_signal=False)
+
+    def cancel_save(self):
+        if self._save_job is None:
+            return
+
+        self._save_job.cancel()
+        self.save_job_done()
+
+    def save_job_done(self):
+        self._save_job.deleteLater()
+        self._save_job = None
+        self.set_edits_enabled(True)
+
+    def set_edits_enabled(self, enabled):
+        """
+        Items can't change while they're being written, so everything that edits or filters the tree is disabled
+        during a save. The edit actions of the window follow saving_changed
+
+        :param enabled:
+        :return:
+        """
+        for widget in (self.data_tree_widget, self.filter_widget, self.modify_rename_button,
+                       self.modify_duplicate_button):
+            widget.setEnabled(enabled)
+        self.saving_changed.emit(not enabled)
+
+    def json_saved(self, path):
+        # lets the next save copy everything that hasn't been edited from this file
+        self.data_tree_widget.set_json_snapshot(system.JsonFileSnapshot(path, self._save_job.indent))
+        self.save_job_done()
+        if path == self.path_widget.path():
+            self.set_disk_state(None, system.get_file_stat(path))
+        print("Saved Json to: {}".format(path))
+
+    def json_save_failed(self, path, error_message):
+        self.save_job_done()
+        print("Could not save Json to: {}\n{}".format(path, error_message))
 
     def save_json_as(self):
         new_path = self.path_widget.get_dialog_path()
+        if not new_path:
+            return
+
         self.save_json(new_path)
-        self.path_widget.set_path(new_path)
+        self.path_widget.set_path(new_path, emit_change_signal=False)
 
     def reload(self):
-        self.load_json(self.path_widget.path())
+        self.load_json(self.path_widget.path(), large_file=self._large_json_file is not None)
+
+    ###############################################################################
+    # File Watching
+    def set_watch_file(self, watch_file):
+        """
+        Follow the changes other programs make to the open file. It's read again in the background
+        and only the values that changed are updated in the tree, see DataTreeWidget.apply_data_changes().
+        Edits that haven't been saved are never replaced, and large files aren't watched.
+
+        :param watch_file:
+        :return:
+        """
+        self._watch_file = watch_file
+        self.update_watched_path()
+
+    def update_watched_path(self):
+        watched_paths = self.file_watcher.files()
+        path = self.path_widget.path()
+        if not self._watch_file or self._large_json_file is not None or not path:
+            path = None
+        if watched_paths and watched_paths != [path]:
+            self.file_watcher.removePaths(watched_paths)
+        if path and path not in self.file_watcher.files() and os.path.exists(path):
+            self.file_watcher.addPath(path)
+
+    def set_disk_state(self, disk_data, file_stat):
+        """
+        Remember that the tree shows the file as it is now
+
+        :param disk_data: data that was read from the file, None to read it from the tree once it's needed
+        :param file_stat: system.get_file_stat() of the file
+        :return:
+        """
+        self._disk_data = disk_data
+        self._disk_revision = self.data_tree_widget.undo_stack.revision
+        self._disk_file_stat = file_stat
+        self.update_watched_path()
+
+    def watched_file_changed(self, path):
+        self.watch_timer.start()
+
+    def read_watched_file(self):
+        path = self.path_widget.path()
+        if not self._watch_file or self._large_json_file is not None or not path:
+            return
+
+        # programs that replace the file instead of writing to it make the watcher lose it
+        if not os.path.exists(path):
+            self.watch_timer.start()
+            return
+        self.update_watched_path()
+
+        if self._load_thread is not None or self._watch_thread is not None or self._save_job is not None:
+            self.watch_timer.start()  # look again once that's done
+            return
+
+        file_stat = system.get_file_stat(path)
+        if file_stat == self._disk_file_stat:
+            return  # saved from here
+        if self.data_tree_widget.undo_stack.revision != self._disk_revision:
+            print("Json changed on disk, keeping the edits that weren't saved: {}".format(path))
+            self._disk_file_stat = file_stat
+            return
+
+        compare_data = self._disk_data
+        if compare_data is None:
+            compare_data = self.data_tree_widget.get_data()
+        watch_thread = JsonLoadThread(path, compare_data=compare_data, parent=self)
+        watch_thread.loaded.connect(self.watched_file_loaded)
+        watch_thread.finished.connect(self.watch_thread_finished)
+        self._watch_thread = watch_thread
+        watch_thread.start()
+
+    def watched_file_loaded(self, path, json_data):
+        watch_thread = self.sender()
+        if watch_thread is not self._watch_thread:
+            return
+        self._watch_thread = None
+
+        if path != self.path_widget.path():
+            return
+        if self._save_job is not None:
+            self.watch_timer.start()  # read it again once the save is done
+            return
+        if self.data_tree_widget.undo_stack.revision != self._disk_revision:
+            self.watch_timer.start()  # edited while it was read
+            return
+
+        self.data_tree_widget.apply_data_changes(
+            json_data, watch_thread.compare_data, watch_thread.data_changes, text="Reload from Disk")
+        self.data_tree_widget.clear_json_snapshot()
+        self.set_disk_state(json_data, watch_thread.file_stat)
+        if watch_thread.data_changes:
+            print("Updated {} values from: {}".format(len(watch_thread.data_changes), path))
+
+    def watch_thread_finished(self):
+        load_thread = self.sender()
+        if load_thread is self._watch_thread:
+            self._watch_thread = None  # couldn't be read, maybe it was still being written
+        load_thread.deleteLater()
 
     ###############################################################################
     # Overrides
@@ -251,6 +621,7 @@ class JsonEditorWidget(QtWidgets.QWidget):
             try:
                 text = event.mimeData().text()
                 json_data = json.loads(text, object_pairs_hook=collections.OrderedDict)
+                self.cancel_save()
                 self.data_tree_widget.set_data(json_data)
             except Exception as e:
                 self.status_message("No JSON serializable data could be read from string")
@@ -274,6 +645,117 @@ class JsonEditorWidget(QtWidgets.QWidget):
         self.helper_overlay.font_size = size + 6
 
 
+class JsonLoadThread(QtCore.QThread):
+    progress = QtCore.Signal(object, object)
+    loaded = QtCore.Signal(str, object)
+
+    def __init__(self, path, large_file=False, compare_data=data_diff.missing, parent=None):
+        """
+        :param path:
+        :param large_file: see system.load_large_json
+        :param compare_data: data to compare the loaded data to, the differences are kept in data_changes
+        :param parent:
+        """
+        super(JsonLoadThread, self).__init__(parent)
+        self.path = path
+        self.large_file = large_file
+        self.large_json_file = None
+        self.compare_data = compare_data
+        self.data_changes = None  # data_diff.DataChange from the compare data to the loaded data
+        self.file_stat = None  # system.get_file_stat() from before the file was read
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        self.file_stat = system.get_file_stat(self.path)
+        try:
+            if self.large_file:
+                self.large_json_file, json_data = system.load_large_json(
+                    self.path,
+                    progress_callback=self.report_progress,
+                )
+            else:
+                json_data = system.load_json(self.path, progress_callback=self.report_progress)
+        except system.LoadCancelled:
+            return
+        except Exception as e:
+            print("Failed to load Json from: {}\n{}".format(self.path, e))
+            return
+
+        if self._cancelled:
+            if self.large_json_file:
+                self.large_json_file.close()
+            return
+
+        if json_data is not None and self.compare_data is not data_diff.missing:
+            self.data_changes = list(data_diff.iter_data_changes(self.compare_data, json_data))
+
+        if json_data is not None:
+            self.loaded.emit(self.path, json_data)
+
+    def report_progress(self, bytes_read, total_bytes):
+        if self._cancelled:
+            raise system.LoadCancelled()
+        self.progress.emit(bytes_read, total_bytes)
+
+
+class JsonSaveJob(QtCore.QObject):
+    """
+    Writes the tree to disk in short time slices on the GUI thread, since tree items can't be read from another.
+    The encoded text goes straight to a temp file instead of building the data in memory first
+    """
+    saved = QtCore.Signal(str)
+    failed = QtCore.Signal(str, str)
+
+    slice_duration = 0.03
+
+    def __init__(self, data_tree_widget, path, indent=None, parent=None):
+        super(JsonSaveJob, self).__init__(parent)
+        self.path = path
+        self.indent = indent
+        self._chunks = data_tree_widget.iter_json_chunks(indent=indent)
+        self._file_writer = None
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.write_chunks)
+
+    def start(self):
+        try:
+            self._file_writer = system.JsonFileWriter(self.path)
+        except (IOError, OSError) as e:
+            self.failed.emit(self.path, str(e))
+            return
+        self._timer.start()
+
+    def cancel(self):
+        self._timer.stop()
+        self._chunks.close()
+        if self._file_writer is not None:
+            self._file_writer.abort()
+            self._file_writer = None
+
+    def write_chunks(self):
+        end_time = time.time() + self.slice_duration
+        try:
+            for chunk in self._chunks:
+                self._file_writer.write(chunk)
+                if time.time() > end_time:
+                    return  # continue on the next timeout
+
+            self._timer.stop()
+            self._file_writer.commit()
+            self._file_writer = None
+        except Exception as e:
+            self.cancel()
+            self.failed.emit(self.path, str(e))
+            return
+
+        self.saved.emit(self.path)
+
+
 class HelperMessageOverlay(QtWidgets.QWidget):
     def __init__(self, parent=None):
         super(HelperMessageOverlay, self).__init__(parent)
@@ -306,19 +788,44 @@ class JsonEditorWindow(ui_utils.ToolWindow):
         self.setCentralWidget(self.ui)
         self.setWindowTitle("JSON Editor")
 
+        self.file_search_widget = file_search_ui.FileSearchWidget(get_recent_paths=self.get_recent_paths)
+        self.file_search_widget.result_activated.connect(self.ui.open_json_at_path)
+        self.file_search_dock = QtWidgets.QDockWidget("Find in Files")
+        self.file_search_dock.setObjectName("FileSearchDock")
+        self.file_search_dock.setWidget(self.file_search_widget)
+        self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, self.file_search_dock)
+        self.file_search_dock.setVisible(False)
+
         menu_bar = QtWidgets.QMenuBar()
         file_menu = menu_bar.addMenu("File")
         file_menu.setTearOffEnabled(True)
         file_menu.addAction("New", self.ui.new_file, QtGui.QKeySequence("Ctrl+N"))
         file_menu.addAction("Open", self.ui.path_widget.open_dialog_and_set_path, QtGui.QKeySequence("Ctrl+O"))
+        file_menu.addAction("Open as Large File...", self.ui.open_large_json)
+        file_menu.addAction("Preview Large File...", self.ui.preview_large_json)
         file_menu.addAction("Save", self.ui.save_json, QtGui.QKeySequence("Ctrl+S"))
         file_menu.addAction("Save As...", self.ui.save_json_as, QtGui.QKeySequence("Ctrl+Shift+S"))
+        file_menu.addAction("Compare with File...", self.open_compare_window)
         file_menu.addSeparator()
         file_menu.addAction("Reload from Disk", self.ui.reload, QtGui.QKeySequence("F5"))
+        self.watch_file_action = file_menu.addAction("Watch File for Changes")
+        self.watch_file_action.setCheckable(True)
+        self.watch_file_action.toggled.connect(self.ui.set_watch_file)
 
         edit_menu = menu_bar.addMenu("Edit")
         edit_menu.setTearOffEnabled(True)
-        edit_menu.addAction(
+        self.undo_action = edit_menu.addAction(
+            "Undo",
+            self.ui.data_tree_widget.undo,
+            QtGui.QKeySequence("Ctrl+Z"),
+        )
+
+        self.redo_action = edit_menu.addAction("Redo", self.ui.data_tree_widget.redo)
+        self.redo_action.setShortcuts([QtGui.QKeySequence("Ctrl+Shift+Z"), QtGui.QKeySequence("Ctrl+Y")])
+        edit_menu.aboutToShow.connect(self.update_undo_actions)
+
+        edit_menu.addSeparator()
+        cut_action = edit_menu.addAction(
             "Cut",
             self.ui.data_tree_widget.action_cut_data_to_clipboard,
             QtGui.QKeySequence("Ctrl+X"),
@@ -330,48 +837,65 @@ class JsonEditorWindow(ui_utils.ToolWindow):
             QtGui.QKeySequence("Ctrl+C"),
         )
 
-        edit_menu.addAction(
+        paste_action = edit_menu.addAction(
             "Paste",
             self.ui.data_tree_widget.action_paste_data_from_clipboard,
             QtGui.QKeySequence("Ctrl+V"),
         )
 
-        edit_menu.addAction(
+        duplicate_action = edit_menu.addAction(
             "Duplicate",
             self.ui.data_tree_widget.action_duplicate_selected_items,
             QtGui.QKeySequence("Ctrl+D"),
         )
 
-        edit_menu.addAction(
+        delete_action = edit_menu.addAction(
             "Delete",
             self.ui.data_tree_widget.delete_selected_items,
             QtGui.QKeySequence("DEL"),
         )
 
         edit_menu.addSeparator()
-        edit_menu.addAction(
+        move_up_action = edit_menu.addAction(
             "Move Up",
             self.ui.data_tree_widget.action_move_selected_items_up,
             QtGui.QKeySequence("Alt+Up"),
         )
 
-        edit_menu.addAction(
+        move_down_action = edit_menu.addAction(
             "Move Down",
             self.ui.data_tree_widget.action_move_selected_items_down,
             QtGui.QKeySequence("Alt+Down"),
         )
 
-        edit_menu.addAction(
+        sort_action = edit_menu.addAction(
             "Sort Alphabetical",
             self.ui.data_tree_widget.sort_selected_items,
         )
 
-        edit_menu.addAction(
+        select_hierarchy_action = edit_menu.addAction(
             "Select Hierarchy",
             self.ui.data_tree_widget.select_hierarchy,
             QtGui.QKeySequence("Ctrl+Down"),
         )
 
+        find_duplicates_action = edit_menu.addAction(
+            "Find Duplicate Subtrees",
+            self.ui.report_duplicate_subtrees,
+        )
+
+        # these change the tree or create its items, which can't happen while it's being saved
+        self.edit_actions = [
+            self.undo_action, self.redo_action, cut_action, paste_action, duplicate_action, delete_action,
+            move_up_action, move_down_action, sort_action, select_hierarchy_action, find_duplicates_action,
+        ]
+        self.ui.saving_changed.connect(self.set_edit_actions_disabled)
+
+        edit_menu.addSeparator()
+        find_in_files_action = self.file_search_dock.toggleViewAction()
+        find_in_files_action.setShortcut(QtGui.QKeySequence("Ctrl+Shift+F"))
+        edit_menu.addAction(find_in_files_action)
+
         display_menu = menu_bar.addMenu("Display")
         display_menu.setTearOffEnabled(True)
         display_menu.addAction(
@@ -393,6 +917,34 @@ class JsonEditorWindow(ui_utils.ToolWindow):
 
         self.setMenuBar(menu_bar)
 
+    def set_edit_actions_disabled(self, disabled):
+        for action in self.edit_actions:
+            action.setDisabled(disabled)
+
+    def update_undo_actions(self):
+        undo_stack = self.ui.data_tree_widget.undo_stack
+        self.undo_action.setText("Undo {}".format(undo_stack.undo_text()).strip())
+        self.redo_action.setText("Redo {}".format(undo_stack.redo_text()).strip())
+
+    def get_recent_paths(self):
+        return self.ui.path_widget.get_recent_paths(full_paths=True, only_existing=True)
+
+    def open_compare_window(self):
+        """Compare the open file with another file, side by side"""
+        from . import data_compare_ui  # it imports this module
+
+        right_path = self.ui.path_widget.get_dialog_path()
+        if not right_path:
+            return
+
+        compare_window = data_compare_ui.DataCompareWindow()
+        compare_window.main()
+        compare_window.resize(1200, 900)
+        left_path = self.ui.path_widget.path()
+        if left_path:
+            compare_window.ui.left_pane.set_path(left_path)
+        compare_window.ui.right_pane.set_path(right_path)
+
 
 def main(file_path=None, refresh=False):
     win = JsonEditorWindow()
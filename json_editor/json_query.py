@@ -0,0 +1,574 @@
+"""
+JSONPath style queries over json data
+
+    $.characters[*].rig.joints[?(@.weight > 0.5)]
+
+Supported:
+    $               the root
+    .key ['key']    child by key, ["a", "b"] for several
+    [0] [-1]        list index, [0, 2] for several
+    [1:5:2]         list slice
+    .* [*]          every child
+    ..key ..*       descendants at any depth
+    [?(expr)]       children where expr is true, expr uses @ for the child
+                    and supports == != < <= > >= =~ (regex) && || ! and parentheses
+
+Queries are compiled once into a chain of generators, so results come out one at a time
+and stop being evaluated as soon as the caller stops asking for more.
+"""
+import array
+import re
+import sys
+
+from .json_editor_system import DeferredContainer
+
+if sys.version_info.major >= 3:
+    string_types = str
+else:
+    string_types = basestring
+
+
+class JsonQueryError(ValueError):
+    pass
+
+
+class LocalConstants:
+    dict_kind = "dict"
+    list_kind = "list"
+
+    compiled_query_cache_size = 100
+
+
+lk = LocalConstants
+
+missing = object()  # returned by get_child when there's nothing at the key
+
+token_regex = re.compile(r"""
+    \s*(?:
+        (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)|
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')|
+        (?P<name>[^\W\d][\w-]*)|
+        (?P<operator>\.\.|==|!=|<=|>=|=~|&&|\|\||[$@.\[\](),:*?<>!])
+    )
+""", re.VERBOSE | re.UNICODE)
+
+string_escape_regex = re.compile(r"\\(.)")
+
+literal_names = {"true": True, "false": False, "null": None}
+
+comparison_operators = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+class DataAdapter(object):
+    """
+    How a query walks the document, this one walks plain python data.
+    Subclass it to run queries over something else, like the items of a tree widget
+    """
+
+    def __init__(self):
+        self._loaded_containers = {}  # id: (container, loaded data)
+
+    def resolve(self, node):
+        if not isinstance(node, DeferredContainer):
+            return node
+
+        loaded = self._loaded_containers.get(id(node))
+        if loaded is None:
+            loaded = (node, node.load(max_depth=1))
+            self._loaded_containers[id(node)] = loaded
+        return loaded[1]
+
+    def get_kind(self, node):
+        """
+        :return: lk.dict_kind, lk.list_kind or None for values
+        """
+        return get_data_kind(node)
+
+    def get_child(self, node, key):
+        node = self.resolve(node)
+        try:
+            return node[key]
+        except (KeyError, IndexError, TypeError):
+            return missing
+
+    def get_length(self, node):
+        if isinstance(node, DeferredContainer):
+            return node.item_count
+        return len(node)
+
+    def iter_children(self, node):
+        """
+        :return: (key or index, child node) pairs
+        """
+        node = self.resolve(node)
+        if isinstance(node, dict):
+            return iter(node.items())
+        return enumerate(node)
+
+    def get_value(self, node):
+        """
+        :return: the value filters compare against
+        """
+        return node
+
+
+def get_data_kind(data):
+    if isinstance(data, dict):
+        return lk.dict_kind
+    if isinstance(data, (list, tuple, array.array)):
+        return lk.list_kind
+    if isinstance(data, DeferredContainer):
+        return lk.dict_kind if issubclass(data.data_type, dict) else lk.list_kind
+    return None
+
+
+class JsonQuery(object):
+    def __init__(self, query_text, segments):
+        self.query_text = query_text
+        self._segments = segments
+
+    def __repr__(self):
+        return "JsonQuery({!r})".format(self.query_text)
+
+    def iter_matches(self, root, adapter=None):
+        """
+        :param root: data or node to search from
+        :param adapter: DataAdapter for the nodes, plain python data by default
+        :return: generator of (path, node), path is a tuple of the keys and indices leading to the node
+        """
+        if adapter is None:
+            adapter = DataAdapter()
+
+        matches = iter([((), root)])
+        for segment in self._segments:
+            matches = segment(matches, adapter)
+        return matches
+
+    def find_paths(self, data, limit=None):
+        paths = []
+        for path, _ in self.iter_matches(data):
+            paths.append(path)
+            if limit is not None and len(paths) >= limit:
+                break
+        return paths
+
+    def find_values(self, data, limit=None):
+        adapter = DataAdapter()
+        values = []
+        for _, node in self.iter_matches(data, adapter):
+            values.append(adapter.resolve(node))
+            if limit is not None and len(values) >= limit:
+                break
+        return values
+
+
+_compiled_queries = {}
+
+
+def compile_query(query_text):
+    """
+    :param query_text:
+    :return: JsonQuery, the same instance for the same text
+    """
+    query = _compiled_queries.get(query_text)
+    if query is None:
+        if len(_compiled_queries) >= lk.compiled_query_cache_size:
+            _compiled_queries.clear()
+        query = JsonQuery(query_text, QueryParser(query_text).parse_query())
+        _compiled_queries[query_text] = query
+    return query
+
+
+def is_query(text):
+    return text.lstrip().startswith("$")
+
+
+name_regex = re.compile(r"[^\W\d][\w-]*$", re.UNICODE)
+
+
+def format_path(data_path):
+    """
+    :param data_path: keys and list indices
+    :return: query text that finds the node at the path, like $.key[0]['other key']
+    """
+    parts = ["$"]
+    for key in data_path:
+        if isinstance(key, int):
+            parts.append("[{}]".format(key))
+        elif name_regex.match(key) and key not in literal_names:
+            parts.append("." + key)
+        else:
+            parts.append("['{}']".format(key.replace("\\", "\\\\").replace("'", "\\'")))
+    return "".join(parts)
+
+
+#####################################################################################################################
+# Segments, each one turns a stream of (path, node) into the next one
+
+
+def child_segment(keys):
+    def select(matches, adapter):
+        get_child = adapter.get_child
+        for path, node in matches:
+            if adapter.get_kind(node) != lk.dict_kind:
+                continue
+            for key in keys:
+                child = get_child(node, key)
+                if child is not missing:
+                    yield path + (key,), child
+    return select
+
+
+def index_segment(indices):
+    def select(matches, adapter):
+        for path, node in matches:
+            if adapter.get_kind(node) != lk.list_kind:
+                continue
+            length = adapter.get_length(node)
+            for index in indices:
+                if index < 0:
+                    index += length
+                if 0 <= index < length:
+                    yield path + (index,), adapter.get_child(node, index)
+    return select
+
+
+def slice_segment(start, stop, step):
+    def select(matches, adapter):
+        for path, node in matches:
+            if adapter.get_kind(node) != lk.list_kind:
+                continue
+            for index in range(*slice(start, stop, step).indices(adapter.get_length(node))):
+                yield path + (index,), adapter.get_child(node, index)
+    return select
+
+
+def wildcard_segment():
+    def select(matches, adapter):
+        for path, node in matches:
+            if adapter.get_kind(node) is None:
+                continue
+            for key, child in adapter.iter_children(node):
+                yield path + (key,), child
+    return select
+
+
+def filter_segment(condition):
+    def select(matches, adapter):
+        for path, node in matches:
+            if adapter.get_kind(node) is None:
+                continue
+            for key, child in adapter.iter_children(node):
+                if condition(child, adapter):
+                    yield path + (key,), child
+    return select
+
+
+def descendant_segment(segment):
+    """
+    Apply segment to the node and every container below it, depth first so results come in document order.
+    Every segment only selects children of containers, so values don't need to be visited
+    """
+    def iter_child_containers(path, node, adapter):
+        get_kind = adapter.get_kind
+        for key, child in adapter.iter_children(node):
+            if get_kind(child) is not None:
+                yield path + (key,), child
+
+    def iter_containers(matches, adapter):
+        for path, node in matches:
+            if adapter.get_kind(node) is None:
+                continue
+
+            stack = [iter([(path, node)])]
+            while stack:
+                next_match = next(stack[-1], None)
+                if next_match is None:
+                    stack.pop()
+                    continue
+
+                yield next_match
+                stack.append(iter_child_containers(next_match[0], next_match[1], adapter))
+
+    def select(matches, adapter):
+        return segment(iter_containers(matches, adapter), adapter)
+    return select
+
+
+#####################################################################################################################
+# Parsing
+
+
+class QueryParser(object):
+    def __init__(self, query_text):
+        self.query_text = query_text
+        self.tokens = self.tokenize(query_text)
+        self.position = 0
+
+    def tokenize(self, query_text):
+        tokens = []
+        position = 0
+        query_text = query_text.rstrip()
+        while position < len(query_text):
+            match = token_regex.match(query_text, position)
+            if match is None or match.end() == position:
+                raise JsonQueryError("Unexpected character at {} in: {}".format(position, query_text))
+
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == "string":
+                value = string_escape_regex.sub(r"\1", value[1:-1])
+            elif kind == "number":
+                value = float(value) if any(c in value for c in ".eE") else int(value)
+            tokens.append((kind, value, match.start(kind)))
+            position = match.end()
+        return tokens
+
+    def error(self, message):
+        if self.position < len(self.tokens):
+            where = "at {}".format(self.tokens[self.position][2])
+        else:
+            where = "at the end"
+        return JsonQueryError("{} {} of: {}".format(message, where, self.query_text))
+
+    def peek(self, value=None):
+        if self.position >= len(self.tokens):
+            return None
+        token = self.tokens[self.position]
+        if value is not None and not (token[0] == "operator" and token[1] == value):
+            return None
+        return token
+
+    def take(self, value=None):
+        token = self.peek(value)
+        if token is None:
+            raise self.error("Expected '{}'".format(value) if value else "Unexpected end")
+        self.position += 1
+        return token
+
+    def parse_query(self):
+        self.take("$")
+        segments = []
+        while self.peek() is not None:
+            segments.append(self.parse_segment())
+        return segments
+
+    def parse_segment(self):
+        if self.peek(".."):
+            self.take()
+            if self.peek("["):
+                return descendant_segment(self.parse_bracket())
+            return descendant_segment(self.parse_dot_name())
+
+        if self.peek("."):
+            self.take()
+            return self.parse_dot_name()
+
+        if self.peek("["):
+            return self.parse_bracket()
+
+        raise self.error("Unexpected token")
+
+    def parse_dot_name(self):
+        if self.peek("*"):
+            self.take()
+            return wildcard_segment()
+
+        kind, value, _ = self.take()
+        if kind not in ("name", "number"):
+            raise self.error("Expected a key name")
+        return child_segment([str(value)])
+
+    def parse_bracket(self):
+        self.take("[")
+
+        if self.peek("*"):
+            self.take()
+            self.take("]")
+            return wildcard_segment()
+
+        if self.peek("?"):
+            self.take()
+            self.take("(")
+            condition = self.parse_or()
+            self.take(")")
+            self.take("]")
+            return filter_segment(condition)
+
+        if self.peek(":") or self.is_slice():
+            return self.parse_slice()
+
+        keys = []
+        indices = []
+        while True:
+            kind, value, _ = self.take()
+            if kind == "string":
+                keys.append(value)
+            elif kind == "number" and isinstance(value, int):
+                indices.append(value)
+            else:
+                raise self.error("Expected a key or index")
+
+            if self.peek("]"):
+                self.take()
+                break
+            self.take(",")
+
+        if keys and indices:
+            raise self.error("Can't mix keys and indices")
+        return child_segment(keys) if keys else index_segment(indices)
+
+    def is_slice(self):
+        next_token = self.tokens[self.position + 1] if self.position + 1 < len(self.tokens) else None
+        return next_token is not None and next_token[0] == "operator" and next_token[1] == ":"
+
+    def parse_slice(self):
+        slice_values = [None, None, None]
+        slice_index = 0
+        while not self.peek("]"):
+            if self.peek(":"):
+                self.take()
+                slice_index += 1
+                if slice_index > 2:
+                    raise self.error("Too many ':' in slice")
+                continue
+
+            kind, value, _ = self.take()
+            if kind != "number" or not isinstance(value, int):
+                raise self.error("Expected an index")
+            slice_values[slice_index] = value
+        self.take("]")
+
+        if slice_values[2] == 0:
+            raise self.error("Slice step can't be 0")
+        return slice_segment(*slice_values)
+
+    # filter expressions compile to functions of (node, adapter)
+
+    def parse_or(self):
+        conditions = [self.parse_and()]
+        while self.peek("||"):
+            self.take()
+            conditions.append(self.parse_and())
+        if len(conditions) == 1:
+            return conditions[0]
+        return lambda node, adapter: any(condition(node, adapter) for condition in conditions)
+
+    def parse_and(self):
+        conditions = [self.parse_not()]
+        while self.peek("&&"):
+            self.take()
+            conditions.append(self.parse_not())
+        if len(conditions) == 1:
+            return conditions[0]
+        return lambda node, adapter: all(condition(node, adapter) for condition in conditions)
+
+    def parse_not(self):
+        if self.peek("!"):
+            self.take()
+            condition = self.parse_not()
+            return lambda node, adapter: not condition(node, adapter)
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        if self.peek("("):
+            self.take()
+            condition = self.parse_or()
+            self.take(")")
+            return condition
+
+        left_operand = self.parse_operand()
+
+        token = self.peek()
+        if token is None or token[0] != "operator" or token[1] not in comparison_operators and token[1] != "=~":
+            # existence check
+            return lambda node, adapter: left_operand(node, adapter) is not missing
+        operator = self.take()[1]
+
+        if operator == "=~":
+            kind, pattern, _ = self.take()
+            if kind != "string":
+                raise self.error("Expected a regex string")
+            try:
+                search = re.compile(pattern).search
+            except re.error as e:
+                raise self.error("Invalid regex ({})".format(e))
+
+            def regex_condition(node, adapter):
+                value = left_operand(node, adapter)
+                return isinstance(value, string_types) and search(value) is not None
+            return regex_condition
+
+        right_operand = self.parse_operand()
+        compare = comparison_operators[operator]
+
+        def comparison_condition(node, adapter):
+            left_value = left_operand(node, adapter)
+            right_value = right_operand(node, adapter)
+            if left_value is missing or right_value is missing:
+                return False
+            if isinstance(left_value, bool) != isinstance(right_value, bool):
+                return operator == "!="  # true isn't 1 in json
+            try:
+                return compare(left_value, right_value)
+            except TypeError:
+                return False  # python 3 doesn't order mixed types
+        return comparison_condition
+
+    def parse_operand(self):
+        if self.peek("@"):
+            self.take()
+            return self.parse_relative_path()
+
+        kind, value, _ = self.take()
+        if kind in ("number", "string"):
+            return lambda node, adapter: value
+        if kind == "name" and value in literal_names:
+            literal = literal_names[value]
+            return lambda node, adapter: literal
+        raise self.error("Expected a value or @")
+
+    def parse_relative_path(self):
+        keys = []
+        while True:
+            if self.peek("."):
+                self.take()
+                kind, value, _ = self.take()
+                if kind not in ("name", "number"):
+                    raise self.error("Expected a key name")
+                keys.append(str(value))
+            elif self.peek("["):
+                self.take()
+                kind, value, _ = self.take()
+                if kind == "string" or kind == "number" and isinstance(value, int):
+                    keys.append(value)
+                else:
+                    raise self.error("Expected a key or index")
+                self.take("]")
+            else:
+                break
+
+        def get_operand(node, adapter):
+            for key in keys:
+                kind = adapter.get_kind(node)
+                if kind == lk.dict_kind and isinstance(key, string_types):
+                    node = adapter.get_child(node, key)
+                elif kind == lk.list_kind and isinstance(key, int):
+                    index = key + adapter.get_length(node) if key < 0 else key
+                    node = adapter.get_child(node, index) if 0 <= index < adapter.get_length(node) else missing
+                else:
+                    return missing
+                if node is missing:
+                    return missing
+
+            if adapter.get_kind(node) is not None:
+                return node  # containers only work for existence checks
+            return adapter.get_value(node)
+        return get_operand
@@ -0,0 +1,252 @@
+"""
+Lists of numbers packed into arrays, and changes made to all the numbers of such a list at once
+
+A list that only holds floats, or only holds ints, is kept as an array.array of 8 byte numbers
+instead of a list of python objects. Ints and floats are never mixed in one array,
+so the numbers are written back to json exactly as they were read.
+
+The changes run on the whole array with numpy when it's installed, with a python loop otherwise.
+Like arithmetic in python, ints only stay ints when the numbers they're changed with are ints too.
+"""
+import array
+import json
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class LocalConstants:
+    # shorter lists stay python lists, they're few numbers like a vector or a matrix
+    min_packed_length = 64
+
+    float_typecode = "d"
+    int_typecode = "q"
+    typecodes_by_type = {float: float_typecode, int: int_typecode}
+    numpy_dtypes = {float_typecode: "float64", int_typecode: "int64"}
+
+    min_int = -2 ** 63
+    max_int = 2 ** 63 - 1
+
+
+lk = LocalConstants
+
+
+def pack_values(values, min_length=lk.min_packed_length):
+    """
+    :param values: list of values, an array is returned as is
+    :param min_length: lists shorter than this aren't packed
+    :return: array of the numbers, None if the values aren't all floats or all ints that fit in 8 bytes
+    """
+    if isinstance(values, array.array):
+        return values
+    if not isinstance(values, list) or not values or len(values) < min_length:
+        return None
+
+    # bools are ints as well, so the type is compared instead of isinstance
+    typecode = lk.typecodes_by_type.get(type(values[0]))
+    if typecode is None or len(set(map(type, values))) != 1:
+        return None
+
+    try:
+        return array.array(typecode, values)
+    except OverflowError:
+        return None
+
+
+def unpack_values(values):
+    """
+    :param values: array of numbers, other values are returned as is
+    :return: list of the numbers
+    """
+    if isinstance(values, array.array):
+        return values.tolist()
+    return values
+
+
+def is_packed(values):
+    return isinstance(values, array.array)
+
+
+def parse_numbers(text, count, allow_empty=False):
+    """
+    :param text: comma separated numbers written as in json, so "2" is an int and "2.0" a float
+    :param count: how many numbers there should be
+    :param allow_empty: a number that's left out is None instead of an error
+    :return: list of the numbers
+    """
+    numbers = []
+    for number_text in text.split(","):
+        number_text = number_text.strip()
+        if not number_text and allow_empty:
+            numbers.append(None)
+            continue
+
+        try:
+            number = json.loads(number_text)
+        except ValueError:
+            number = None
+        if type(number) not in lk.typecodes_by_type:
+            raise ValueError("Not a number: '{}'".format(number_text))
+        numbers.append(number)
+
+    if len(numbers) != count:
+        raise ValueError("Expected {} numbers, got {}: '{}'".format(count, len(numbers), text))
+    return numbers
+
+
+def get_result_typecode(values, *numbers):
+    """
+    :param values: array
+    :param numbers: numbers the values are changed with, None is ignored
+    :return: typecode of the changed values
+    """
+    if values.typecode == lk.float_typecode or any(isinstance(number, float) for number in numbers):
+        return lk.float_typecode
+    return lk.int_typecode
+
+
+def can_use_numpy(typecode, *numbers):
+    """
+    numpy wraps ints around where python makes them bigger,
+    so ints are only changed with numpy when the numbers the result can reach fit in 8 bytes
+
+    :param typecode: typecode of the result
+    :param numbers: the numbers the values are changed with and the lowest and highest results
+    :return:
+    """
+    if numpy is None:
+        return False
+    if typecode == lk.float_typecode:
+        return True
+    return all(lk.min_int <= number <= lk.max_int for number in numbers if number is not None)
+
+
+def to_numpy(values, typecode):
+    """
+    :param values: array
+    :param typecode: typecode of the result, ints are converted to floats if it's the float one
+    :return: numpy array, it shares its memory with the values unless they're converted
+    """
+    numbers = numpy.frombuffer(values, dtype=lk.numpy_dtypes[values.typecode])
+    return numbers.astype(lk.numpy_dtypes[typecode], copy=False)
+
+
+def from_numpy(numbers, typecode):
+    values = array.array(typecode)
+    values.frombytes(numbers.astype(lk.numpy_dtypes[typecode], copy=False).tobytes())
+    return values
+
+
+def get_int_range(values):
+    """
+    :param values: array of ints
+    :return: lowest and highest value
+    """
+    if not values:
+        return 0, 0
+    if numpy is not None:
+        numbers = to_numpy(values, lk.int_typecode)
+        return int(numbers.min()), int(numbers.max())
+    return min(values), max(values)
+
+
+def make_values(typecode, values):
+    """
+    :param typecode:
+    :param values: changed numbers
+    :return: array of the numbers, a list if there are ints that don't fit in 8 bytes
+    """
+    try:
+        return array.array(typecode, values)
+    except OverflowError:
+        return list(values)
+
+
+def scale_values(values, factor):
+    """
+    :param values: array
+    :param factor:
+    :return: the values multiplied by the factor
+    """
+    typecode = get_result_typecode(values, factor)
+    if typecode == lk.int_typecode:
+        low, high = get_int_range(values)
+        use_numpy = can_use_numpy(typecode, factor, low * factor, high * factor)
+    else:
+        use_numpy = can_use_numpy(typecode)
+
+    if use_numpy:
+        return from_numpy(to_numpy(values, typecode) * factor, typecode)
+    return make_values(typecode, [value * factor for value in values])
+
+
+def offset_values(values, offset):
+    """
+    :param values: array
+    :param offset:
+    :return: the values with the offset added
+    """
+    typecode = get_result_typecode(values, offset)
+    if typecode == lk.int_typecode:
+        low, high = get_int_range(values)
+        use_numpy = can_use_numpy(typecode, offset, low + offset, high + offset)
+    else:
+        use_numpy = can_use_numpy(typecode)
+
+    if use_numpy:
+        return from_numpy(to_numpy(values, typecode) + offset, typecode)
+    return make_values(typecode, [value + offset for value in values])
+
+
+def clamp_values(values, minimum=None, maximum=None):
+    """
+    :param values: array
+    :param minimum: lowest value, None to leave the low values as they are
+    :param maximum: highest value, None to leave the high values as they are
+    :return: the values within the range
+    """
+    typecode = get_result_typecode(values, minimum, maximum)
+    if minimum is None and maximum is None:
+        return make_values(typecode, values)
+
+    if can_use_numpy(typecode, minimum, maximum):
+        return from_numpy(numpy.clip(to_numpy(values, typecode), minimum, maximum), typecode)
+
+    clamped_values = values
+    if minimum is not None:
+        clamped_values = [max(value, minimum) for value in clamped_values]
+    if maximum is not None:
+        clamped_values = [min(value, maximum) for value in clamped_values]
+    return make_values(typecode, clamped_values)
+
+
+def round_values(values, digits=0):
+    """
+    :param values: array
+    :param digits: decimals to round to, negative to round to tens, hundreds and so on
+    :return: the rounded values, floats stay floats
+    """
+    if values.typecode == lk.int_typecode:
+        if digits >= 0:
+            return make_values(lk.int_typecode, values)
+        return make_values(lk.int_typecode, [round(value, digits) for value in values])
+
+    if numpy is not None:
+        return from_numpy(numpy.round(to_numpy(values, lk.float_typecode), digits), lk.float_typecode)
+    return make_values(lk.float_typecode, [round(value, digits) for value in values])
+
+
+def replace_values(values, find, replace):
+    """
+    :param values: array
+    :param find: value to look for, 2 and 2.0 are the same number
+    :param replace: what it's replaced with
+    :return: the values with every value that's equal to find replaced
+    """
+    typecode = get_result_typecode(values, replace)
+    if can_use_numpy(typecode, find, replace):
+        numbers = to_numpy(values, typecode)
+        return from_numpy(numpy.where(numbers == find, replace, numbers), typecode)
+    return make_values(typecode, [replace if value == find else value for value in values])
@@ -0,0 +1,55 @@
+"""
+Depth first walks over trees without recursion, without any Qt
+
+Python stops recursing after about a thousand calls, machine generated documents can be nested a lot deeper.
+The walk keeps an explicit stack of child iterators instead, and hands out every node along with its depth,
+which is all that's needed to put data back together or to write it out.
+The data of a document and the items of a tree are walked the same way, with their own get_children.
+"""
+
+
+def walk(root, get_children):
+    """
+    :param root:
+    :param get_children: function that gets a node and returns an iterable of its children, None if it has none.
+                         It's called once the node was handed out, just before its first child is needed
+    :return: generator of (node, depth) in document order, the root is at depth 0
+    """
+    yield root, 0
+    children = get_children(root)
+    if children is None:
+        return
+
+    stack = [iter(children)]
+    while stack:
+        node = next(stack[-1], stack)  # the stack itself is never a node
+        if node is stack:
+            stack.pop()
+            continue
+
+        yield node, len(stack)
+        children = get_children(node)
+        if children is not None:
+            stack.append(iter(children))
+
+
+def get_data_children(entry):
+    """
+    :param entry: (key, value), the key of a list item is its index
+    :return: (key, value) of the children of dicts, lists and tuples, None for anything else
+    """
+    value = entry[1]
+    if isinstance(value, dict):
+        return value.items()
+    if isinstance(value, (list, tuple)):
+        return enumerate(value)
+    return None
+
+
+def walk_data(data):
+    """
+    :param data: json data
+    :return: generator of ((key, value), depth) of the data and everything in it, the key of the root is None
+    """
+    return walk((None, data), get_data_children)
+
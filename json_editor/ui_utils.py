@@ -305,6 +305,9 @@ class QtPathWidget(QtWidgets.QWidget):
         if self.relative_to_path and path_drive == self.relative_to_path_drive:
             path = os.path.relpath(path, self.relative_to_path)
 
+        # the signal is emitted below, only if asked for
+        signals_blocked = self.path_CB.blockSignals(True)
+
         # if path has already been added to ComboBox, remove the old one
         path_index_map = {self.path_CB.itemText(i): i for i in range(self.path_CB.count())}
         if path in path_index_map.keys():
@@ -318,6 +321,8 @@ class QtPathWidget(QtWidgets.QWidget):
         while self.path_CB.count() > self.recent_paths_amount:
             self.path_CB.removeItem(self.recent_paths_amount)
 
+        self.path_CB.blockSignals(signals_blocked)
+
         if emit_change_signal:
             self.path_changed.emit(path)
 
@@ -331,6 +336,9 @@ class QtPathWidget(QtWidgets.QWidget):
 
         return current_path
 
+    def get_recent_paths(self, full_paths=True, only_existing=False):
+        return self._settings.get_recent_paths(full_paths=full_paths, only_existing=only_existing)
+
     ###################################################
     # Convenience functions for replacing LineEdit with this widget
 
@@ -0,0 +1,130 @@
+"""
+Undo history of edits, each step only keeps what changed instead of a copy of the data
+
+The stack doesn't know what the commands change, they estimate how much memory they hold on to
+and the oldest steps are dropped once the history takes more than the memory budget.
+"""
+from collections import deque
+
+
+class LocalConstants:
+    memory_budget = 256 * 1024 ** 2
+
+
+lk = LocalConstants
+
+
+class UndoCommand(object):
+    """One step in the undo history"""
+    text = ""
+
+    def undo(self):
+        raise NotImplementedError
+
+    def redo(self):
+        raise NotImplementedError
+
+    def get_memory_size(self):
+        """
+        :return: rough number of bytes kept alive by this command
+        """
+        return 0
+
+
+class UndoStack(object):
+    def __init__(self, memory_budget=lk.memory_budget):
+        """
+        :param memory_budget: bytes the undo and redo steps may hold on to, the oldest steps are dropped past this
+        """
+        self.memory_budget = memory_budget
+        self.memory_size = 0
+        self.revision = 0  # changes with every push, undo, redo and clear, so a state can be recognized later
+        self._undo_commands = deque()  # (command, memory size), oldest first
+        self._redo_commands = []  # (command, memory size), next redo last
+
+    def push(self, command):
+        """
+        Add a command that has already been done, this drops the steps that could be redone
+
+        :param command: UndoCommand
+        :return:
+        """
+        for _, memory_size in self._redo_commands:
+            self.memory_size -= memory_size
+        self._redo_commands = []
+
+        self.revision += 1
+        memory_size = command.get_memory_size()
+        self._undo_commands.append((command, memory_size))
+        self.memory_size += memory_size
+        self.evict()
+
+    def set_memory_budget(self, memory_budget):
+        self.memory_budget = memory_budget
+        self.evict()
+
+    def evict(self):
+        """
+        Drop the oldest undo steps until the history fits in the budget, then the furthest redo steps.
+        A command bigger than the whole budget isn't kept at all.
+        """
+        while self.memory_size > self.memory_budget and self._undo_commands:
+            _, memory_size = self._undo_commands.popleft()
+            self.memory_size -= memory_size
+
+        while self.memory_size > self.memory_budget and self._redo_commands:
+            _, memory_size = self._redo_commands.pop(0)
+            self.memory_size -= memory_size
+
+    def clear(self):
+        self.revision += 1
+        self._undo_commands.clear()
+        self._redo_commands = []
+        self.memory_size = 0
+
+    def can_undo(self):
+        return bool(self._undo_commands)
+
+    def can_redo(self):
+        return bool(self._redo_commands)
+
+    def undo_text(self):
+        return self._undo_commands[-1][0].text if self._undo_commands else ""
+
+    def redo_text(self):
+        return self._redo_commands[-1][0].text if self._redo_commands else ""
+
+    def undo(self):
+        """
+        :return: the command that was undone, None if there's nothing to undo
+        """
+        if not self._undo_commands:
+            return None
+
+        command_and_size = self._undo_commands.pop()
+        self.revision += 1
+        try:
+            command_and_size[0].undo()
+        except Exception:
+            # the data doesn't match the rest of the history anymore
+            self.clear()
+            raise
+        self._redo_commands.append(command_and_size)
+        return command_and_size[0]
+
+    def redo(self):
+        """
+        :return: the command that was redone, None if there's nothing to redo
+        """
+        if not self._redo_commands:
+            return None
+
+        command_and_size = self._redo_commands.pop()
+        self.revision += 1
+        try:
+            command_and_size[0].redo()
+        except Exception:
+            self.clear()
+            raise
+        self._undo_commands.append(command_and_size)
+        return command_and_size[0]
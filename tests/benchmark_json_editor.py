@@ -0,0 +1,382 @@
+"""
+Headless timings for the editor on generated documents.
+
+Not picked up by unittest discovery, run it directly:
+python tests/benchmark_json_editor.py
+python tests/benchmark_json_editor.py --sizes 1000 1000000 --shapes records --benchmarks set_data get_data
+python tests/benchmark_json_editor.py --save-baseline
+
+Results are compared against tests/benchmark_baseline.json,
+anything slower than the tolerance is reported and the script exits with 1.
+
+Peak memory is the peak resident memory above what was in use before the benchmark.
+That only works on linux, elsewhere it's measured with tracemalloc in a second run, which only sees python objects.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import re
+import shutil
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+tests_path = os.path.dirname(os.path.realpath(__file__))
+base_path = tests_path.rsplit(os.sep, 1)[0]
+if base_path not in sys.path:
+    sys.path.insert(0, base_path)
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from json_editor.ui_utils import QtWidgets
+
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+
+from json_editor import data_tree
+from json_editor import json_editor_system as system
+from json_editor import json_editor_ui
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None  # python 2
+
+baseline_path = os.path.join(tests_path, "benchmark_baseline.json")
+
+default_sizes = (1000, 10000)
+
+# differences below this are noise
+min_regression_seconds = 0.005
+
+
+#####################################################################################################################
+# Documents, roughly node_count values and containers each
+
+
+def build_wide_dict(node_count):
+    scalars = (None, True, 12, 3.141592, "string")
+    return OrderedDict(("key_{}".format(i), scalars[i % len(scalars)]) for i in range(node_count))
+
+
+def build_deep_nesting(node_count, depth=100):
+    """dicts nested depth levels deep, each level holding its share of the values"""
+    values_per_level = max(1, node_count // depth - 1)
+    root_data = level_data = OrderedDict()
+    for level in range(depth):
+        for i in range(values_per_level):
+            level_data["value_{}".format(i)] = level * i
+        level_data["child"] = OrderedDict()
+        level_data = level_data["child"]
+    return root_data
+
+
+def build_numeric_array(node_count):
+    return [i * 0.5 for i in range(node_count)]
+
+
+def build_records(node_count):
+    """list of dicts with 9 values each, like a table"""
+    return [
+        OrderedDict([
+            ("id", i),
+            ("name", "record_{}".format(i)),
+            ("x", i * 0.1),
+            ("y", i * 0.2),
+            ("z", i * 0.3),
+            ("enabled", i % 2 == 0),
+            ("parent", None),
+            ("tag", "tag_{}".format(i % 100)),
+            ("weight", (i % 1000) / 1000.0),
+        ])
+        for i in range(node_count // 10)
+    ]
+
+
+def build_long_strings(node_count, string_length=10000):
+    """one string per hundred nodes, so the size grows like the other documents"""
+    return ["{:08d}".format(i) * (string_length // 8) for i in range(max(1, node_count // 100))]
+
+
+document_builders = OrderedDict([
+    ("wide_dict", build_wide_dict),
+    ("deep_nesting", build_deep_nesting),
+    ("numeric_array", build_numeric_array),
+    ("records", build_records),
+    ("long_strings", build_long_strings),
+])
+
+
+#####################################################################################################################
+# Benchmarks, each one gets the data and returns (function to time, cleanup function)
+
+
+def create_tree(data):
+    tree = data_tree.DataTreeWidget()
+    tree.set_data(data)
+    tree.finish_population()
+    return tree
+
+
+def get_top_items(tree):
+    root_item = tree.tree_widget.invisibleRootItem()
+    return data_tree.get_sub_widgets(root_item)
+
+
+def select(tree, items):
+    tree.tree_widget.clearSelection()
+    for item in items:
+        item.setSelected(True)
+
+
+def close_widget(widget):
+    widget.deleteLater()
+    app.processEvents()
+
+
+def setup_load(data):
+    temp_dir = tempfile.mkdtemp()
+    json_path = os.path.join(temp_dir, "benchmark.json")
+    system.save_json(data, json_path)
+    return lambda: system.load_json(json_path), lambda: shutil.rmtree(temp_dir)
+
+
+def setup_save(data):
+    temp_dir = tempfile.mkdtemp()
+    json_path = os.path.join(temp_dir, "benchmark.json")
+    return lambda: system.save_json(data, json_path), lambda: shutil.rmtree(temp_dir)
+
+
+def setup_set_data(data):
+    tree = data_tree.DataTreeWidget()
+
+    def set_data():
+        tree.set_data(data)
+        tree.finish_population()  # the rest of the items are created from a timer otherwise
+    return set_data, lambda: close_widget(tree)
+
+
+def setup_get_data(data):
+    tree = create_tree(data)
+    tree.get_all_items()  # make sure every item exists, otherwise get_data() just hands back the data
+    return tree.get_data, lambda: close_widget(tree)
+
+
+def setup_save_tree(data):
+    tree = create_tree(data)
+    tree.get_all_items()
+    temp_dir = tempfile.mkdtemp()
+    json_path = os.path.join(temp_dir, "benchmark.json")
+
+    def save_tree():
+        file_writer = system.JsonFileWriter(json_path)
+        for chunk in tree.iter_json_chunks(indent=2):
+            file_writer.write(chunk)
+        file_writer.commit()
+
+    def cleanup():
+        close_widget(tree)
+        shutil.rmtree(temp_dir)
+    return save_tree, cleanup
+
+
+def setup_set_filter(data):
+    tree = create_tree(data)
+    search_columns = (data_tree.lk.col_key, data_tree.lk.col_value)
+
+    def set_filter():
+        tree.set_filter("1", search_columns=search_columns)
+        tree.set_filter("12", search_columns=search_columns)
+    return set_filter, lambda: close_widget(tree)
+
+
+def setup_sort(data):
+    tree = create_tree(data)
+    select(tree, get_top_items(tree))
+    return tree.sort_selected_items, lambda: close_widget(tree)
+
+
+def setup_delete(data):
+    tree = create_tree(data)
+    select(tree, get_top_items(tree)[::100])
+    return tree.delete_selected_items, lambda: close_widget(tree)
+
+
+def setup_duplicate(data):
+    tree = create_tree(data)
+    select(tree, get_top_items(tree)[:100])
+    return tree.action_duplicate_selected_items, lambda: close_widget(tree)
+
+
+def setup_batch_rename(data):
+    editor = json_editor_ui.JsonEditorWidget()
+    editor.data_tree_widget.set_data(data)
+    editor.data_tree_widget.finish_population()
+    editor.batch_modify_widget.prefix_line_edit.setText("renamed_")
+    editor.modify_type_chooser.setCurrentText(json_editor_ui.lk.keys)
+    editor.modify_hierarchy.setChecked(True)
+    select(editor.data_tree_widget, get_top_items(editor.data_tree_widget))
+    return editor.modify_rename, lambda: close_widget(editor)
+
+
+benchmark_setups = OrderedDict([
+    ("load", setup_load),
+    ("save", setup_save),
+    ("set_data", setup_set_data),
+    ("get_data", setup_get_data),
+    ("save_tree", setup_save_tree),
+    ("set_filter", setup_set_filter),
+    ("sort", setup_sort),
+    ("delete", setup_delete),
+    ("duplicate", setup_duplicate),
+    ("batch_rename", setup_batch_rename),
+])
+
+
+#####################################################################################################################
+# Measuring
+
+
+def get_process_memory_kb(field):
+    with open("/proc/self/status") as fp:
+        return int(re.search(field + r":\s+(\d+)", fp.read()).group(1))
+
+
+def reset_peak_memory():
+    """
+    :return: True if the peak resident memory of the process could be reset, only on linux
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as fp:
+            fp.write("5")
+        return True
+    except (IOError, OSError):
+        return False
+
+
+def run_benchmark(setup_function, data, measure_memory=True):
+    """
+    :return: (seconds, peak memory in MB or None)
+    """
+    benchmark_function, cleanup = setup_function(data)
+    gc.collect()
+
+    peak_memory_mb = None
+    track_rss = measure_memory and reset_peak_memory()
+    if track_rss:
+        memory_before = get_process_memory_kb("VmRSS")
+
+    start_time = time.time()
+    benchmark_function()
+    duration = time.time() - start_time
+
+    if track_rss:
+        peak_memory_mb = (get_process_memory_kb("VmHWM") - memory_before) / 1024.0
+    cleanup()
+
+    if measure_memory and not track_rss and tracemalloc is not None:
+        # tracing slows everything down, so it gets a run of its own
+        benchmark_function, cleanup = setup_function(data)
+        gc.collect()
+        tracemalloc.start()
+        benchmark_function()
+        peak_memory_mb = tracemalloc.get_traced_memory()[1] / (1024.0 * 1024.0)
+        tracemalloc.stop()
+        cleanup()
+
+    return duration, peak_memory_mb
+
+
+def run_benchmarks(shapes, sizes, benchmarks, measure_memory=True):
+    results = OrderedDict()
+    for node_count in sizes:
+        for shape in shapes:
+            data = document_builders[shape](node_count)
+            for benchmark in benchmarks:
+                duration, peak_memory_mb = run_benchmark(benchmark_setups[benchmark], data, measure_memory)
+                result_name = "{}/{}/{}".format(shape, node_count, benchmark)
+                results[result_name] = OrderedDict([("seconds", duration), ("peak_memory_mb", peak_memory_mb)])
+
+                memory_text = "" if peak_memory_mb is None else "{:10.1f} MB".format(peak_memory_mb)
+                print("{:45} {:10.3f}s{}".format(result_name, duration, memory_text))
+                sys.stdout.flush()
+            del data
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    :return: names of the results that got slower than the baseline allows
+    """
+    regressions = []
+    baseline_results = baseline.get("results", {})
+    for result_name, result in results.items():
+        baseline_result = baseline_results.get(result_name)
+        if baseline_result is None:
+            continue
+
+        baseline_seconds = baseline_result["seconds"]
+        seconds = result["seconds"]
+        if seconds > baseline_seconds * (1 + tolerance) and seconds - baseline_seconds > min_regression_seconds:
+            regressions.append(result_name)
+            print("SLOWER {:38} {:10.3f}s, baseline {:.3f}s".format(result_name, seconds, baseline_seconds))
+    return regressions
+
+
+def get_machine_description():
+    return "{} {}, python {}".format(platform.system(), platform.machine(), platform.python_version())
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Time the json editor on generated documents")
+    parser.add_argument("--sizes", nargs="+", type=int, default=default_sizes, help="node counts, 100000 and up take a while")
+    parser.add_argument("--shapes", nargs="+", choices=list(document_builders), default=list(document_builders))
+    parser.add_argument("--benchmarks", nargs="+", choices=list(benchmark_setups), default=list(benchmark_setups))
+    parser.add_argument("--no-memory", action="store_true", help="skip measuring peak memory")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline")
+    parser.add_argument("--baseline", default=baseline_path)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parsed_args = parser.parse_args(args)
+
+    results = run_benchmarks(
+        parsed_args.shapes,
+        parsed_args.sizes,
+        parsed_args.benchmarks,
+        measure_memory=not parsed_args.no_memory,
+    )
+
+    if parsed_args.save_baseline:
+        baseline = {"machine": get_machine_description(), "results": results}
+        if os.path.exists(parsed_args.baseline):
+            # keep results that weren't run this time
+            with open(parsed_args.baseline, "r") as fp:
+                old_baseline = json.load(fp, object_pairs_hook=OrderedDict)
+            old_baseline["results"].update(results)
+            baseline["results"] = old_baseline["results"]
+
+        with open(parsed_args.baseline, "w") as fp:
+            json.dump(baseline, fp, indent=2)
+        print("Saved baseline to: {}".format(parsed_args.baseline))
+        return 0
+
+    if not os.path.exists(parsed_args.baseline):
+        print("No baseline found, create one with --save-baseline")
+        return 0
+
+    with open(parsed_args.baseline, "r") as fp:
+        baseline = json.load(fp, object_pairs_hook=OrderedDict)
+    if baseline.get("machine") != get_machine_description():
+        print("Baseline was recorded on: {}".format(baseline.get("machine")))
+
+    regressions = compare_to_baseline(results, baseline, parsed_args.tolerance)
+    if regressions:
+        print("{} results are slower than the baseline".format(len(regressions)))
+        return 1
+    print("No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
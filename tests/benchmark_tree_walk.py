@@ -0,0 +1,105 @@
+"""
+Nodes per second of the walks over whole documents, on a table of records and on a document nested as deep as
+it has nodes. Renaming, getting the data and saving recurse like the json module does, and switch to walking
+with tree_walk.walk() when the document is nested deeper than the recursion limit.
+
+Not picked up by unittest discovery, run it directly:
+python tests/benchmark_tree_walk.py
+python tests/benchmark_tree_walk.py --node-count 100000 --tree-node-count 10000
+
+The json module can't encode or decode the deep document, it raises RecursionError. Its rows show the
+iterative encoder and the streaming parser that are used instead.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+
+tests_path = os.path.dirname(os.path.realpath(__file__))
+base_path = tests_path.rsplit(os.sep, 1)[0]
+if base_path not in sys.path:
+    sys.path.insert(0, base_path)
+
+from benchmark_json_editor import build_records, create_tree, close_widget
+
+from json_editor import batch_rename
+from json_editor import data_tree
+from json_editor import json_editor_system as system
+from json_editor import tree_walk
+
+
+def build_deep_chain(node_count):
+    """each dict holds a value and the next dict, about node_count / 3 levels deep"""
+    data = OrderedDict([("value", 0)])
+    for i in range(node_count // 3):
+        data = OrderedDict([("value", i), ("child", data)])
+    return data
+
+
+def get_node_count(data):
+    return sum(1 for _ in tree_walk.walk_data(data))
+
+
+def print_throughput(name, node_count, function):
+    start_time = time.time()
+    try:
+        function()
+    except RuntimeError:  # RecursionError in python 3
+        print("{:30} {:>14}".format(name, "RecursionError"))
+        return
+    duration = time.time() - start_time
+    print("{:30} {:10.0f} nodes/s {:8.2f}s".format(name, node_count / max(duration, 1e-9), duration))
+    sys.stdout.flush()
+
+
+def walk_all(walk):
+    for _ in walk:
+        pass
+
+
+def benchmark_data(data):
+    node_count = get_node_count(data)
+    print("{} nodes".format(node_count))
+    rename = batch_rename.RenameRules(prefix="p_").compile()
+    json_text = "".join(system.iter_encode_json(data))
+
+    print_throughput("walk data", node_count, lambda: walk_all(tree_walk.walk_data(data)))
+    print_throughput("rename data", node_count, lambda: batch_rename.rename_data(data, rename, values=True))
+    print_throughput("json.dumps", node_count, lambda: json.dumps(data))
+    print_throughput("encode without recursion", node_count, lambda: walk_all(system.iter_encode_json(data)))
+    print_throughput("json.loads", node_count, lambda: json.loads(json_text))
+    print_throughput("load", node_count, lambda: system.loads_json(json_text))
+
+
+def benchmark_tree(data):
+    tree = create_tree(data)
+    root_item = tree.tree_widget.invisibleRootItem()
+    walk_all(data_tree.walk_items(root_item))  # create every item first
+    node_count = sum(1 for _ in data_tree.walk_items(root_item, fetch=False))
+    print("{} tree items".format(node_count))
+
+    print_throughput("walk items", node_count, lambda: walk_all(data_tree.walk_items(root_item, fetch=False)))
+    print_throughput("get data", node_count, tree.get_data)
+    print_throughput("save", node_count, lambda: walk_all(tree.iter_json_chunks()))
+    print_throughput("select hierarchy", node_count, tree.select_hierarchy)
+    close_widget(tree)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Nodes per second of the walks over whole documents")
+    parser.add_argument("--node-count", type=int, default=1000000)
+    parser.add_argument("--tree-node-count", type=int, default=100000, help="nodes of the documents shown in a tree")
+    parsed_args = parser.parse_args(args)
+
+    for name, build_data in (("records", build_records), ("deep chain", build_deep_chain)):
+        print("\n{}, data".format(name))
+        benchmark_data(build_data(parsed_args.node_count))
+        print("\n{}, tree".format(name))
+        benchmark_tree(build_data(parsed_args.tree_node_count))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
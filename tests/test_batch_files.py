@@ -0,0 +1,102 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+from collections import OrderedDict
+from unittest import TestCase
+
+tests_path = os.path.dirname(os.path.realpath(__file__))
+base_path = tests_path.rsplit(os.sep, 1)[0]
+if base_path not in sys.path:
+    sys.path.insert(0, base_path)
+
+from json_editor import batch_files
+from json_editor import batch_rename
+
+example_data = OrderedDict([
+    ("arm_L", OrderedDict([("joint_L", "hand_L"), ("n", 1)])),
+    ("list", ["a_L", OrderedDict([("x_L", "y_L")])]),
+])
+
+
+def rename_example_data(**kwargs):
+    rules = batch_rename.RenameRules(search_replace_pairs=[("_L", "_R")])
+    settings = batch_files.BatchSettings(rules, **kwargs)
+    data = json.loads(json.dumps(example_data), object_pairs_hook=OrderedDict)
+    renamed_data, rename_key, rename_value = batch_files.rename_json_data(data, rules.compile(), settings)
+    return renamed_data, rename_key.count, rename_value.count
+
+
+class TestRenameJsonData(TestCase):
+
+    def test_everything(self):
+        renamed_data, key_count, value_count = rename_example_data()
+        self.assertEqual(json.dumps(renamed_data), json.dumps(OrderedDict([
+            ("arm_R", OrderedDict([("joint_R", "hand_R"), ("n", 1)])),
+            ("list", ["a_R", OrderedDict([("x_R", "y_R")])]),
+        ])))
+        self.assertEqual((key_count, value_count), (3, 3))
+
+    def test_scope(self):
+        renamed_data, key_count, value_count = rename_example_data(scope="$.arm_L.*", values=False, hierarchy=False)
+        self.assertEqual(list(renamed_data["arm_L"]), ["joint_R", "n"])
+        self.assertEqual(renamed_data["arm_L"]["joint_R"], "hand_L")
+        self.assertEqual((key_count, value_count), (1, 0))
+
+        # list indices aren't keys
+        renamed_data, key_count, value_count = rename_example_data(scope="$.list[*]", values=False, hierarchy=False)
+        self.assertEqual(key_count, 0)
+
+
+class TestProcessFiles(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.temp_dir, "sub"))
+        self.json_paths = [os.path.join(self.temp_dir, "a.json"), os.path.join(self.temp_dir, "sub", "b.json")]
+        for json_path, indent in zip(self.json_paths, (4, None)):
+            with open(json_path, "w") as fp:
+                json.dump(example_data, fp, indent=indent)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_indent_is_kept(self):
+        settings = batch_files.BatchSettings(batch_rename.RenameRules(prefix="p_"), values=False)
+        json_paths = list(batch_files.iter_json_paths([self.temp_dir]))
+        self.assertEqual(json_paths, self.json_paths)
+
+        results = list(batch_files.process_files(json_paths, settings, jobs=1))
+        self.assertEqual([result.renamed_key_count for result in results], [5, 5])
+
+        for json_path, indent in zip(self.json_paths, (4, None)):
+            with open(json_path, "r") as fp:
+                json_text = fp.read()
+            json_data = json.loads(json_text, object_pairs_hook=OrderedDict)
+            self.assertEqual(list(json_data), ["p_arm_L", "p_list"])
+            self.assertEqual(json_text, json.dumps(json_data, indent=indent))
+
+    def test_key_collision(self):
+        # both keys would be named arm_R, so the file is left alone instead of losing one of them
+        with open(self.json_paths[1], "w") as fp:
+            json.dump(OrderedDict([("arm_L", 1), ("arm_R", 2)]), fp)
+
+        for dry_run in (True, False):
+            settings = batch_files.BatchSettings(
+                batch_rename.RenameRules(search_replace_pairs=[("_L", "_R")]), dry_run=dry_run)
+            results = list(batch_files.process_files(self.json_paths, settings, jobs=1))
+            self.assertIsNone(results[0].error)
+            self.assertIn("arm_R", results[1].error)
+            self.assertTrue(batch_files.format_result(results[1], dry_run=dry_run).startswith("Could not process"))
+
+            with open(self.json_paths[1], "r") as fp:
+                self.assertEqual(fp.read(), '{"arm_L": 1, "arm_R": 2}')
+
+    def test_dry_run(self):
+        settings = batch_files.BatchSettings(batch_rename.RenameRules(prefix="p_"), dry_run=True)
+        results = list(batch_files.process_files(self.json_paths, settings, jobs=2))
+        self.assertTrue(all(result.is_changed() for result in results))
+
+        with open(self.json_paths[0], "r") as fp:
+            self.assertEqual(fp.read(), json.dumps(example_data, indent=4))
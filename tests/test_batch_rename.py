@@ -0,0 +1,106 @@
+import os
+import sys
+from collections import OrderedDict
+from unittest import TestCase
+
+tests_path = os.path.dirname(os.path.realpath(__file__))
+base_path = tests_path.rsplit(os.sep, 1)[0]
+if base_path not in sys.path:
+    sys.path.insert(0, base_path)
+
+from json_editor import batch_rename
+
+
+def rename_text(text, **kwargs):
+    return batch_rename.RenameRules(**kwargs).compile()(text)
+
+
+class TestRenameRules(TestCase):
+
+    def test_plain(self):
+        self.assertEqual(rename_text("arm_L", prefix="p_", suffix="_s"), "p_arm_L_s")
+        self.assertEqual(rename_text("arm_L", search_replace_pairs=[("_L", "_R")]), "arm_R")
+
+        # pairs are applied one after the other
+        self.assertEqual(rename_text("a", search_replace_pairs=[("a", "b"), ("b", "c")]), "c")
+
+    def test_ignore_case(self):
+        self.assertEqual(rename_text("Arm_arm", search_replace_pairs=[("ARM", "leg")], ignore_case=True), "leg_leg")
+
+        # without regex the search and replacement are literal
+        self.assertEqual(rename_text("a.b", search_replace_pairs=[(".", "\\1")], ignore_case=True), "a\\1b")
+
+    def test_regex(self):
+        rename = batch_rename.RenameRules(search_replace_pairs=[(r"(\w+)_(\d+)", r"\2_\1")], use_regex=True).compile()
+        self.assertEqual(rename("joint_12"), "12_joint")
+        self.assertEqual(rename("joint"), "joint")
+
+        with self.assertRaises(batch_rename.RenameRulesError):
+            batch_rename.RenameRules(search_replace_pairs=[("(", "")], use_regex=True).compile()
+
+
+class TestRenameData(TestCase):
+
+    def setUp(self):
+        self.data = OrderedDict([
+            ("a", ["a", 1, OrderedDict([("a", None)])]),
+            ("b", OrderedDict([("c", "d")])),
+        ])
+        self.rename = batch_rename.RenameRules(prefix="p_").compile()
+
+    def test_keys(self):
+        renamed_data = batch_rename.rename_data(self.data, self.rename)
+        self.assertEqual(renamed_data, OrderedDict([
+            ("p_a", ["a", 1, OrderedDict([("p_a", None)])]),
+            ("p_b", OrderedDict([("p_c", "d")])),
+        ]))
+        self.assertIsInstance(renamed_data["p_b"], OrderedDict)
+
+    def test_values(self):
+        renamed_data = batch_rename.rename_data(self.data, self.rename, keys=False, values=True)
+        self.assertEqual(renamed_data, OrderedDict([
+            ("a", ["p_a", 1, OrderedDict([("a", None)])]),
+            ("b", OrderedDict([("c", "p_d")])),
+        ]))
+
+    def test_unchanged_parts_are_kept(self):
+        rename = batch_rename.RenameRules(search_replace_pairs=[("d", "e")]).compile()
+        renamed_data = batch_rename.rename_data(self.data, rename, keys=False, values=True)
+        self.assertIs(renamed_data["a"], self.data["a"])
+        self.assertIsNot(renamed_data["b"], self.data["b"])
+
+        self.assertIs(batch_rename.rename_data(self.data, rename), self.data)
+
+    def test_iterative_matches_recursive(self):
+        data = OrderedDict([("t", ("a", [], {"a": 1})), ("e", {})])
+        data.update(self.data)
+        rename = batch_rename.RenameRules(search_replace_pairs=[("a", "x")]).compile()
+        for keys, values in ((True, False), (False, True), (True, True), (False, False)):
+            renamed_data = batch_rename.rename_data_recursive(data, rename, keys, values, None)
+            iterative_data = batch_rename.rename_data_iterative(data, rename, keys, values, None)
+            self.assertEqual(iterative_data, renamed_data)
+            self.assertIsInstance(iterative_data["t"], tuple)
+            self.assertEqual(iterative_data is data, renamed_data is data)
+            self.assertIs(iterative_data["e"], data["e"])
+
+    def test_key_collision(self):
+        # renaming a to b would drop one of the values
+        data = OrderedDict([("x", [OrderedDict([("a", 1), ("b", 2)])])])
+        rename = batch_rename.RenameRules(search_replace_pairs=[("a", "b")]).compile()
+        for rename_data in (batch_rename.rename_data_recursive, batch_rename.rename_data_iterative):
+            with self.assertRaises(batch_rename.KeyCollisionError):
+                rename_data(data, rename, True, False, None)
+            self.assertIs(rename_data(data, rename, False, True, None), data)  # values alone never collide
+
+    def test_deep(self):
+        data = OrderedDict([("a_0", "v_0")])
+        for _ in range(100000):
+            data = OrderedDict([("a_0", data), ("b", (1, "v_1"))])
+        rename = batch_rename.RenameRules(search_replace_pairs=[("_", "-")]).compile()
+
+        renamed_data = batch_rename.rename_data(data, rename, keys=True, values=True)
+        for _ in range(100000):
+            self.assertEqual(list(renamed_data), ["a-0", "b"])
+            self.assertEqual(renamed_data["b"], (1, "v-1"))
+            renamed_data = renamed_data["a-0"]
+        self.assertEqual(renamed_data, OrderedDict([("a-0", "v-0")]))
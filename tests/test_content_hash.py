@@ -0,0 +1,95 @@
+import os
+import sys
+from collections import OrderedDict
+from unittest import TestCase
+
+tests_path = os.path.dirname(os.path.realpath(__file__))
+base_path = tests_path.rsplit(os.sep, 1)[0]
+if base_path not in sys.path:
+    sys.path.insert(0, base_path)
+
+from json_editor import content_hash
+from json_editor.json_editor_system import encode_json_key, encode_json_scalar
+
+
+def hash_each_value(data):
+    # get_data_content() without hashing containers of scalars in one go
+    def get_content(data_value):
+        if isinstance(data_value, dict):
+            return "{", ((encode_json_key(key), value) for key, value in data_value.items())
+        if isinstance(data_value, list):
+            return "[", ((None, value) for value in data_value)
+        return None, encode_json_scalar(data_value)
+
+    return content_hash.get_content_hash(data, get_content)
+
+
+def get_record(index):
+    return OrderedDict([
+        ("name", "record {}".format(index)),
+        ("settings", OrderedDict([("enabled", True), ("scale", 1.5), ("offset", [0, 0]), ("tags", ["a", u"é"])])),
+    ])
+
+
+class TestContentHash(TestCase):
+
+    def setUp(self):
+        self.data = OrderedDict([
+            ("a", 1),
+            ("b", OrderedDict([("c", [1, 2.5, None]), ("d", u"é")])),
+            ("e", [OrderedDict([("f", 0)]), [], {}]),
+        ])
+
+    def test_equal(self):
+        data_hash = content_hash.hash_data(self.data)
+        self.assertEqual(data_hash, content_hash.hash_data(dict(self.data)))
+        self.assertEqual(data_hash, hash_each_value(self.data))
+        self.assertEqual(content_hash.hash_data([1, (2, 3)]), content_hash.hash_data([1, [2, 3]]))
+        self.assertEqual(content_hash.hash_data(OrderedDict([(1, "x")])), content_hash.hash_data({"1": "x"}))
+
+    def test_different(self):
+        hashes = set(content_hash.hash_data(data) for data in [
+            self.data, 1, 1.0, True, "1", [1], {"1": 1}, [[1]], [1, 1], [], {}, None,
+            OrderedDict(reversed(list(self.data.items()))),
+        ])
+        self.assertEqual(len(hashes), 13)
+
+    def test_store_hash(self):
+        stored = []
+        root_hash = content_hash.get_content_hash(
+            self.data, content_hash.get_data_content, lambda node, node_hash: stored.append((node, node_hash)))
+        # containers of scalars are hashed in one go
+        self.assertEqual(stored, [
+            (self.data["b"], content_hash.hash_data(self.data["b"])),
+            (self.data["e"], content_hash.hash_data(self.data["e"])),
+            (self.data, root_hash),
+        ])
+
+    def test_deep(self):
+        data = [1]
+        for _ in range(10000):
+            data = OrderedDict([("c", data)])
+        self.assertEqual(content_hash.hash_data(data), hash_each_value(data))
+
+    def test_find_duplicate_subtrees(self):
+        data = OrderedDict([
+            ("records", [get_record(0), get_record(1), get_record(0)]),
+            ("copy", get_record(0)),
+            ("small", [[1], [1]]),
+        ])
+        duplicates = content_hash.find_duplicate_subtrees(data)
+        self.assertEqual(len(duplicates), 2)
+        record, settings = sorted(duplicates, key=lambda duplicate: len(duplicate.paths))
+        self.assertEqual(record.paths, [("records", 0), ("records", 2), ("copy",)])
+        self.assertEqual(record.content_hash, content_hash.hash_data(get_record(0)))
+        self.assertEqual(record.get_saved_size(), content_hash.get_json_size(get_record(0)) * 2)
+
+        # the settings of record 1 are the same as in the copies of record 0
+        self.assertEqual(settings.paths, [
+            ("records", 0, "settings"), ("records", 1, "settings"), ("records", 2, "settings"), ("copy", "settings"),
+        ])
+        self.assertEqual(duplicates[0].get_saved_size(), max(record.get_saved_size(), settings.get_saved_size()))
+
+        # the lists in the settings are only in the copies of the settings
+        self.assertEqual(len(content_hash.find_duplicate_subtrees(data, min_size=1)), 3)
+        self.assertEqual(content_hash.find_duplicate_subtrees([get_record(0), get_record(1)], min_size=100), [])
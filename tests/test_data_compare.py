@@ -0,0 +1,128 @@
+import os
+import random
+import sys
+from collections import OrderedDict
+from unittest import TestCase
+
+tests_path = os.path.dirname(os.path.realpath(__file__))
+base_path = tests_path.rsplit(os.sep, 1)[0]
+if base_path not in sys.path:
+    sys.path.insert(0, base_path)
+
+from json_editor import data_compare
+from json_editor.data_compare import DiffHunk
+from json_editor.data_diff import DataChange, missing
+
+
+def get_hunks(left_data, right_data):
+    return list(data_compare.iter_diff_hunks(left_data, right_data))
+
+
+def get_random_data(rand, depth=0):
+    roll = rand.random()
+    if depth < 4 and roll < 0.25:
+        return OrderedDict(("k{}".format(rand.randrange(8)), get_random_data(rand, depth + 1))
+                           for _ in range(rand.randrange(5)))
+    if depth < 4 and roll < 0.5:
+        return [get_random_data(rand, depth + 1) for _ in range(rand.randrange(6))]
+    return rand.choice([0, 1, 2, 1.0, True, None, "a", "b"])
+
+
+class TestDiffHunks(TestCase):
+
+    def setUp(self):
+        self.data = OrderedDict([
+            ("a", 1),
+            ("b", OrderedDict([("c", [1, 2, 3, 4]), ("d", "x")])),
+            ("e", [OrderedDict([("id", 1), ("v", 1)]), OrderedDict([("id", 2), ("v", 2)])]),
+        ])
+
+    def test_same(self):
+        self.assertEqual(get_hunks(self.data, self.data), [])
+        right_data = OrderedDict(reversed(list(self.data.items())))  # key order doesn't matter
+        self.assertEqual(get_hunks(self.data, right_data), [])
+
+    def test_values(self):
+        right_data = OrderedDict(self.data)
+        right_data["a"] = True
+        del right_data["b"]
+        right_data["f"] = [1]
+        self.assertEqual(get_hunks(self.data, right_data), [
+            DiffHunk(("b",), ("b",), self.data["b"], missing),
+            DiffHunk(("a",), ("a",), 1, True),
+            DiffHunk(("f",), ("f",), missing, [1]),
+        ])
+        self.assertTrue(get_hunks(self.data, right_data)[0].is_removed())
+        self.assertTrue(get_hunks(self.data, right_data)[2].is_added())
+
+    def test_lists(self):
+        # values are lined up, so an insert only reports the inserted value
+        self.assertEqual(get_hunks([1, 2, 3, 4], [1, 2, 9, 3, 4]), [DiffHunk((2,), (2,), missing, 9)])
+        self.assertEqual(get_hunks([1, 2, 3, 4], [1, 3, 4]), [DiffHunk((1,), (1,), 2, missing)])
+        self.assertEqual(get_hunks([1, 2, 3], [1, 5, 3]), [DiffHunk((1,), (1,), 2, 5)])
+        self.assertEqual(get_hunks([[1, 2], [3]], [[0], [1, 2], [3, 4]]), [
+            DiffHunk((0,), (0,), missing, [0]),
+            DiffHunk((1, 1), (2, 1), missing, 4),
+        ])
+
+    def test_ids(self):
+        right_data = [
+            OrderedDict([("id", 1), ("v", 1)]),
+            OrderedDict([("id", 3), ("v", 3)]),
+            OrderedDict([("id", 2), ("v", 5)]),
+        ]
+        self.assertEqual(get_hunks(self.data["e"], right_data), [
+            DiffHunk((1,), (1,), missing, right_data[1]),
+            DiffHunk((1, "v"), (2, "v"), 2, 5),
+        ])
+
+        # without ids the dicts that differ are compared in order
+        self.assertEqual(list(data_compare.iter_diff_hunks(self.data["e"], right_data, id_keys=())), [
+            DiffHunk((1, "id"), (1, "id"), 2, 3),
+            DiffHunk((1, "v"), (1, "v"), 2, 3),
+            DiffHunk((2,), (2,), missing, right_data[2]),
+        ])
+
+    def test_deep(self):
+        left_data = OrderedDict([("v", 0)])
+        right_data = OrderedDict([("v", 1)])
+        for _ in range(10000):
+            left_data = [OrderedDict([("c", left_data)])]
+            right_data = [OrderedDict([("c", right_data)])]
+        hunks = get_hunks(left_data, right_data)
+        self.assertEqual(len(hunks), 1)
+        self.assertEqual(hunks[0].left_path, (0, "c") * 10000 + ("v",))
+
+
+class TestMerge(TestCase):
+
+    def test_merge_hunk(self):
+        left_data = OrderedDict([("a", 1), ("b", 2), ("c", [1, 2])])
+        right_data = OrderedDict([("c", [1, 3, 2]), ("d", 4)])
+        hunks = get_hunks(left_data, right_data)
+
+        # keys go after the keys before them on the other side
+        data_change, data = data_compare.merge_hunk(left_data, right_data, hunks[1], take_left=True)
+        self.assertEqual(data_change, DataChange(("b",), missing, 2))
+        self.assertEqual(list(data.items()), [("b", 2), ("c", [1, 3, 2]), ("d", 4)])
+
+        data_change, data = data_compare.merge_hunk(left_data, right_data, hunks[2], take_left=False)
+        self.assertEqual(data_change, DataChange(("c", 1), missing, 3))
+        self.assertEqual(data["c"], [1, 3, 2])
+        self.assertEqual(left_data["c"], [1, 2])  # copied, not modified
+
+        data_change, data = data_compare.merge_hunk(left_data, right_data, hunks[2], take_left=True)
+        self.assertEqual(data_change, DataChange(("c", 1), 3, missing))
+        self.assertEqual(data["c"], [1, 2])
+
+    def test_merge_hunks(self):
+        rand = random.Random(7)
+        for _ in range(300):
+            left_data = get_random_data(rand)
+            right_data = get_random_data(rand)
+            hunks = get_hunks(left_data, right_data)
+
+            merged_data = data_compare.merge_hunks(left_data, right_data, hunks, take_left=True)
+            self.assertEqual(get_hunks(left_data, merged_data), [])
+            merged_data = data_compare.merge_hunks(left_data, right_data, hunks, take_left=False)
+            self.assertEqual(get_hunks(merged_data, right_data), [])
@@ -0,0 +1,110 @@
+import os
+import sys
+from collections import OrderedDict
+from unittest import TestCase
+
+tests_path = os.path.dirname(os.path.realpath(__file__))
+base_path = tests_path.rsplit(os.sep, 1)[0]
+if base_path not in sys.path:
+    sys.path.insert(0, base_path)
+
+from json_editor import data_diff
+from json_editor.data_diff import DataChange, missing
+
+
+def get_changes(old_data, new_data):
+    return list(data_diff.iter_data_changes(old_data, new_data))
+
+
+def copy_data(data):
+    if isinstance(data, dict):
+        return OrderedDict((key, copy_data(value)) for key, value in data.items())
+    if isinstance(data, list):
+        return [copy_data(value) for value in data]
+    return data
+
+
+class TestDataChanges(TestCase):
+
+    def setUp(self):
+        self.data = OrderedDict([
+            ("a", 1),
+            ("b", OrderedDict([("c", [1, 2, 3]), ("d", "x")])),
+            ("e", [OrderedDict([("f", 0)]), OrderedDict([("f", 1)])]),
+        ])
+
+    def test_same(self):
+        self.assertEqual(get_changes(self.data, self.data), [])
+        self.assertEqual(get_changes(self.data, copy_data(self.data)), [])
+        self.assertEqual(get_changes(1, 1), [])
+
+    def test_values(self):
+        new_data = copy_data(self.data)
+        new_data["a"] = 2
+        new_data["e"][1]["f"] = "1"
+        self.assertEqual(get_changes(self.data, new_data), [
+            DataChange(("a",), 1, 2),
+            DataChange(("e", 1, "f"), 1, "1"),
+        ])
+
+    def test_types(self):
+        # equal in python, but not the same json
+        new_data = copy_data(self.data)
+        new_data["a"] = True
+        new_data["b"]["c"][0] = 1.0
+        self.assertEqual(get_changes(self.data, new_data), [
+            DataChange(("a",), 1, True),
+            DataChange(("b", "c", 0), 1, 1.0),
+        ])
+
+        # a container turned into a value
+        new_data = copy_data(self.data)
+        new_data["b"] = "b"
+        self.assertEqual(get_changes(self.data, new_data), [DataChange(("b",), self.data["b"], "b")])
+        self.assertEqual(get_changes([1], {"0": 1}), [DataChange((), [1], {"0": 1})])
+
+    def test_keys(self):
+        new_data = copy_data(self.data)
+        del new_data["a"]
+        new_data["b"]["g"] = None
+        self.assertEqual(get_changes(self.data, new_data), [
+            DataChange(("a",), 1, missing),
+            DataChange(("b", "g"), missing, None),
+        ])
+        self.assertTrue(get_changes(self.data, new_data)[0].is_removed())
+        self.assertTrue(get_changes(self.data, new_data)[1].is_added())
+
+        # the keys that are left changed order
+        new_data = copy_data(self.data)
+        new_data["b"] = OrderedDict([("d", "x"), ("c", [1, 2, 3])])
+        self.assertEqual(get_changes(self.data, new_data), [DataChange(("b",), self.data["b"], new_data["b"])])
+
+    def test_lists(self):
+        new_data = copy_data(self.data)
+        new_data["b"]["c"] = [1, 5]
+        self.assertEqual(get_changes(self.data, new_data), [
+            DataChange(("b", "c", 1), 2, 5),
+            DataChange(("b", "c", 2), 3, missing),
+        ])
+
+        new_data["b"]["c"] = [1, 2, 3, 4, 5]
+        self.assertEqual(get_changes(self.data, new_data), [
+            DataChange(("b", "c", 3), missing, 4),
+            DataChange(("b", "c", 4), missing, 5),
+        ])
+
+    def test_deep(self):
+        old_data = OrderedDict([("v", 0)])
+        new_data = OrderedDict([("v", 1)])
+        for _ in range(10000):
+            old_data = OrderedDict([("c", old_data)])
+            new_data = OrderedDict([("c", new_data)])
+        data_changes = get_changes(old_data, new_data)
+        self.assertEqual(len(data_changes), 1)
+        self.assertEqual(data_changes[0].path, ("c",) * 10000 + ("v",))
+
+    def test_get_path_value(self):
+        self.assertEqual(data_diff.get_path_value(self.data, ("e", 1, "f")), 1)
+        self.assertIs(data_diff.get_path_value(self.data, ("e", 2)), missing)
+        self.assertIs(data_diff.get_path_value(self.data, ()), self.data)
+
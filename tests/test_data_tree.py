@@ -0,0 +1,387 @@
+import copy
+import json
+import os
+import shutil
+import sys
+import tempfile
+from collections import OrderedDict
+from unittest import TestCase
+
+tests_path = os.path.dirname(os.path.realpath(__file__))
+base_path = tests_path.rsplit(os.sep, 1)[0]
+if base_path not in sys.path:
+    sys.path.insert(0, base_path)
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from json_editor.ui_utils import QtWidgets
+
+app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+
+from json_editor import content_hash
+from json_editor import data_tree
+from json_editor.data_tree import lk
+from json_editor import json_editor_system as system
+from json_editor.json_editor_system import iter_encode_json
+
+
+def edit_item(data_tree_widget, data_path, column, text):
+    """Edit an item the way the delegate does when the user types in it"""
+    item = data_tree_widget.get_item_at_path(data_path)
+    data_tree_widget.item_delegate.edited_text = item.text(column)  # the text from before the edit
+    item.setText(column, text)
+
+
+def get_item_texts(data_tree_widget):
+    """
+    :param data_tree_widget:
+    :return: text of every cell of the items that have been created, in the order they're shown
+    """
+    root_item = data_tree_widget.tree_widget.invisibleRootItem()
+    return [
+        (item.text(lk.col_key), item.text(lk.col_value), item.text(lk.col_type))
+        for item in data_tree.iter_item_descendants(root_item, fetch=False)
+    ]
+
+
+def get_test_data():
+    return OrderedDict([
+        ("a", 1),
+        ("b", [1, 2.5, "three", None, True]),
+        ("c", OrderedDict([("d", u"\u00e9"), ("e", 2 ** 70), ("f", OrderedDict([("g", [])]))])),
+        ("numbers", list(range(25000))),  # shown as ranges of rows
+        ("records", [OrderedDict([("id", i), ("name", "record {}".format(i))]) for i in range(12000)]),
+    ])
+
+
+def select_paths(data_tree_widget, data_paths):
+    data_tree_widget.select_items([data_tree_widget.get_item_at_path(data_path) for data_path in data_paths])
+
+
+def build_chain(depth):
+    data = 0
+    for _ in range(depth):
+        data = OrderedDict([("c", data)])
+    return data
+
+
+def get_types(data):
+    return [type(value) for value in data.values()]
+
+
+class TestDataTreeEdit(TestCase):
+
+    def setUp(self):
+        self.data_tree_widget = data_tree.DataTreeWidget()
+
+    def tearDown(self):
+        self.data_tree_widget.deleteLater()
+
+    def test_change_type(self):
+        self.data_tree_widget.set_data(OrderedDict([("a", 1), ("b", 1)]))
+        edit_item(self.data_tree_widget, ("a",), lk.col_type, "float")
+        edit_item(self.data_tree_widget, ("b",), lk.col_type, "bool")
+
+        # 1 == 1.0 == True, the stored value still has to change type
+        data = self.data_tree_widget.get_data()
+        self.assertEqual(get_types(data), [float, bool])
+        self.assertEqual(data, OrderedDict([("a", 1.0), ("b", True)]))
+
+        self.data_tree_widget.undo()
+        self.data_tree_widget.undo()
+        self.assertEqual(get_types(self.data_tree_widget.get_data()), [int, int])
+        self.assertEqual(self.data_tree_widget.get_item_at_path(("a",)).text(lk.col_type), "int")
+        self.data_tree_widget.redo()
+        self.data_tree_widget.redo()
+        self.assertEqual(get_types(self.data_tree_widget.get_data()), [float, bool])
+
+
+class TestDataTreeRoundTrip(TestCase):
+
+    def setUp(self):
+        self.data = get_test_data()
+        self.data_tree_widget = data_tree.DataTreeWidget()
+        self.data_tree_widget.set_data(copy.deepcopy(self.data))
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.data_tree_widget.deleteLater()
+        shutil.rmtree(self.temp_dir)
+
+    def assert_tree_data(self, data):
+        self.assertEqual(json.dumps(self.data_tree_widget.get_data()), json.dumps(data))
+        for indent in (None, 2):
+            self.assertEqual("".join(self.data_tree_widget.iter_json_chunks(indent=indent)),
+                             json.dumps(data, indent=indent))
+
+    def save(self, indent=None):
+        path = os.path.join(self.temp_dir, "saved.json")
+        with open(path, "w") as fp:
+            for chunk in self.data_tree_widget.iter_json_chunks(indent=indent):
+                fp.write(chunk)
+        self.data_tree_widget.set_json_snapshot(system.JsonFileSnapshot(path, indent))
+
+    def test_round_trip(self):
+        self.assert_tree_data(self.data)
+        self.data_tree_widget.finish_population()
+        self.assert_tree_data(self.data)
+
+    def test_edit(self):
+        edit_item(self.data_tree_widget, ("a",), lk.col_key, "z")
+        edit_item(self.data_tree_widget, ("c", "d"), lk.col_value, "new")
+        edit_item(self.data_tree_widget, ("numbers", 15000), lk.col_value, "-1")
+        edit_item(self.data_tree_widget, ("records", 11000, "name"), lk.col_value, "edited")
+
+        self.data = OrderedDict(("z" if key == "a" else key, value) for key, value in self.data.items())
+        self.data["c"]["d"] = "new"
+        self.data["numbers"][15000] = -1
+        self.data["records"][11000]["name"] = "edited"
+        self.assert_tree_data(self.data)
+
+    def test_duplicate_keys(self):
+        # a rename can give two keys the same name, the last value is kept where the key was first used
+        self.data_tree_widget.set_data(OrderedDict([("k1", 1), ("b", OrderedDict([("k2", 2)])), ("K1", 3)]))
+        items = [self.data_tree_widget.get_item_at_path((key,)) for key in ("k1", "b", "K1")]
+        self.data_tree_widget.rename_items(items, lambda text: text.upper(), keys=True, hierarchy=True)
+        data = OrderedDict([("K1", 3), ("B", OrderedDict([("K2", 2)]))])
+        self.assert_tree_data(data)
+        self.assertEqual(self.data_tree_widget.get_content_hash(), content_hash.hash_data(data))
+
+    def test_save_after_save(self):
+        # unchanged parts are copied from the saved file
+        self.save(indent=2)
+        edit_item(self.data_tree_widget, ("records", 5, "id"), lk.col_value, "50")
+        self.data["records"][5]["id"] = 50
+        self.assertEqual("".join(self.data_tree_widget.iter_json_chunks(indent=2)), json.dumps(self.data, indent=2))
+
+        self.save(indent=2)
+        select_paths(self.data_tree_widget, [("b", 1), ("numbers", 20000)])
+        self.data_tree_widget.delete_selected_items()
+        del self.data["b"][1]
+        del self.data["numbers"][20000]
+        self.assertEqual("".join(self.data_tree_widget.iter_json_chunks(indent=2)), json.dumps(self.data, indent=2))
+
+        # the saved file changed, so it isn't used
+        self.save(indent=None)
+        self.assert_tree_data(self.data)
+
+    def test_save_after_undo(self):
+        # items put back by undo were written at another place in the file saved before
+        data = OrderedDict([
+            ("p", OrderedDict([
+                ("x", OrderedDict([("k", 1)])), ("c", OrderedDict([("v", "child")])), ("y", [1, 2, 3])])),
+            ("q", 5),
+        ])
+        self.data_tree_widget.set_data(copy.deepcopy(data))
+        self.save(indent=2)
+        select_paths(self.data_tree_widget, [("p", "x")])
+        self.data_tree_widget.delete_selected_items()
+        self.save(indent=2)
+        self.data_tree_widget.undo()
+        self.assertEqual("".join(self.data_tree_widget.iter_json_chunks(indent=2)), json.dumps(data, indent=2))
+
+        self.save(indent=2)
+        self.data_tree_widget.redo()
+        del data["p"]["x"]
+        self.assertEqual("".join(self.data_tree_widget.iter_json_chunks(indent=2)), json.dumps(data, indent=2))
+
+
+class TestDataTreeUndo(TestCase):
+
+    def setUp(self):
+        self.data = get_test_data()
+        self.data_tree_widget = data_tree.DataTreeWidget()
+        self.data_tree_widget.set_data(copy.deepcopy(self.data))
+
+    def tearDown(self):
+        self.data_tree_widget.deleteLater()
+
+    def assert_undo(self, edit, expected_data):
+        """Edit the tree, then check the data and what the items show after undo and redo"""
+        old_text = json.dumps(self.data_tree_widget.get_data())
+        old_item_texts = get_item_texts(self.data_tree_widget)
+        edit()
+        new_text = json.dumps(expected_data)
+        self.assertEqual(json.dumps(self.data_tree_widget.get_data()), new_text)
+        new_item_texts = get_item_texts(self.data_tree_widget)
+
+        self.data_tree_widget.undo()
+        self.assertEqual(json.dumps(self.data_tree_widget.get_data()), old_text)
+        self.assertEqual(get_item_texts(self.data_tree_widget), old_item_texts)
+        self.data_tree_widget.redo()
+        self.assertEqual(json.dumps(self.data_tree_widget.get_data()), new_text)
+        self.assertEqual(get_item_texts(self.data_tree_widget), new_item_texts)
+        self.assertEqual("".join(self.data_tree_widget.iter_json_chunks()), new_text)
+
+    def test_edit(self):
+        self.data["b"][2] = "edited"
+        self.assert_undo(lambda: edit_item(self.data_tree_widget, ("b", 2), lk.col_value, "edited"), self.data)
+
+    def test_edit_key(self):
+        self.data["c"] = OrderedDict(("x" if key == "e" else key, value) for key, value in self.data["c"].items())
+        self.assert_undo(lambda: edit_item(self.data_tree_widget, ("c", "e"), lk.col_key, "x"), self.data)
+
+    def test_delete(self):
+        select_paths(self.data_tree_widget, [("a",), ("b", 1), ("numbers", 12345), ("records", 0)])
+        del self.data["a"]
+        del self.data["b"][1]
+        del self.data["numbers"][12345]
+        del self.data["records"][0]
+        self.assert_undo(self.data_tree_widget.delete_selected_items, self.data)
+
+    def test_duplicate(self):
+        def duplicate():
+            select_paths(self.data_tree_widget, [("b", 0), ("b", 2)])
+            self.data_tree_widget.action_duplicate_selected_items()
+
+        self.data["b"] = [1, 1, 2.5, "three", "three", None, True]
+        self.assert_undo(duplicate, self.data)
+
+        # copies in a dict get a key of their own
+        select_paths(self.data_tree_widget, [("c", "d")])
+        self.data_tree_widget.action_duplicate_selected_items()
+        self.assertEqual(list(self.data_tree_widget.get_data()["c"].values()), [u"\u00e9", u"\u00e9", 2 ** 70,
+                                                                               OrderedDict([("g", [])])])
+
+    def test_move(self):
+        def move_up():
+            select_paths(self.data_tree_widget, [("b", 2), ("c",)])
+            self.data_tree_widget.action_move_selected_items_up()
+
+        self.data["b"] = [1, "three", 2.5, None, True]
+        self.data = OrderedDict((key, self.data[key]) for key in ("a", "c", "b", "numbers", "records"))
+        self.assert_undo(move_up, self.data)
+
+    def test_sort(self):
+        self.data["c"] = OrderedDict(reversed(list(self.data["c"].items())))
+        self.data_tree_widget.set_data(copy.deepcopy(self.data))
+
+        def sort():
+            select_paths(self.data_tree_widget, [("c", "f"), ("c", "e"), ("c", "d")])
+            self.data_tree_widget.sort_selected_items()
+
+        self.data["c"] = OrderedDict(sorted(self.data["c"].items()))
+        self.assert_undo(sort, self.data)
+
+    def test_add(self):
+        def add():
+            select_paths(self.data_tree_widget, [("b",)])
+            self.data_tree_widget.add_item_of_type(int)
+
+        self.data["b"].append(0)
+        self.assert_undo(add, self.data)
+
+    def test_rename(self):
+        def rename():
+            items = [self.data_tree_widget.get_item_at_path(("c",))]
+            self.data_tree_widget.rename_items(items, lambda text: text.upper(), keys=True, hierarchy=True)
+
+        self.data["c"] = OrderedDict([("D", u"\u00e9"), ("E", 2 ** 70), ("F", OrderedDict([("G", [])]))])
+        self.data = OrderedDict(("C" if key == "c" else key, value) for key, value in self.data.items())
+        self.assert_undo(rename, self.data)
+
+    def test_update_data(self):
+        new_data = copy.deepcopy(self.data)
+        new_data["b"].insert(1, "inserted")
+        new_data["c"]["new"] = 1
+        del new_data["records"][100:200]
+        new_data["numbers"][24999] = "last"
+        self.assert_undo(lambda: self.data_tree_widget.update_data(new_data, text="Update"), new_data)
+
+
+class TestDataTreeFilter(TestCase):
+
+    def test_filter(self):
+        data_tree_widget = data_tree.DataTreeWidget()
+        data_tree_widget.set_data(OrderedDict([
+            ("needle", 1),
+            ("other", OrderedDict([("inner_needle", 2), ("hay", 3)])),
+            ("hay", [4]),
+        ]))
+        data_tree_widget.finish_population()
+
+        data_tree_widget.set_filter("needle")
+        shown_keys = [
+            key for key in ("needle", "other", "hay")
+            if not data_tree_widget.get_item_at_path((key,)).isHidden()
+        ]
+        self.assertEqual(shown_keys, ["needle", "other"])
+        self.assertFalse(data_tree_widget.get_item_at_path(("other", "inner_needle")).isHidden())
+        self.assertTrue(data_tree_widget.get_item_at_path(("other", "hay")).isHidden())
+
+        # the index follows edits
+        edit_item(data_tree_widget, ("hay",), lk.col_key, "needle_2")
+        data_tree_widget.set_filter("needle_")
+        self.assertFalse(data_tree_widget.get_item_at_path(("needle_2",)).isHidden())
+        self.assertTrue(data_tree_widget.get_item_at_path(("needle",)).isHidden())
+
+        data_tree_widget.set_filter("")
+        self.assertFalse(any(item.isHidden() for item in data_tree_widget.get_all_items()))
+        data_tree_widget.deleteLater()
+
+    def test_filter_unfetched(self):
+        # values of items that haven't been expanded are searched without creating their items
+        records = [OrderedDict([("name", "record {}".format(i))]) for i in range(100)]
+        data_tree_widget = data_tree.DataTreeWidget()
+        data_tree_widget.set_data(OrderedDict([
+            ("numbers", list(range(25000))),
+            ("a", OrderedDict([("b", OrderedDict([("c", OrderedDict([("records", records)]))]))])),  # not expanded
+        ]))
+        data_tree_widget.finish_population()
+        root_item = data_tree_widget.tree_widget.invisibleRootItem()
+        item_count = len(list(data_tree.iter_item_descendants(root_item, fetch=False)))
+
+        def get_new_item_count():
+            return len(list(data_tree.iter_item_descendants(root_item, fetch=False))) - item_count
+
+        search_columns = (lk.col_key, lk.col_value)
+        data_tree_widget.set_filter("record 42", search_columns=search_columns)
+        self.assertEqual(get_new_item_count(), 101)
+        self.assertFalse(data_tree_widget.get_item_at_path(("a", "b", "c", "records", 42, "name")).isHidden())
+        self.assertTrue(data_tree_widget.get_item_at_path(("a", "b", "c", "records", 41)).isHidden())
+        self.assertTrue(data_tree_widget.get_item_at_path(("numbers",)).isHidden())
+
+        # rows of ranges are only created for the range that holds the match
+        data_tree_widget.set_filter("24999", search_columns=search_columns)
+        self.assertEqual(get_new_item_count(), 101 + 3 + 5000)
+        self.assertFalse(data_tree_widget.get_item_at_path(("numbers", 24999)).isHidden())
+        self.assertTrue(data_tree_widget.get_item_at_path(("a",)).isHidden())
+
+        # items that were created since are indexed instead of their data
+        edit_item(data_tree_widget, ("a", "b", "c", "records", 41, "name"), lk.col_value, "record 42b")
+        data_tree_widget.set_filter("record 42", search_columns=search_columns)
+        self.assertFalse(data_tree_widget.get_item_at_path(("a", "b", "c", "records", 41, "name")).isHidden())
+        self.assertFalse(data_tree_widget.get_item_at_path(("a", "b", "c", "records", 42, "name")).isHidden())
+        self.assertTrue(data_tree_widget.get_item_at_path(("a", "b", "c", "records", 43)).isHidden())
+        data_tree_widget.deleteLater()
+
+
+class TestDataTreeDeep(TestCase):
+
+    def test_deep_chain(self):
+        # far below the recursion limit and deep enough for Qt to run out of stack deleting the items recursively
+        depth = 100000
+        data = build_chain(depth)
+        data_tree_widget = data_tree.DataTreeWidget()
+        data_tree_widget.show()
+        data_tree_widget.set_data(data)
+        data_tree_widget.finish_population()
+
+        bottom_item = data_tree_widget.get_item_at_path(("c",) * depth)
+        self.assertEqual(bottom_item.text(lk.col_value), "0")
+
+        tree_data = data_tree_widget.get_data()
+        self.assertEqual("".join(iter_encode_json(tree_data)), "".join(iter_encode_json(data)))
+        self.assertEqual("".join(data_tree_widget.iter_json_chunks()), "".join(iter_encode_json(data)))
+
+        data_tree_widget.select_items([data_tree_widget.get_item_at_path(("c",))])
+        data_tree_widget.select_hierarchy()
+        self.assertEqual(len(data_tree_widget.tree_widget.selectedItems()), depth)
+
+        # cleared from the bottom up
+        root_item = data_tree_widget.tree_widget.invisibleRootItem()
+        self.assertTrue(root_item.data(lk.col_value, lk.role_has_deep_items))
+        data_tree_widget.set_data([])
+        self.assertEqual(data_tree_widget.tree_widget.topLevelItemCount(), 0)
+        data_tree_widget.close()
+        data_tree_widget.deleteLater()
@@ -0,0 +1,71 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase
+
+tests_path = os.path.dirname(os.path.realpath(__file__))
+base_path = tests_path.rsplit(os.sep, 1)[0]
+if base_path not in sys.path:
+    sys.path.insert(0, base_path)
+
+from json_editor import file_search
+from json_editor import json_query
+
+
+class TestFileSearchIndex(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.json_dir = os.path.join(self.temp_dir, "files")
+        os.makedirs(os.path.join(self.json_dir, "sub"))
+        self.index_path = os.path.join(self.temp_dir, "search.index")
+
+        self.write_json("a.json", {"name": "Arm_L", "rig": {"joints": [{"n": "hand_L"}, {"n": "finger"}]}})
+        self.write_json(os.path.join("sub", "b.json"), [1, True, None, "arm"])
+        self.write_json("c.json", "just a string")
+        with open(os.path.join(self.json_dir, "broken.json"), "w") as fp:
+            fp.write("{")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_json(self, file_name, json_data):
+        with open(os.path.join(self.json_dir, file_name), "w") as fp:
+            json.dump(json_data, fp)
+
+    def find(self, search_index, query, **kwargs):
+        return [
+            (os.path.relpath(result.json_path, self.json_dir), json_query.format_path(result.data_path), result.value)
+            for result in search_index.find(query, **kwargs)
+        ]
+
+    def test_find(self):
+        search_index = file_search.FileSearchIndex(self.index_path)
+        self.assertEqual(search_index.update([self.json_dir], jobs=1), 4)
+
+        self.assertEqual(self.find(search_index, "ARM"), [
+            ("a.json", "$.name", "Arm_L"),
+            (os.path.join("sub", "b.json"), "$[3]", "arm"),
+        ])
+        self.assertEqual(self.find(search_index, "joints"), [("a.json", "$.rig.joints", "")])
+        self.assertEqual(self.find(search_index, "_l", limit=1), [("a.json", "$.name", "Arm_L")])
+        self.assertEqual(self.find(search_index, "true"), [(os.path.join("sub", "b.json"), "$[1]", "True")])
+        self.assertEqual(self.find(search_index, "arm", paths=[os.path.join(self.json_dir, "sub")]), [
+            (os.path.join("sub", "b.json"), "$[3]", "arm"),
+        ])
+
+    def test_incremental_update(self):
+        search_index = file_search.FileSearchIndex(self.index_path)
+        search_index.update([self.json_dir], jobs=1)
+
+        # loaded from disk, nothing changed
+        search_index = file_search.FileSearchIndex(self.index_path)
+        self.assertEqual(search_index.update([self.json_dir], jobs=1), 0)
+
+        self.write_json("a.json", {"name": "leg", "padding": "changes the size"})
+        os.remove(os.path.join(self.json_dir, "sub", "b.json"))
+        self.assertEqual(search_index.update([self.json_dir], jobs=1), 1)
+        self.assertEqual(self.find(search_index, "arm"), [])
+        self.assertEqual(self.find(search_index, "leg"), [("a.json", "$.name", "leg")])
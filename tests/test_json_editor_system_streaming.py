@@ -0,0 +1,201 @@
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+from collections import OrderedDict
+from unittest import TestCase
+
+tests_path = os.path.dirname(os.path.realpath(__file__))
+base_path = tests_path.rsplit(os.sep, 1)[0]
+if base_path not in sys.path:
+    sys.path.insert(0, base_path)
+
+import json_editor.json_editor_system as system
+
+example_json_path = os.path.join(base_path, "json_editor", "resources", "example_json_data.json")
+
+
+class TestJsonStreaming(TestCase):
+
+    def test_tiny_chunks_match_json_load(self):
+        """Tokens split across chunk boundaries are still parsed correctly"""
+        with open(example_json_path, "r") as fp:
+            expected_data = json.load(fp, object_pairs_hook=OrderedDict)
+
+        for chunk_size in (1, 2, 3, 7):
+            self.assertEqual(system.load_json_subtree(example_json_path, chunk_size=chunk_size), expected_data)
+
+    def test_events(self):
+        json_text = '{"a": [1, 2.5e1, "s\\"", true, null], "b": {}}'
+        events = list(system.iter_json_events(io.StringIO(json_text), chunk_size=4))
+        self.assertEqual(events, [
+            ("start_map", None),
+            ("key", "a"),
+            ("start_array", None),
+            ("value", 1),
+            ("value", 25.0),
+            ("value", 's"'),
+            ("value", True),
+            ("value", None),
+            ("end_array", None),
+            ("key", "b"),
+            ("start_map", None),
+            ("end_map", None),
+            ("end_map", None),
+        ])
+
+    def test_special_floats(self):
+        events = system.iter_json_events(io.StringIO("[NaN, Infinity, -Infinity, -1]"))
+        values = system.build_json_value(events, next(events))
+        self.assertNotEqual(values[0], values[0])
+        self.assertEqual(values[1:], [float("inf"), float("-inf"), -1])
+
+    def test_subtree(self):
+        sub_data = system.load_json_subtree(example_json_path, data_path=("a_dict_hierarchy", "sub_list"))
+        self.assertIsInstance(sub_data, list)
+
+        with self.assertRaises(KeyError):
+            system.load_json_subtree(example_json_path, data_path=("not_a_key",))
+
+    def test_max_depth(self):
+        top_data = system.load_json_subtree(example_json_path, max_depth=2)
+        unloaded = top_data["a_dict_hierarchy"]["sub_list"]
+        self.assertIsInstance(unloaded, system.UnloadedContainer)
+        self.assertEqual(unloaded.data_type, list)
+        self.assertEqual(unloaded.data_path, ("a_dict_hierarchy", "sub_list"))
+
+        sub_data = system.load_json_subtree(example_json_path, data_path=unloaded.data_path)
+        self.assertEqual(len(sub_data), unloaded.item_count)
+
+
+def load_all(data):
+    """load every DeferredContainer one level at a time"""
+    if isinstance(data, system.DeferredContainer):
+        return load_all(data.load(max_depth=1))
+    if isinstance(data, dict):
+        return OrderedDict((key, load_all(value)) for key, value in data.items())
+    if isinstance(data, list):
+        return [load_all(value) for value in data]
+    return data
+
+
+class TestLargeJsonFile(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.json_path = os.path.join(self.temp_dir, "example.json")
+        shutil.copy(example_json_path, self.json_path)
+
+        with open(example_json_path, "r") as fp:
+            self.expected_data = json.load(fp, object_pairs_hook=OrderedDict)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_load_one_level_at_a_time(self):
+        for index_depth in (0, 1, 3):
+            large_file, root_data = system.load_large_json(self.json_path, index_depth=index_depth)
+            self.assertEqual(load_all(root_data), self.expected_data)
+            large_file.close()
+            os.remove(system.get_json_index_path(self.json_path))
+
+    def test_index_sidecar(self):
+        large_file, _ = system.load_large_json(self.json_path, index_depth=2)
+        large_file.close()
+
+        index = system.load_json_offset_index(self.json_path, max_depth=2)
+        self.assertEqual(list(index.starts), list(large_file.index.starts))
+        self.assertIsNone(system.load_json_offset_index(self.json_path, max_depth=3))
+
+        # a changed file invalidates the index
+        with open(self.json_path, "a") as fp:
+            fp.write(" ")
+        self.assertIsNone(system.load_json_offset_index(self.json_path, max_depth=2))
+
+    def test_preview(self):
+        preview_data, has_more_items = system.preview_json(self.json_path, item_count=2)
+        self.assertEqual(list(preview_data.items()), list(self.expected_data.items())[:2])
+        self.assertTrue(has_more_items)
+
+        preview_data, has_more_items = system.preview_json(self.json_path, item_count=1000)
+        self.assertEqual(preview_data, self.expected_data)
+        self.assertFalse(has_more_items)
+
+
+class TestJsonFileWriter(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.json_path = os.path.join(self.temp_dir, "example.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_save_matches_json_dumps(self):
+        json_data = OrderedDict([("a", [1, 2.5, None]), ("b", {"c": "é"})])
+        for indent in (None, 0, 2, "\t"):
+            system.save_json(json_data, self.json_path, indent=indent)
+            with open(self.json_path, "r") as fp:
+                self.assertEqual(fp.read(), json.dumps(json_data, indent=indent))
+        self.assertEqual(os.listdir(self.temp_dir), ["example.json"])
+
+    def test_encode_matches_json_dumps(self):
+        json_data = OrderedDict([
+            ("a", [1, 2.5, None, True, False, "é\n", [], {}, (1, [2])]),
+            (1, {"b": float("inf")}), (2.5, 0), (True, 1), (None, 2),
+        ])
+        for indent in (None, 0, 2, "\t"):
+            self.assertEqual("".join(system.iter_encode_json(json_data, indent=indent)),
+                             json.dumps(json_data, indent=indent))
+        self.assertEqual("".join(system.iter_encode_json("a")), '"a"')
+
+    def test_deep(self):
+        """Documents nested deeper than the recursion limit are saved and loaded without recursing"""
+        depth = 100000
+        json_data = {"leaf": 1}
+        for _ in range(depth):
+            json_data = OrderedDict([("a", [json_data]), ("b", 2)])
+
+        system.save_json(json_data, self.json_path, indent=None)
+        with open(self.json_path, "r") as fp:
+            self.assertEqual(fp.read(), "".join(system.iter_encode_json(json_data)))
+
+        loaded_data = system.load_json(self.json_path)
+        self.assertEqual(list(loaded_data), ["a", "b"])
+        system.save_json(loaded_data, self.json_path, indent=None)
+        with open(self.json_path, "r") as fp:
+            self.assertEqual(fp.read(), "".join(system.iter_encode_json(json_data)))
+        self.assertEqual(os.listdir(self.temp_dir), ["example.json"])
+
+    def test_file_mode(self):
+        system.save_json([1], self.json_path, indent=None)
+        self.assertEqual(os.stat(self.json_path).st_mode & 0o777, 0o666 & ~system.get_umask())
+
+        os.chmod(self.json_path, 0o640)
+        system.save_json([2], self.json_path, indent=None)
+        self.assertEqual(os.stat(self.json_path).st_mode & 0o777, 0o640)
+
+    def test_abort_keeps_original(self):
+        system.save_json([1], self.json_path, indent=None)
+
+        file_writer = system.JsonFileWriter(self.json_path)
+        file_writer.write("[2")
+        file_writer.abort()
+
+        with open(self.json_path, "r") as fp:
+            self.assertEqual(fp.read(), "[1]")
+        self.assertEqual(os.listdir(self.temp_dir), ["example.json"])
+
+    def test_snapshot(self):
+        system.save_json({"a": [1, 2]}, self.json_path, indent=None)
+        snapshot = system.JsonFileSnapshot(self.json_path, indent=None)
+        self.assertTrue(snapshot.is_current(None))
+        self.assertFalse(snapshot.is_current(2))
+        self.assertEqual(snapshot.read(6, 6), "[1, 2]")
+        snapshot.close()
+
+        with open(self.json_path, "a") as fp:
+            fp.write(" ")
+        self.assertFalse(snapshot.is_current(None))
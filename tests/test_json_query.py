@@ -0,0 +1,85 @@
+import os
+import sys
+from collections import OrderedDict
+from unittest import TestCase
+
+tests_path = os.path.dirname(os.path.realpath(__file__))
+base_path = tests_path.rsplit(os.sep, 1)[0]
+if base_path not in sys.path:
+    sys.path.insert(0, base_path)
+
+from json_editor import json_query
+
+example_data = OrderedDict([
+    ("characters", [
+        OrderedDict([("name", "a"), ("rig", {"joints": [
+            OrderedDict([("n", "j1"), ("weight", 0.7)]),
+            OrderedDict([("n", "j2"), ("weight", 0.2)]),
+            OrderedDict([("n", "j3")]),
+        ]})]),
+        OrderedDict([("name", "b"), ("rig", {"joints": [
+            OrderedDict([("n", "j4"), ("weight", 0.9), ("tag", "arm_l")]),
+        ]})]),
+        OrderedDict([("name", "c")]),
+    ]),
+    ("store", OrderedDict([("x-y", 1), ("name", "s"), ("flag", True)])),
+])
+
+
+def find_values(query_text, **kwargs):
+    return json_query.compile_query(query_text).find_values(example_data, **kwargs)
+
+
+class TestJsonQuery(TestCase):
+
+    def test_children(self):
+        self.assertEqual(find_values("$.store.name"), ["s"])
+        self.assertEqual(find_values("$['store']['x-y']"), [1])
+        self.assertEqual(find_values("$.store['name', 'flag']"), ["s", True])
+        self.assertEqual(find_values("$.store.*"), [1, "s", True])
+        self.assertEqual(find_values("$.missing"), [])
+
+    def test_indices(self):
+        self.assertEqual(find_values("$.characters[0].name"), ["a"])
+        self.assertEqual(find_values("$.characters[-1].name"), ["c"])
+        self.assertEqual(find_values("$.characters[0, 2].name"), ["a", "c"])
+        self.assertEqual(find_values("$.characters[::2].name"), ["a", "c"])
+        self.assertEqual(find_values("$.characters[1:].name"), ["b", "c"])
+        self.assertEqual(find_values("$.characters[5]"), [])
+
+    def test_descendants(self):
+        paths = json_query.compile_query("$..name").find_paths(example_data)
+        self.assertEqual(paths, [
+            ("characters", 0, "name"),
+            ("characters", 1, "name"),
+            ("characters", 2, "name"),
+            ("store", "name"),
+        ])
+        self.assertEqual(find_values("$..n", limit=2), ["j1", "j2"])
+
+    def test_filters(self):
+        self.assertEqual(find_values("$.characters[*].rig.joints[?(@.weight > 0.5)].n"), ["j1", "j4"])
+        self.assertEqual(find_values("$..joints[?(@.weight)].n"), ["j1", "j2", "j4"])
+        self.assertEqual(find_values("$..joints[?(!@.weight || @.weight < 0.3)].n"), ["j2", "j3"])
+        self.assertEqual(find_values("$..joints[?(@.tag =~ '^arm')].n"), ["j4"])
+        self.assertEqual(find_values("$.characters[?(@.rig.joints[0].weight >= 0.9)].name"), ["b"])
+
+        # true isn't 1
+        self.assertEqual(find_values("$.store[?(@ == 1)]"), [1])
+        self.assertEqual(find_values("$.store[?(@ == true)]"), [True])
+
+    def test_compiled_once(self):
+        self.assertIs(json_query.compile_query("$.store"), json_query.compile_query("$.store"))
+
+    def test_format_path(self):
+        data_path = ("store", "x-y")
+        self.assertEqual(json_query.format_path(data_path), "$.store.x-y")
+
+        for data_path in (("characters", 0, "rig"), ("it's", "a b", "\\")):
+            query = json_query.compile_query(json_query.format_path(data_path))
+            self.assertEqual(query.find_paths({"characters": [{"rig": 1}], "it's": {"a b": {"\\": 1}}}), [data_path])
+
+    def test_errors(self):
+        for query_text in ("store", "$.", "$[", "$[?(@.a >)]", "$[0:1:0]", "$[?(@ =~ '(')]", "$.a b", "$['a', 0]"):
+            with self.assertRaises(json_query.JsonQueryError):
+                json_query.compile_query(query_text)
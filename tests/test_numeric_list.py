@@ -0,0 +1,76 @@
+import array
+import json
+import os
+import sys
+from unittest import TestCase
+
+tests_path = os.path.dirname(os.path.realpath(__file__))
+base_path = tests_path.rsplit(os.sep, 1)[0]
+if base_path not in sys.path:
+    sys.path.insert(0, base_path)
+
+from json_editor import numeric_list
+
+
+class TestNumericList(TestCase):
+
+    def test_pack_values(self):
+        floats = [i * 0.5 for i in range(100)]
+        packed = numeric_list.pack_values(floats)
+        self.assertEqual(packed.typecode, "d")
+        self.assertEqual(numeric_list.unpack_values(packed), floats)
+        self.assertIs(numeric_list.pack_values(packed), packed)
+
+        ints = list(range(100))
+        self.assertEqual(json.dumps(numeric_list.unpack_values(numeric_list.pack_values(ints))), json.dumps(ints))
+
+        # mixed, bools, too short and too big aren't packed
+        self.assertIsNone(numeric_list.pack_values(ints + [1.0]))
+        self.assertIsNone(numeric_list.pack_values([True] * 100))
+        self.assertIsNone(numeric_list.pack_values(ints[:10]))
+        self.assertIsNone(numeric_list.pack_values(ints + [2 ** 70]))
+        self.assertIsNone(numeric_list.pack_values({"a": 1}))
+        self.assertIsNotNone(numeric_list.pack_values(ints[:10], min_length=0))
+
+    def test_parse_numbers(self):
+        self.assertEqual(numeric_list.parse_numbers("2, 1.5", 2), [2, 1.5])
+        self.assertIsInstance(numeric_list.parse_numbers("2", 1)[0], int)
+        self.assertEqual(numeric_list.parse_numbers(", 3", 2, allow_empty=True), [None, 3])
+        for text, count in (("", 1), ("a", 1), ("true", 1), ("1, 2", 1), (", 3", 2)):
+            with self.assertRaises(ValueError):
+                numeric_list.parse_numbers(text, count)
+
+    def check_changes(self):
+        ints = array.array("q", [-3, 0, 2, 7, 2])
+        floats = array.array("d", [-1.5, 0.25, 2.0, 7.125])
+
+        scaled = numeric_list.scale_values(ints, 2)
+        self.assertEqual((scaled.typecode, scaled.tolist()), ("q", [-6, 0, 4, 14, 4]))
+        scaled = numeric_list.scale_values(ints, 0.5)
+        self.assertEqual((scaled.typecode, scaled.tolist()), ("d", [-1.5, 0.0, 1.0, 3.5, 1.0]))
+        self.assertEqual(numeric_list.offset_values(floats, 1).tolist(), [-0.5, 1.25, 3.0, 8.125])
+
+        self.assertEqual(numeric_list.clamp_values(ints, 0, 5).tolist(), [0, 0, 2, 5, 2])
+        self.assertEqual(numeric_list.clamp_values(floats, maximum=1).tolist(), [-1.5, 0.25, 1.0, 1.0])
+        self.assertEqual(numeric_list.clamp_values(ints, minimum=1.5).tolist(), [1.5, 1.5, 2.0, 7.0, 2.0])
+
+        self.assertEqual(numeric_list.round_values(floats, 1).tolist(), [-1.5, 0.2, 2.0, 7.1])
+        self.assertEqual(numeric_list.round_values(ints, -1).tolist(), [0, 0, 0, 10, 0])
+
+        replaced = numeric_list.replace_values(ints, 2.0, 9)
+        self.assertEqual((replaced.typecode, replaced.tolist()), ("q", [-3, 0, 9, 7, 9]))
+
+        # ints past 8 bytes stay python ints
+        self.assertEqual(numeric_list.scale_values(ints, 2 ** 62)[0], -3 * 2 ** 62)
+        self.assertEqual(numeric_list.offset_values(ints, 2 ** 64), [value + 2 ** 64 for value in ints])
+
+    def test_changes(self):
+        self.check_changes()
+
+    def test_changes_without_numpy(self):
+        installed_numpy = numeric_list.numpy
+        numeric_list.numpy = None
+        try:
+            self.check_changes()
+        finally:
+            numeric_list.numpy = installed_numpy
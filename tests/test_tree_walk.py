@@ -0,0 +1,47 @@
+import os
+import sys
+from collections import OrderedDict
+from unittest import TestCase
+
+tests_path = os.path.dirname(os.path.realpath(__file__))
+base_path = tests_path.rsplit(os.sep, 1)[0]
+if base_path not in sys.path:
+    sys.path.insert(0, base_path)
+
+from json_editor import tree_walk
+
+
+def build_nested_lists(depth):
+    data = []
+    for _ in range(depth):
+        data = [data]
+    return data
+
+
+class TestTreeWalk(TestCase):
+
+    def test_document_order(self):
+        data = OrderedDict([("a", [1, {"b": 2}]), ("c", ()), ("d", "e")])
+        entries = [(key, depth) for (key, _), depth in tree_walk.walk_data(data)]
+        self.assertEqual(entries, [(None, 0), ("a", 1), (0, 2), (1, 2), ("b", 3), ("c", 1), ("d", 1)])
+
+    def test_scalar(self):
+        self.assertEqual(list(tree_walk.walk_data("a")), [((None, "a"), 0)])
+
+    def test_children_are_asked_for_after_the_node(self):
+        # children that are added to a node before its children are needed are walked as well
+        tree = {"root": []}
+
+        def get_children(node):
+            if node == "root":
+                tree["root"].append("child")
+            return tree.get(node)
+
+        self.assertEqual(list(tree_walk.walk("root", get_children)), [("root", 0), ("child", 1)])
+
+    def test_deep(self):
+        depth = 100000
+        entries = list(tree_walk.walk_data(build_nested_lists(depth)))
+        self.assertEqual(len(entries), depth + 1)
+        self.assertEqual(entries[-1][1], depth)
+        self.assertEqual(entries[-1][0][1], [])
@@ -0,0 +1,99 @@
+import os
+import sys
+from unittest import TestCase
+
+tests_path = os.path.dirname(os.path.realpath(__file__))
+base_path = tests_path.rsplit(os.sep, 1)[0]
+if base_path not in sys.path:
+    sys.path.insert(0, base_path)
+
+from json_editor import undo_stack
+
+
+class AppendCommand(undo_stack.UndoCommand):
+    def __init__(self, values, value, memory_size=10):
+        self.text = "Append {}".format(value)
+        self.values = values
+        self.value = value
+        self.memory_size = memory_size
+
+    def undo(self):
+        self.values.pop()
+
+    def redo(self):
+        self.values.append(self.value)
+
+    def get_memory_size(self):
+        return self.memory_size
+
+
+class TestUndoStack(TestCase):
+
+    def push_append(self, stack, values, value, memory_size=10):
+        command = AppendCommand(values, value, memory_size)
+        command.redo()
+        stack.push(command)
+
+    def test_undo_redo(self):
+        stack = undo_stack.UndoStack()
+        values = []
+        for value in range(3):
+            self.push_append(stack, values, value)
+
+        self.assertEqual(stack.undo_text(), "Append 2")
+        stack.undo()
+        stack.undo()
+        self.assertEqual(values, [0])
+        self.assertEqual(stack.redo_text(), "Append 1")
+
+        stack.redo()
+        self.assertEqual(values, [0, 1])
+
+        # a new step drops what could be redone
+        self.push_append(stack, values, 5)
+        self.assertFalse(stack.can_redo())
+        self.assertIsNone(stack.redo())
+        self.assertEqual(stack.memory_size, 30)
+
+        while stack.can_undo():
+            stack.undo()
+        self.assertEqual(values, [])
+        self.assertIsNone(stack.undo())
+
+    def test_memory_budget(self):
+        stack = undo_stack.UndoStack(memory_budget=25)
+        values = []
+        for value in range(4):
+            self.push_append(stack, values, value)
+
+        # only the two newest steps fit
+        stack.undo()
+        stack.undo()
+        self.assertFalse(stack.can_undo())
+        self.assertEqual(values, [0, 1])
+
+        stack.set_memory_budget(15)
+        self.assertEqual(stack.memory_size, 10)
+        self.assertEqual(stack.redo_text(), "Append 2")
+
+        self.push_append(stack, values, 9, memory_size=100)
+        self.assertFalse(stack.can_undo())
+        self.assertEqual(stack.memory_size, 0)
+
+    def test_revision(self):
+        stack = undo_stack.UndoStack()
+        values = []
+        revisions = [stack.revision]
+        self.push_append(stack, values, 0)
+        revisions.append(stack.revision)
+        stack.undo()
+        revisions.append(stack.revision)
+        stack.redo()
+        revisions.append(stack.revision)
+        stack.clear()
+        revisions.append(stack.revision)
+        self.assertEqual(len(set(revisions)), len(revisions))
+
+        # nothing to undo doesn't change anything
+        stack.undo()
+        self.assertEqual(stack.revision, revisions[-1])